@@ -0,0 +1,56 @@
+""" Rows per second of the DataFrame -> City conversion used by `process_df_csc`.
+- before: `iterrows` + `to_json` + `json.loads` + `City(**row_json)` per row.
+- after: `BaseRegionColl.models_from_df_csc` (normalize once + batched `TypeAdapter`).
+"""
+from datetime import datetime
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from geodata.db.colls.cities import CitiesColl
+from geodata.db.models.city import City
+from geodata.utils_time import UTC
+
+def synthetic_df_cities(num_rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "city_id_csc": np.arange(num_rows),
+        "city_name": [f"City {i}" for i in range(num_rows)],
+        "state_id_csc": rng.integers(1, 5000, num_rows),
+        "state_code": rng.choice(["BY", "BE", None], num_rows),
+        "country_id_csc": rng.integers(1, 250, num_rows),
+        "country_code": rng.choice(["DE", "AT", "CH"], num_rows),
+        "latitude": rng.uniform(-90, 90, num_rows),
+        "longitude": rng.uniform(-180, 180, num_rows),
+        "city_id_wikidata": rng.choice(["Q64", None], num_rows),
+    })
+    return df.where(pd.notnull(df), None)
+
+def models_from_rows(df: pd.DataFrame) -> list:
+    models = []
+    for _, row in df.iterrows():
+        row_json = json.loads(row.to_json())
+        current_time = datetime.now(tz=UTC)
+        models.append(City(created_time=current_time, updated_time=current_time, **row_json))
+    return models
+
+def rows_per_second(fn, df: pd.DataFrame) -> float:
+    time_i = time.perf_counter()
+    fn(df)
+    return len(df) / (time.perf_counter() - time_i)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=150_000)
+    args = parser.parse_args()
+
+    df = synthetic_df_cities(args.rows)
+    cities = CitiesColl(coll=None)
+    before = rows_per_second(models_from_rows, df)
+    after = rows_per_second(cities.models_from_df_csc, df)
+    print(f"rows={args.rows}")
+    print(f"before: {before:,.0f} rows/s")
+    print(f"after:  {after:,.0f} rows/s ({after/before:.1f}x)")
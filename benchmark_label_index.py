@@ -0,0 +1,77 @@
+""" Names per second of the fuzzy matching of CSC names against wikidata labels.
+- before: `difflib.get_close_matches` per name over every label (measured on a sample, it is too slow for all of them).
+- after: `LabelIndex.top_k` for the whole batch (trigram postings + numpy).
+"""
+from difflib import get_close_matches
+import argparse
+import time
+
+import numpy as np
+
+from geodata.wikidata.matching import LabelIndex, Place, normalize_name
+
+CONSONANTS = ["b", "br", "ch", "d", "f", "g", "gr", "h", "k", "kr", "l", "m", "n", "p", "pf", "r", "s", "sch", "st", "t", "tr", "v", "w", "z"]
+VOWELS = ["a", "e", "i", "o", "u", "ei", "au", "ie", "ö", "ü"]
+CODAS = ["", "n", "r", "l", "ng", "rg", "ld", "tz", "ch", "s"]
+
+def random_name(rng: np.random.Generator) -> str:
+    """ Pseudo-German place name of 2-4 syllables, sometimes of two words."""
+    def word() -> str:
+        return "".join(rng.choice(CONSONANTS) + rng.choice(VOWELS) + rng.choice(CODAS) for _ in range(rng.integers(2, 5))).capitalize()
+    return word() if rng.random() < 0.8 else f"{word()} {word()}"
+
+def with_typo(name: str, rng: np.random.Generator) -> str:
+    i = int(rng.integers(0, len(name)))
+    if rng.random() < 0.5:
+        return name[:i] + name[i+1:]
+    return name[:i] + str(rng.choice(list("aeiourstn"))) + name[i+1:]
+
+def synthetic_places(num_places: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    return [
+        Place(f"Q{i}", {random_name(rng), random_name(rng)}, float(rng.uniform(45, 55)), float(rng.uniform(5, 15)))
+        for i in range(num_places)
+    ]
+
+def synthetic_names(places: list, num_names: int, seed: int = 1) -> tuple:
+    rng = np.random.default_rng(seed)
+    ids = rng.integers(0, len(places), num_names)
+    names = []
+    for i in ids:
+        name = sorted(places[i].labels)[0]
+        names.append(with_typo(name, rng) if rng.random() < 0.5 else name)
+    return names, ids
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--places", type=int, default=20_000)
+    parser.add_argument("--names", type=int, default=100_000)
+    parser.add_argument("--sample-before", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    places = synthetic_places(args.places)
+    names, ids = synthetic_names(places, args.names)
+
+    time_i = time.perf_counter()
+    index = LabelIndex(places)
+    time_build = time.perf_counter() - time_i
+
+    time_i = time.perf_counter()
+    matches = index.top_k(names, k=args.k)
+    after = len(names) / (time.perf_counter() - time_i)
+    is_top_1 = np.r_[True, matches.row[1:] != matches.row[:-1]]
+    top_1 = np.full(len(names), -1)
+    top_1[matches.row[is_top_1]] = matches.place[is_top_1]
+    accuracy = (top_1 == ids).mean()
+
+    labels = [normalize_name(label) for place in places for label in place.labels]
+    time_i = time.perf_counter()
+    for name in names[:args.sample_before]:
+        get_close_matches(normalize_name(name), labels, n=args.k, cutoff=0.6)
+    before = args.sample_before / (time.perf_counter() - time_i)
+
+    print(f"places={args.places} labels={len(labels)} names={args.names} k={args.k}")
+    print(f"index build: {time_build:.2f} s")
+    print(f"before: {before:,.0f} names/s (difflib, sample of {args.sample_before})")
+    print(f"after:  {after:,.0f} names/s ({after/before:.0f}x), top-1 accuracy {accuracy:.3f}")
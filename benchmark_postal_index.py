@@ -0,0 +1,105 @@
+""" Lookups per second of the reverse index postal code -> `state_id_csc`/`city_id_csc`.
+- before: scan of every document, `PostalIntervals.contains` and `in` on the codes (measured on a sample, it is too slow for all of them).
+- after: `PostalReverseIndex.exact/prefix/range` (sorted numpy arrays per country, `searchsorted`).
+- Synthetic dataset of the size of CSC (~5k states, ~150k cities), or `--from-db` for the real one.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from geodata.db.postal_index import PostalReverseIndex, STATE, CITY
+from geodata.wikipedia.process_postals.intervals import PostalIntervals
+
+WIDTHS = {"DE": 5, "AT": 4, "CH": 4, "FR": 5, "US": 5, "IT": 5, "ES": 5, "PL": 5, "NL": 4, "BE": 4}
+LETTERS = "ABCDEFGHIJKLMNOPRSTUWY"
+
+def random_gb(rng: np.random.Generator) -> str:
+    return f"{''.join(rng.choice(list(LETTERS), 2))}{rng.integers(1, 20)} {rng.integers(0, 10)}{''.join(rng.choice(list(LETTERS), 2))}"
+
+def synthetic_rows(num_states: int, num_cities: int, seed: int = 0) -> list:
+    """ States splitting the codes of their country in long ranges, cities with codes of wikidata and short ranges
+    of wikipedia inside them, GB codes as strings."""
+    rng = np.random.default_rng(seed)
+    country_codes = [*WIDTHS, "GB"]
+    rows = []
+    states_by_country = np.array_split(np.arange(num_states), len(country_codes))
+    for country_code, ids_state in zip(country_codes, states_by_country):
+        if country_code == "GB":
+            rows.extend((STATE, int(id_csc), country_code, [random_gb(rng)], []) for id_csc in ids_state)
+            continue
+        width = WIDTHS[country_code]
+        cuts = np.linspace(10 ** (width - 1), 10 ** width, len(ids_state) + 1).astype(int)
+        rows.extend((STATE, int(id_csc), country_code, [], [[int(start), int(end) - 1, width]]) for id_csc, start, end in zip(ids_state, cuts[:-1], cuts[1:]))
+    for id_csc in range(num_cities):
+        country_code = str(rng.choice(country_codes))
+        if country_code == "GB":
+            rows.append((CITY, id_csc, country_code, [random_gb(rng) for _ in range(rng.integers(1, 4))], []))
+            continue
+        width = WIDTHS[country_code]
+        span = int(rng.integers(0, 40))
+        start = int(rng.integers(10 ** (width - 1), 10 ** width - span))
+        codes = [str(int(rng.integers(start, start + span + 1))).zfill(width) for _ in range(rng.integers(0, 3))]
+        rows.append((CITY, id_csc, country_code, codes, [[start, start + span, width]]))
+    return rows
+
+def synthetic_queries(rows: list, num_queries: int, seed: int = 1) -> list:
+    rng = np.random.default_rng(seed)
+    queries = []
+    for i in rng.integers(0, len(rows), num_queries):
+        _, _, country_code, codes, ranges = rows[i]
+        if len(ranges) != 0:
+            start, end, width = ranges[0]
+            queries.append((country_code, str(int(rng.integers(start, end + 1))).zfill(width)))
+        else:
+            queries.append((country_code, codes[0]))
+    return queries
+
+def scan_exact(rows: list, country_code: str, postal_code: str) -> tuple:
+    states, cities = set(), set()
+    for kind, id_csc, cc, codes, ranges in rows:
+        if cc == country_code and (postal_code in codes or postal_code in PostalIntervals.from_list(ranges)):
+            (states if kind == STATE else cities).add(id_csc)
+    return sorted(states), sorted(cities)
+
+def rate(fn, num_queries: int) -> float:
+    time_i = time.perf_counter()
+    fn()
+    return num_queries / (time.perf_counter() - time_i)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--states", type=int, default=5_000)
+    parser.add_argument("--cities", type=int, default=150_000)
+    parser.add_argument("--queries", type=int, default=100_000)
+    parser.add_argument("--sample-before", type=int, default=20)
+    parser.add_argument("--from-db", action="store_true", help="Rows of the states and cities collections instead of synthetic ones.")
+    args = parser.parse_args()
+
+    if args.from_db:
+        from geodata.db.client import WorldDataDB
+        db = WorldDataDB()
+        rows = [*db.states.iter_postal_index_rows(STATE), *db.cities.iter_postal_index_rows(CITY)]
+    else:
+        rows = synthetic_rows(args.states, args.cities)
+    queries = synthetic_queries(rows, args.queries)
+
+    time_i = time.perf_counter()
+    index = PostalReverseIndex.build(rows)
+    time_build = time.perf_counter() - time_i
+
+    exact = rate(lambda: [index.exact(cc, code) for cc, code in queries], len(queries))
+    prefix = rate(lambda: [index.prefix(cc, code[:3]) for cc, code in queries], len(queries))
+    range_ = rate(lambda: [index.range(cc, code, code[:-1] + "9") for cc, code in queries], len(queries))
+
+    sample = queries[:args.sample_before]
+    time_i = time.perf_counter()
+    scanned = [scan_exact(rows, cc, code) for cc, code in sample]
+    before = len(sample) / (time.perf_counter() - time_i)
+    is_same = all(tuple(index.exact(cc, code)) == tuple(expected) for (cc, code), expected in zip(sample, scanned))
+
+    print(f"rows={len(rows)} entries={len(index)} queries={len(queries)} | build {time_build:.2f} s")
+    print(f"before: {before:,.0f} lookups/s (scan, sample of {len(sample)})")
+    print(f"exact:  {exact:,.0f} lookups/s ({exact / before:,.0f}x), same results: {is_same}")
+    print(f"prefix: {prefix:,.0f} lookups/s (3 characters)")
+    print(f"range:  {range_:,.0f} lookups/s (up to 10 codes)")
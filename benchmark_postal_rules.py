@@ -0,0 +1,70 @@
+""" Raw postal code strings per second of the postprocessing of the postal codes of wikipedia.
+- before: `process_postal_code_de/at/ch`, if/elif dispatch and one uncompiled `re.match` per type, ranges expanded.
+- after: `POSTAL_RULES.normalize` (one compiled regex per country, intervals) and `normalize_batch` (repeated strings once).
+- `--extra-countries`: rules registered on top, the DE/AT/CH throughput should not change.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from geodata.wikipedia.process_postals.de import process_postal_code_de
+from geodata.wikipedia.process_postals.at import process_postal_code_at
+from geodata.wikipedia.process_postals.ch import process_postal_code_ch
+from geodata.wikipedia.process_postals.rules import POSTAL_RULES, PostalRule, SYNTAX_LIST, SYNTAX_RANGE
+
+LEGACY = {"DE": process_postal_code_de, "AT": process_postal_code_at, "CH": process_postal_code_ch}
+WIDTHS = {"DE": 5, "AT": 4, "CH": 4}
+
+def random_raw(rng: np.random.Generator, country_code: str) -> str:
+    width = WIDTHS[country_code]
+    def code() -> int:
+        return int(rng.integers(10 ** (width - 1), 10 ** width - 100))
+    kind = rng.integers(0, 5)
+    if kind == 0:
+        return str(code()).zfill(width)
+    if kind == 1:
+        return ", ".join(str(code()).zfill(width) for _ in range(rng.integers(2, 6)))
+    if kind == 2:
+        start = code()
+        return f"{str(start).zfill(width)}-{str(start + int(rng.integers(1, 99))).zfill(width)}"
+    if kind == 3:
+        start = code()
+        return f"{str(start).zfill(width)}-{str(start + int(rng.integers(1, 99))).zfill(width)}, {str(code()).zfill(width)}"
+    return f"{code()} (until 1993: {code()})"
+
+def synthetic_raws(num_strings: int, num_unique: int, seed: int = 0) -> tuple:
+    rng = np.random.default_rng(seed)
+    country_codes = rng.choice(list(LEGACY), num_unique)
+    uniques = [(str(cc), random_raw(rng, str(cc))) for cc in country_codes]
+    picks = rng.integers(0, num_unique, num_strings)
+    return [uniques[i][0] for i in picks], [uniques[i][1] for i in picks]
+
+def rate(fn, num_strings: int) -> float:
+    time_i = time.perf_counter()
+    fn()
+    return num_strings / (time.perf_counter() - time_i)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--strings", type=int, default=1_000_000)
+    parser.add_argument("--unique", type=int, default=50_000)
+    parser.add_argument("--extra-countries", type=int, default=200)
+    args = parser.parse_args()
+
+    country_codes, raws = synthetic_raws(args.strings, args.unique)
+    pairs = list(zip(country_codes, raws))
+
+    before = rate(lambda: [LEGACY[cc](raw) for cc, raw in pairs], len(pairs))
+    after = rate(lambda: [POSTAL_RULES.normalize(cc, raw) for cc, raw in pairs], len(pairs))
+    after_batch = rate(lambda: POSTAL_RULES.normalize_batch(country_codes, raws), len(pairs))
+
+    for i in range(args.extra_countries):
+        POSTAL_RULES.register(PostalRule(f"X{i}", code=r"\d{%d}" % (3 + i % 4), syntaxes=frozenset({SYNTAX_LIST, SYNTAX_RANGE})))
+    after_extra = rate(lambda: [POSTAL_RULES.normalize(cc, raw) for cc, raw in pairs], len(pairs))
+
+    print(f"strings={args.strings} unique={args.unique}")
+    print(f"before:       {before:,.0f} strings/s (if/elif + re.match, expanded)")
+    print(f"after:        {after:,.0f} strings/s ({after / before:.1f}x, intervals)")
+    print(f"after batch:  {after_batch:,.0f} strings/s ({after_batch / before:.1f}x)")
+    print(f"after +{args.extra_countries} countries: {after_extra:,.0f} strings/s")
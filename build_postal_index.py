@@ -0,0 +1,15 @@
+import argparse
+
+from geodata.db.client import WorldDataDB
+from geodata.db.postal_index import DEFAULT_POSTAL_INDEX_PATH
+
+def main(verbose: bool = True, path: str = DEFAULT_POSTAL_INDEX_PATH):
+    db = WorldDataDB()
+    db.build_postal_index(path=path, verbose=verbose)
+
+if __name__ == "__main__":
+    VERBOSE = True      # Can redirect to .log file.
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default=DEFAULT_POSTAL_INDEX_PATH, help="Output `.npz` of the postal index.")
+    args = parser.parse_args()
+    main(verbose=VERBOSE, path=args.path)
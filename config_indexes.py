@@ -1,5 +1,6 @@
 from geodata.db.client import WorldDataDB
 
 if __name__ == "__main__":
-    db = WorldDataDB()
-    db.set_unique_keys()
\ No newline at end of file
+    db = WorldDataDB(with_indexes=False)
+    db.set_indexes(verbose=True)
+    db.check_indexes(verbose=True)
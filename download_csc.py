@@ -1,9 +1,45 @@
+import argparse
+
 from geodata.db.client import WorldDataDB
+from geodata.csc.cache import CSCCache
 
-def main(verbose: bool = True):
+def main(
+        verbose: bool = True,
+        with_bulk: bool = False,
+        chunksize: int | None = None,
+        cache_dir: str | None = None,
+        offline: bool = False,
+        incremental: bool = False,
+        with_tombstones: bool = False,
+        with_requeue: bool = False
+    ):
     db = WorldDataDB()
-    db.download_csc(verbose=verbose)
+    cache = None if cache_dir is None else CSCCache(cache_dir=cache_dir, offline=offline)
+    if incremental:
+        db.sync_csc(verbose=verbose, chunksize=chunksize, cache=cache, with_tombstones=with_tombstones, with_requeue=with_requeue)
+    else:
+        db.download_csc(verbose=verbose, with_bulk=with_bulk, chunksize=chunksize, cache=cache)
 
 if __name__ == "__main__":
     VERBOSE = True      # Can redirect to .log file.
-    main(verbose=VERBOSE)
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--with-bulk", action="store_true")
+    parser.add_argument("--chunksize", type=int, default=None, help="Stream the csv in chunks of this many rows.")
+    parser.add_argument("--cache-dir", type=str, default=None, help="Local cache of the csv files.")
+    parser.add_argument("--offline", action="store_true", help="Only use the local cache.")
+    parser.add_argument("--incremental", action="store_true", help="Only apply the rows that changed since the last sync.")
+    parser.add_argument("--with-tombstones", action="store_true", help="Flag the rows removed upstream with `csc_deleted`.")
+    parser.add_argument("--with-requeue", action="store_true", help="Mark the changed rows as pending for the enrichment stages.")
+    args = parser.parse_args()
+    if args.offline and args.cache_dir is None:
+        parser.error("--offline requires --cache-dir")
+    main(
+        verbose = VERBOSE,
+        with_bulk = args.with_bulk,
+        chunksize = args.chunksize,
+        cache_dir = args.cache_dir,
+        offline = args.offline,
+        incremental = args.incremental,
+        with_tombstones = args.with_tombstones,
+        with_requeue = args.with_requeue
+    )
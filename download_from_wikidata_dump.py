@@ -0,0 +1,17 @@
+import argparse
+
+from geodata.db.client import WorldDataDB, DEFAULT_DUMP_INDEX_PATH
+from geodata.wikidata.dump import DEFAULT_PROCESSES
+
+def main(path_dump: str | None, path_index: str = DEFAULT_DUMP_INDEX_PATH, processes: int = DEFAULT_PROCESSES, verbose: bool = True):
+    db = WorldDataDB()
+    db.download_from_dump(path_dump=path_dump, path_index=path_index, processes=processes, verbose=verbose)
+
+if __name__ == "__main__":
+    VERBOSE = True
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dump", default=None, help="Wikidata JSON dump (.json, .json.gz or .json.bz2). Without it the existing index is used.")
+    parser.add_argument("--index", default=DEFAULT_DUMP_INDEX_PATH, help="SQLite index of the dump entities.")
+    parser.add_argument("--processes", type=int, default=DEFAULT_PROCESSES, help="Worker processes parsing the dump.")
+    args = parser.parse_args()
+    main(path_dump=args.dump, path_index=args.index, processes=args.processes, verbose=VERBOSE)
@@ -0,0 +1,36 @@
+import argparse
+
+from geodata.db.client import WorldDataDB
+from geodata.wikidata.dump import DEFAULT_PROCESSES
+
+def main(
+        path_dump: str,
+        path_dump_index: str | None = None,
+        path_wikidata_index: str | None = None,
+        processes: int = DEFAULT_PROCESSES,
+        verbose: bool = True
+    ):
+    db = WorldDataDB()
+    db.download_postals_from_wikipedia_dump(
+        path_dump=path_dump,
+        path_dump_index=path_dump_index,
+        path_wikidata_index=path_wikidata_index,
+        processes=processes,
+        verbose=verbose
+    )
+
+if __name__ == "__main__":
+    VERBOSE = True
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dump", required=True, help="enwiki pages-articles dump (.xml.bz2, multistream for the processes, or .xml).")
+    parser.add_argument("--dump-index", default=None, help="multistream-index.txt.bz2 of the dump, to read only the streams with our articles.")
+    parser.add_argument("--wikidata-index", default=None, help="SQLite index of a Wikidata dump, for the enwiki titles. Without it they are fetched with wbgetentities.")
+    parser.add_argument("--processes", type=int, default=DEFAULT_PROCESSES, help="Worker processes parsing the dump.")
+    args = parser.parse_args()
+    main(
+        path_dump=args.dump,
+        path_dump_index=args.dump_index,
+        path_wikidata_index=args.wikidata_index,
+        processes=args.processes,
+        verbose=VERBOSE
+    )
@@ -2,14 +2,14 @@ import argparse
 
 from geodata.db.client import WorldDataDB
 
-def main(max_workers: int = 5, verbose: bool = True, with_concurrent: bool = False):
+def main(verbose: bool = True, batch_size: int | None = None, batches_in_flight: int = 16):
     db = WorldDataDB()
-    db.download_websites_postals(max_workers=max_workers, verbose=verbose, with_concurrent=with_concurrent)
+    db.download_websites_postals(verbose=verbose, batch_size=batch_size, batches_in_flight=batches_in_flight)
 
 if __name__ == "__main__":
-    MAX_WORKERS = 5
     VERBOSE = True
     parser = argparse.ArgumentParser()
-    parser.add_argument("--with-concurrent", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=None, help="Entities fetched per SPARQL query.")
+    parser.add_argument("--batches-in-flight", type=int, default=16, help="Batches processed concurrently by the asyncio engine.")
     args = parser.parse_args()
-    main(max_workers=MAX_WORKERS, verbose=VERBOSE, with_concurrent=args.with_concurrent)
\ No newline at end of file
+    main(verbose=VERBOSE, batch_size=args.batch_size, batches_in_flight=args.batches_in_flight)
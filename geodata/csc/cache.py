@@ -0,0 +1,145 @@
+""" On-disk cache of the CSC csv files.
+- Keeps the `ETag` and `Last-Modified` of each file and sends conditional requests, an unchanged file is a 304.
+- The parsed (renamed and cleaned) dataframe is stored as Parquet. The missing text values are `None` again when
+read back, as in `download_csv`, whatever the pandas string dtype.
+"""
+from typing import Generator
+from urllib.parse import urlparse, unquote
+import json
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+import requests
+
+from geodata.csc.urls import UrlsCSC
+from geodata.csc.downloads import DEFAULT_CHUNKSIZE, dtypes_csc, replace_empty_to_none_df, format_df_csc
+
+DEFAULT_CACHE_DIR = ".cache_csc"
+ETAG = "etag"
+LAST_MODIFIED = "last_modified"
+SOURCE = "source"
+FILE_SCHEME = "file"
+CHUNK_BYTES = 1 << 20
+
+
+class CSCCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, offline: bool = False, base_url: str | None = None):
+        """
+        - `offline=True`: never touch the network, only the cached files are used.
+        - `base_url`: replaces the github folder of `UrlsCSC`, e.g. `file:///data/csv` or a local http server.
+        """
+        self._cache_dir = cache_dir
+        self._offline = offline
+        self._base_url = base_url
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def cache_dir(self) -> str:
+        return self._cache_dir
+
+    @property
+    def offline(self) -> bool:
+        return self._offline
+
+    def source_url(self, url: UrlsCSC) -> str:
+        url = UrlsCSC(url)
+        if self._base_url is None:
+            return url.value
+        return f"{self._base_url.rstrip('/')}/{url.name}.csv"
+
+    def path_parquet(self, url: UrlsCSC) -> str:
+        return os.path.join(self.cache_dir, f"{UrlsCSC(url).name}.parquet")
+
+    def path_meta(self, url: UrlsCSC) -> str:
+        return os.path.join(self.cache_dir, f"{UrlsCSC(url).name}.meta.json")
+
+    def path_csv_tmp(self, url: UrlsCSC) -> str:
+        return os.path.join(self.cache_dir, f"{UrlsCSC(url).name}.csv.tmp")
+
+    def is_cached(self, url: UrlsCSC) -> bool:
+        return os.path.exists(self.path_parquet(url)) and os.path.exists(self.path_meta(url))
+
+    def load_meta(self, url: UrlsCSC) -> dict:
+        if not self.is_cached(url):
+            return {}
+        with open(self.path_meta(url), "r") as f:
+            return json.load(f)
+
+    def save_meta(self, url: UrlsCSC, meta: dict) -> None:
+        path_tmp = f"{self.path_meta(url)}.tmp"
+        with open(path_tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(path_tmp, self.path_meta(url))
+
+    def _write_parquet(self, url: UrlsCSC, path_csv: str) -> None:
+        df = pd.read_csv(path_csv, sep=",", dtype=dtypes_csc(), low_memory=False)
+        df = replace_empty_to_none_df(df)
+        df = format_df_csc(df, url)
+        path_tmp = f"{self.path_parquet(url)}.tmp"
+        df.to_parquet(path_tmp, index=False)
+        os.replace(path_tmp, self.path_parquet(url))
+
+    def _refresh_file(self, url: UrlsCSC, source: str, meta: dict) -> bool:
+        path_csv = unquote(urlparse(source).path)
+        last_modified = str(os.stat(path_csv).st_mtime_ns)
+        if self.is_cached(url) and meta.get(LAST_MODIFIED) == last_modified:
+            return False
+        self._write_parquet(url, path_csv)
+        self.save_meta(url, {SOURCE: source, ETAG: None, LAST_MODIFIED: last_modified})
+        return True
+
+    def _refresh_http(self, url: UrlsCSC, source: str, meta: dict) -> bool:
+        headers = {}
+        if self.is_cached(url):
+            if meta.get(ETAG) is not None:
+                headers["If-None-Match"] = meta[ETAG]
+            if meta.get(LAST_MODIFIED) is not None:
+                headers["If-Modified-Since"] = meta[LAST_MODIFIED]
+
+        path_csv = self.path_csv_tmp(url)
+        with requests.get(source, headers=headers, stream=True) as response:
+            if response.status_code == 304:
+                return False
+            response.raise_for_status()
+            with open(path_csv, "wb") as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_BYTES):
+                    f.write(chunk)
+            meta_new = {
+                SOURCE: source,
+                ETAG: response.headers.get("ETag"),
+                LAST_MODIFIED: response.headers.get("Last-Modified")
+            }
+
+        try:
+            self._write_parquet(url, path_csv)
+        finally:
+            os.remove(path_csv)
+        self.save_meta(url, meta_new)
+        return True
+
+    def refresh(self, url: UrlsCSC) -> bool:
+        """ Bring the cached file of `url` up to date. Returns True if it was downloaded again."""
+        url = UrlsCSC(url)
+        if self.offline:
+            if not self.is_cached(url):
+                raise FileNotFoundError(f"Offline and without cache for `{url.name}` in {self.cache_dir}.")
+            return False
+
+        source = self.source_url(url)
+        meta = self.load_meta(url)
+        if urlparse(source).scheme == FILE_SCHEME:
+            return self._refresh_file(url, source, meta)
+        return self._refresh_http(url, source, meta)
+
+    def get_df(self, url: UrlsCSC) -> pd.DataFrame:
+        """ Same dataframe as `download_csv`, read from the cache."""
+        self.refresh(url)
+        return replace_empty_to_none_df(pd.read_parquet(self.path_parquet(url)))
+
+    def iter_df(self, url: UrlsCSC, chunksize: int = DEFAULT_CHUNKSIZE) -> Generator[pd.DataFrame, None, None]:
+        """ Same chunks as `iter_download_csv`, read from the cache."""
+        self.refresh(url)
+        parquet_file = pq.ParquetFile(self.path_parquet(url))
+        for batch in parquet_file.iter_batches(batch_size=chunksize):
+            yield replace_empty_to_none_df(batch.to_pandas())
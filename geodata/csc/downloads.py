@@ -1,10 +1,14 @@
+from typing import Generator
 import requests
-from io import StringIO
+from io import BytesIO
 
+import numpy as np
 import pandas as pd
 
 from geodata.csc.urls import UrlsCSC
 
+DEFAULT_CHUNKSIZE = 20000
+
 def cols_delete_countries() -> list:
     return [
         "iso3", "numeric_code", "capital", "currency", "currency_name",
@@ -48,19 +52,31 @@ def cols_rename_cities() -> dict:
     }
 
 
+def dtypes_csc() -> dict:
+    """ The text columns of the CSC csvs (raw names), read as `str` so that a chunk whose values are all digits
+    (`state_code` `01`, `numeric_code` `004`...) is not inferred as int. The columns missing from a csv are ignored."""
+    cols_text = [
+        "name", "iso2", "iso3", "numeric_code", "phone_code", "capital", "currency", "currency_name",
+        "currency_symbol", "tld", "native", "region", "subregion", "nationality", "timezones", "emoji", "emojiU",
+        "country_code", "country_name", "state_code", "state_name", "type", "wikiDataId"
+    ]
+    return {col: str for col in cols_text}
+
+
 def replace_empty_to_none(x):
     return None if isinstance(x, str) and x.strip() == '' else x
 
-def download_csv(url: UrlsCSC) -> pd.DataFrame:
-    """ Download the raw data from the CSC github.
-    - Returns a dataframe with the csv.
-    """
-    url = UrlsCSC(url)
-    response = requests.get(url.value)
-    df = pd.read_csv(StringIO(response.text), sep=",")
-    df = df.where(pd.notnull(df), None)
-    df = df.map(replace_empty_to_none)
+def replace_empty_to_none_df(df: pd.DataFrame) -> pd.DataFrame:
+    """ Vectorized `replace_empty_to_none`, also NaN -> None in the text columns."""
+    cols_text = df.select_dtypes(include=["object", "string"]).columns
+    if len(cols_text) != 0:
+        df_text = df[cols_text].replace(r"^\s*$", np.nan, regex=True).astype(object)
+        df[cols_text] = df_text.where(df_text.notna(), None)
+    return df
 
+def format_df_csc(df: pd.DataFrame, url: UrlsCSC) -> pd.DataFrame:
+    """ Rename and drop the CSC columns according to the kind of csv."""
+    url = UrlsCSC(url)
     if url.is_countries:
         df.rename(cols_rename_countries(), axis=1, inplace=True)
         df.drop(cols_delete_countries(), axis=1, inplace=True)
@@ -71,3 +87,27 @@ def download_csv(url: UrlsCSC) -> pd.DataFrame:
         df.rename(cols_rename_cities(), axis=1, inplace=True)
         df.drop(cols_delete_cities(), axis=1, inplace=True)
     return df
+
+def download_csv(url: UrlsCSC, source: str | None = None) -> pd.DataFrame:
+    """ Download the raw data from the CSC github.
+    - `source`: url read instead of `url.value`, e.g. a mirror or a local http server.
+    - Returns a dataframe with the csv.
+    """
+    url = UrlsCSC(url)
+    response = requests.get(url.value if source is None else source)
+    df = pd.read_csv(BytesIO(response.content), sep=",", dtype=dtypes_csc())
+    df = replace_empty_to_none_df(df)
+    return format_df_csc(df, url)
+
+def iter_download_csv(url: UrlsCSC, chunksize: int = DEFAULT_CHUNKSIZE, source: str | None = None) -> Generator[pd.DataFrame, None, None]:
+    """ Stream the raw data from the CSC github.
+    - Yields dataframes of at most `chunksize` rows, the body is never fully in memory.
+    - `source`: same as in `download_csv`.
+    """
+    url = UrlsCSC(url)
+    with requests.get(url.value if source is None else source, stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        for df in pd.read_csv(response.raw, sep=",", dtype=dtypes_csc(), chunksize=chunksize):
+            df = replace_empty_to_none_df(df)
+            yield format_df_csc(df, url)
@@ -0,0 +1,82 @@
+""" Incremental sync of the CSC csv files.
+- Each row has a content hash, stored per `*_id_csc` after it is imported.
+- A new csv is diffed against the stored hashes with a hash join, only the inserted/changed/deleted rows are applied.
+"""
+from typing import List, Tuple
+
+from pydantic import BaseModel, Field
+import numpy as np
+import pandas as pd
+
+HASH = "hash"
+CSC_DELETED = "csc_deleted"
+INSERTED = "inserted"
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+
+
+class CSCChangeset(BaseModel):
+    """ Ids touched by an incremental sync, so the enrichment stages can re-queue only those."""
+    inserted: List[int] = Field(default_factory=list)
+    updated: List[int] = Field(default_factory=list)
+    deleted: List[int] = Field(default_factory=list)
+    unchanged: int = 0
+    broken: int = 0
+
+    @property
+    def ids_affected(self) -> List[int]:
+        """ Inserted and updated ids, the ones worth enriching again."""
+        return self.inserted + self.updated
+
+    def summary(self) -> str:
+        return f"inserted={len(self.inserted)} updated={len(self.updated)} deleted={len(self.deleted)} unchanged={self.unchanged} broken={self.broken}"
+
+
+NULL_CSC = "\x00"
+
+
+def _canonical_value(value) -> str:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return NULL_CSC
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+def canonical_str_csc(column: pd.Series) -> pd.Series:
+    """ One string per value, whatever dtype pandas inferred for the chunk: an int column with a NaN is float64,
+    so `1.0` is written `1`, and NaN/None/`<NA>` are all `NULL_CSC`."""
+    if pd.api.types.is_bool_dtype(column) or not pd.api.types.is_numeric_dtype(column):
+        return column.astype(object).where(column.notna(), None).map(_canonical_value)
+    values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+    is_null = np.isnan(values)
+    is_integer = ~is_null & np.isfinite(values) & (values == np.floor(values))
+    canonical = column.astype(object).map(str).to_numpy(dtype=object)
+    canonical[is_integer] = values[is_integer].astype(np.int64).astype(str)
+    canonical[is_null] = NULL_CSC
+    return pd.Series(canonical, index=column.index, dtype=object)
+
+def hash_rows_csc(df_csc: pd.DataFrame) -> pd.Series:
+    """ Content hash of each row (int64), independent of the column order, of NaN/None and of the dtypes
+    inferred for the chunk (`canonical_str_csc`)."""
+    df = pd.DataFrame({column: canonical_str_csc(df_csc[column]) for column in sorted(df_csc.columns)}, index=df_csc.index)
+    return pd.util.hash_pandas_object(df, index=False).astype(np.int64)
+
+def diff_hashes_csc(ids_csc: pd.Series, hashes: pd.Series, df_hashes_old: pd.DataFrame) -> pd.Series:
+    """ Hash join of the new rows against `df_hashes_old` (index `id_csc`, column `hash`).
+    - Returns, aligned with `ids_csc`, `inserted`, `updated` or `unchanged`.
+    """
+    hashes_old = df_hashes_old[HASH].astype("Int64").reindex(ids_csc.to_numpy())
+    is_new = hashes_old.isna().to_numpy()
+    is_same = ~is_new & (hashes_old.fillna(0).to_numpy(dtype=np.int64) == hashes.to_numpy())
+    kind = np.where(is_new, INSERTED, np.where(is_same, UNCHANGED, UPDATED))
+    return pd.Series(kind, index=ids_csc.index)
+
+def ids_deleted_csc(df_hashes_old: pd.DataFrame, ids_seen: List[np.ndarray]) -> List[int]:
+    """ Ids stored by the previous sync that are no longer in the csv."""
+    if len(ids_seen) == 0:
+        return df_hashes_old.index.astype(int).tolist()
+    return np.setdiff1d(df_hashes_old.index.to_numpy(), np.concatenate(ids_seen)).astype(int).tolist()
+
+def split_by_kind(kinds: pd.Series) -> Tuple[pd.Index, pd.Index, int]:
+    """ Index labels of the inserted and updated rows, and the number of unchanged."""
+    return kinds.index[kinds == INSERTED], kinds.index[kinds == UPDATED], int((kinds == UNCHANGED).sum())
@@ -1,5 +1,8 @@
 import os
+import asyncio
+import warnings
 from abc import ABC
+from typing import Dict, List, Tuple
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -7,13 +10,22 @@ from pymongo import MongoClient
 from pymongo.database import Database
 
 from geodata.csc.urls import UrlsCSC
-from geodata.csc.downloads import download_csv
+from geodata.csc.downloads import download_csv, iter_download_csv
+from geodata.csc.cache import CSCCache
+from geodata.csc.sync import CSCChangeset
 from geodata.db.colls.countries import CountriesColl
 from geodata.db.colls.states import StatesColl
 from geodata.db.colls.cities import CitiesColl
 from geodata.db.colls.base import DEFAULT_WORKERS
+from geodata.db.engine import AsyncEnrichEngine, DEFAULT_BATCHES_IN_FLIGHT
+from geodata.db.indexes import IndexReport
+from geodata.db.postal_index import PostalReverseIndex, DEFAULT_POSTAL_INDEX_PATH, STATE, CITY
+from geodata.wikidata.dump import DEFAULT_PROCESSES
+from geodata.wikidata.dump_index import WikidataDumpIndex
+from geodata.wikipedia.dump import postal_codes_from_dump
+from geodata.wikipedia.postal_wikipedia import wikipedia_titles_from_ids_wikidata
 from geodata.db.models.base import (
-    OK, EXEC, DOWN_ID_WIKIDATA, DOWN_WEBSITES_POSTALS,
+    OK, EXEC, DownType, DOWN_ID_WIKIDATA, DOWN_WEBSITES_POSTALS,
     DOWN_NAME_NATIVE_ENGLISH, DOWN_POSTALS_WIKIPEDIA
 )
 
@@ -24,6 +36,17 @@ WORLD_DATA = "world_data"
 COUNTRIES = "countries"
 STATES = "states"
 CITIES = "cities"
+DEFAULT_DUMP_INDEX_PATH = ".cache_wikidata/dump_index.sqlite"
+
+def warn_deprecated_kwargs(**kwargs) -> None:
+    """ The keyword arguments of the thread pool engine, kept so that the old calls of `download_*` still run."""
+    names = [name for name, value in kwargs.items() if value is not None]
+    if len(names) != 0:
+        warnings.warn(
+            f"{', '.join(names)} no longer have any effect, the stages run with the asyncio engine (`batches_in_flight`).",
+            DeprecationWarning,
+            stacklevel=3
+        )
 
 def _get_mongo_client() -> MongoClient:
     return MongoClient(host=os.getenv("HOST"), port=int(os.getenv("PORT")))
@@ -55,102 +78,281 @@ class BaseWorldDataDB(ABC):
 
 
 class WorldDataDB(BaseWorldDataDB):
-    def __init__(self):
+    def __init__(self, with_indexes: bool = True):
+        """ `with_indexes`: apply the `index_specs` of the collections at startup, only the missing or changed ones are built."""
         super().__init__()
+        if with_indexes:
+            self.set_indexes(verbose=False)
 
     def set_unique_keys(self) -> None:
         self.countries.coll.create_index(self.countries.column_id_csc, unique=True)
         self.states.coll.create_index(self.states.column_id_csc, unique=True)
         self.cities.coll.create_index(self.cities.column_id_csc, unique=True)
 
+    def set_indexes(self, verbose: bool = True) -> Dict[str, IndexReport]:
+        """ `index_specs` of every collection, idempotent. The unique `*_id_csc` of `set_unique_keys` are part of them."""
+        return {
+            COUNTRIES: self.countries.set_indexes(verbose=verbose),
+            STATES: self.states.set_indexes(verbose=verbose),
+            CITIES: self.cities.set_indexes(verbose=verbose)
+        }
+
+    def check_indexes(self, verbose: bool = True) -> Dict[str, List[str]]:
+        """ `{collection: stage queries still doing a COLLSCAN}`, with `explain`."""
+        collscans = {
+            COUNTRIES: self.countries.collscan_stage_queries(),
+            STATES: self.states.collscan_stage_queries(),
+            CITIES: self.cities.collscan_stage_queries()
+        }
+        if verbose:
+            for name, queries in collscans.items():
+                print(f"{name} | COLLSCAN: {queries}" if len(queries) != 0 else f"{name} | no COLLSCAN")
+        return collscans
+
     def print_delimiter(self, name: str) -> None:
         print("~"*40)
         print("~"*40)
         print(f"{name:~^40}")
 
-    def download_csc(self, verbose: bool = True) -> None:
+    def _get_df_csc(self, url: UrlsCSC, chunksize: int | None = None, cache: CSCCache | None = None):
+        """ Whole dataframe, or a generator of chunks if `chunksize` is given. Read through `cache` if given."""
+        if cache is not None:
+            return cache.get_df(url) if chunksize is None else cache.iter_df(url, chunksize=chunksize)
+        if chunksize is None:
+            return download_csv(url=url)
+        return iter_download_csv(url=url, chunksize=chunksize)
+
+    def download_csc(
+            self,
+            verbose: bool = True,
+            with_bulk: bool = False,
+            chunksize: int | None = None,
+            cache: CSCCache | None = None
+        ) -> None:
         self.print_delimiter("countries")
-        df_countries = download_csv(url=UrlsCSC.countries)
-        self.countries.process_df_csc(df_countries, verbose=verbose)
+        df_countries = self._get_df_csc(url=UrlsCSC.countries, chunksize=chunksize, cache=cache)
+        report = self.countries.process_df_csc(df_countries, verbose=verbose, with_bulk=with_bulk)
+        print(f"countries: {report}")
 
         self.print_delimiter("states")
-        df_states = download_csv(url=UrlsCSC.states)
-        self.states.process_df_csc(df_states, verbose=verbose)
+        df_states = self._get_df_csc(url=UrlsCSC.states, chunksize=chunksize, cache=cache)
+        report = self.states.process_df_csc(df_states, verbose=verbose, with_bulk=with_bulk)
+        print(f"states: {report}")
 
         self.print_delimiter("cities")
-        df_cities = download_csv(url=UrlsCSC.cities)
-        self.cities.process_df_csc(df_cities, verbose=verbose)
-    
-    def download_id_wikidata(self, max_workers: int = DEFAULT_WORKERS, verbose: bool = True, with_concurrent: bool = True) -> None:
-        is_countries_exec = self.countries.is_status_exec(down_type=DOWN_ID_WIKIDATA)
-        is_states_exec = self.states.is_status_exec(down_type=DOWN_ID_WIKIDATA)
-        is_cities_exec = self.cities.is_status_exec(down_type=DOWN_ID_WIKIDATA)
-        is_exec = is_countries_exec or is_states_exec or is_cities_exec
-
-        if is_countries_exec or not is_exec:
-            self.print_delimiter("countries")
-            self.countries.search_all_none_id_wikidata(max_workers=max_workers, verbose=verbose, with_concurrent=with_concurrent)
-
-        if is_states_exec or not is_exec:
-            self.print_delimiter("states")
-            self.states.search_all_none_id_wikidata(max_workers=max_workers, verbose=verbose, with_concurrent=with_concurrent)
-
-        if is_cities_exec or not is_exec:
-            self.print_delimiter("cities")
-            self.cities.search_all_none_id_wikidata(max_workers=max_workers, verbose=verbose, with_concurrent=with_concurrent)
-
-    def download_websites_postals(self, max_workers: int = DEFAULT_WORKERS, verbose: bool = True, with_concurrent: bool = True) -> None:
-        is_countries_exec = self.countries.is_status_exec(down_type=DOWN_WEBSITES_POSTALS)
-        is_states_exec = self.states.is_status_exec(down_type=DOWN_WEBSITES_POSTALS)
-        is_cities_exec = self.cities.is_status_exec(down_type=DOWN_WEBSITES_POSTALS)
-        is_exec = is_countries_exec or is_states_exec or is_cities_exec
-
-        if is_countries_exec or not is_exec:
-            self.print_delimiter("countries")
-            self.countries.search_all_websites_and_postal_codes(max_workers=max_workers, verbose=verbose, with_concurrent=with_concurrent)
-
-        if is_states_exec or not is_exec:
-            self.print_delimiter("states")
-            self.states.search_all_websites_and_postal_codes(max_workers=max_workers, verbose=verbose, with_concurrent=with_concurrent)
-
-        if is_cities_exec or not is_exec:
-            self.print_delimiter("cities")
-            self.cities.search_all_websites_and_postal_codes(max_workers=max_workers, verbose=verbose, with_concurrent=with_concurrent)
+        df_cities = self._get_df_csc(url=UrlsCSC.cities, chunksize=chunksize, cache=cache)
+        report = self.cities.process_df_csc(df_cities, verbose=verbose, with_bulk=with_bulk)
+        print(f"cities: {report}")
     
-    def download_name_native_and_english(self, max_workers: int = DEFAULT_WORKERS, verbose: bool = True, with_concurrent: bool = True) -> None:
-        is_countries_exec = self.countries.is_status_exec(down_type=DOWN_NAME_NATIVE_ENGLISH)
-        is_states_exec = self.states.is_status_exec(down_type=DOWN_NAME_NATIVE_ENGLISH)
-        is_cities_exec = self.cities.is_status_exec(down_type=DOWN_NAME_NATIVE_ENGLISH)
-        is_exec = is_countries_exec or is_states_exec or is_cities_exec
-        
-        if is_countries_exec or not is_exec:
-            self.print_delimiter("countries")
-            self.countries.search_all_name_native_and_english(max_workers=max_workers, verbose=verbose, with_concurrent=with_concurrent)
-        
-        if is_states_exec or not is_exec:
-            self.print_delimiter("states")
-            self.states.search_all_name_native_and_english(max_workers=max_workers, verbose=verbose, with_concurrent=with_concurrent)
-        
-        if is_cities_exec or not is_exec:
-            self.print_delimiter("cities")
-            self.cities.search_all_name_native_and_english(max_workers=max_workers, verbose=verbose, with_concurrent=with_concurrent)
-
-    def download_postals_wikipedia(self, max_workers: int = DEFAULT_WORKERS, verbose: bool = True, with_concurrent: bool = True) -> None:
-        is_states_exec = self.states.is_status_exec(down_type=DOWN_POSTALS_WIKIPEDIA)
-        is_cities_exec = self.cities.is_status_exec(down_type=DOWN_POSTALS_WIKIPEDIA)
-        is_exec = is_states_exec or is_cities_exec
-
-        if is_states_exec or not is_exec:
-            self.print_delimiter("states")
-            self.states.search_all_postals_wikipedia(max_workers=max_workers, verbose=verbose, with_concurrent=with_concurrent)
-
-        if is_cities_exec or not is_exec:
-            self.print_delimiter("cities")
-            self.cities.search_all_postals_wikipedia(max_workers=max_workers, verbose=verbose, with_concurrent=with_concurrent)
-
-    def postprocess_postals_wikipedia(self, verbose: bool = True) -> None:
+    def sync_csc(
+            self,
+            verbose: bool = True,
+            chunksize: int | None = None,
+            cache: CSCCache | None = None,
+            with_tombstones: bool = False,
+            with_requeue: bool = False
+        ) -> Dict[str, CSCChangeset]:
+        """ Incremental `download_csc`, only the rows that changed since the last sync are applied.
+        - Each changeset is also saved as `{name}_changeset_{date}.json`.
+        - `with_requeue=True`: the inserted and updated ids are marked `exec` for the enrichment stages.
+        """
+        changesets = {}
+        for name, coll, url in [
+            (COUNTRIES, self.countries, UrlsCSC.countries),
+            (STATES, self.states, UrlsCSC.states),
+            (CITIES, self.cities, UrlsCSC.cities)
+        ]:
+            self.print_delimiter(name)
+            df_csc = self._get_df_csc(url=url, chunksize=chunksize, cache=cache)
+            changeset = coll.sync_df_csc(df_csc, verbose=verbose, with_tombstones=with_tombstones)
+            coll.dump_csc_changeset(changeset)
+            if with_requeue:
+                coll.requeue_ids(changeset.ids_affected)
+            print(f"{name}: {changeset.summary()}")
+            changesets[name] = changeset
+        return changesets
+
+    def colls_to_download(self, down_type: DownType) -> List[Tuple[str, CountriesColl | StatesColl | CitiesColl]]:
+        """ The collections with documents in `exec` for `down_type`, or all of them when none is in `exec`."""
+        colls = [(STATES, self.states), (CITIES, self.cities)]
+        if down_type != DOWN_POSTALS_WIKIPEDIA:
+            colls.insert(0, (COUNTRIES, self.countries))
+        colls_exec = [(name, coll) for name, coll in colls if coll.is_status_exec(down_type=down_type)]
+        return colls if len(colls_exec) == 0 else colls_exec
+
+    def _run_engine(
+            self,
+            down_type: DownType,
+            colls: List[Tuple[str, CountriesColl | StatesColl | CitiesColl]] | None = None,
+            verbose: bool = True,
+            batch_size: int | None = None,
+            batches_in_flight: int = DEFAULT_BATCHES_IN_FLIGHT
+        ) -> Dict[str, int]:
+        """ Run the enrichment stage `down_type` with the asyncio engine, over `colls` or `colls_to_download`.
+        Blocks until the stage is done (`asyncio.run`). Returns the documents processed per collection name."""
+        colls = self.colls_to_download(down_type) if colls is None else colls
+        engine = AsyncEnrichEngine(batches_in_flight=batches_in_flight, verbose=verbose)
+        return asyncio.run(engine.run(down_type, colls, batch_size=batch_size))
+
+    def download_id_wikidata(
+            self,
+            verbose: bool = True,
+            batch_size: int | None = None,
+            batches_in_flight: int = DEFAULT_BATCHES_IN_FLIGHT,
+            with_state_scope: bool = False,
+            max_workers: int = DEFAULT_WORKERS,
+            with_concurrent: bool | None = None,
+            with_async: bool | None = None
+        ) -> None:
+        """ - `with_state_scope`: the cities are resolved with one or two queries per state (`P131`, `P131*`) and
+        matched locally, in `max_workers` threads. The states must be resolved before.
+        - `with_concurrent`, `with_async`: deprecated, ignored.
+        """
+        warn_deprecated_kwargs(with_concurrent=with_concurrent, with_async=with_async)
+        colls = self.colls_to_download(DOWN_ID_WIKIDATA)
+        if with_state_scope:
+            colls_engine = [(name, coll) for name, coll in colls if name != CITIES]
+            self._run_engine(DOWN_ID_WIKIDATA, colls=colls_engine, verbose=verbose, batch_size=batch_size, batches_in_flight=batches_in_flight)
+            if len(colls_engine) != len(colls):
+                self.print_delimiter(CITIES)
+                ids_state = self.states.ids_wikidata_by_id_csc()
+                self.cities.search_all_none_id_wikidata_by_state(ids_state, max_workers=max_workers, verbose=verbose)
+            return
+        self._run_engine(DOWN_ID_WIKIDATA, colls=colls, verbose=verbose, batch_size=batch_size, batches_in_flight=batches_in_flight)
+
+    def download_websites_postals(
+            self,
+            verbose: bool = True,
+            batch_size: int | None = None,
+            batches_in_flight: int = DEFAULT_BATCHES_IN_FLIGHT,
+            max_workers: int | None = None,
+            with_concurrent: bool | None = None,
+            with_async: bool | None = None
+        ) -> None:
+        """ - `max_workers`, `with_concurrent`, `with_async`: deprecated, ignored."""
+        warn_deprecated_kwargs(max_workers=max_workers, with_concurrent=with_concurrent, with_async=with_async)
+        self._run_engine(DOWN_WEBSITES_POSTALS, verbose=verbose, batch_size=batch_size, batches_in_flight=batches_in_flight)
+
+    def download_name_native_and_english(
+            self,
+            verbose: bool = True,
+            batch_size: int | None = None,
+            batches_in_flight: int = DEFAULT_BATCHES_IN_FLIGHT,
+            max_workers: int | None = None,
+            with_concurrent: bool | None = None,
+            with_async: bool | None = None
+        ) -> None:
+        """ - `max_workers`, `with_concurrent`, `with_async`: deprecated, ignored."""
+        warn_deprecated_kwargs(max_workers=max_workers, with_concurrent=with_concurrent, with_async=with_async)
+        self._run_engine(DOWN_NAME_NATIVE_ENGLISH, verbose=verbose, batch_size=batch_size, batches_in_flight=batches_in_flight)
+
+    def download_postals_wikipedia(
+            self,
+            verbose: bool = True,
+            batch_size: int | None = None,
+            batches_in_flight: int = DEFAULT_BATCHES_IN_FLIGHT,
+            max_workers: int | None = None,
+            with_concurrent: bool | None = None,
+            with_async: bool | None = None
+        ) -> None:
+        """ - `max_workers`, `with_concurrent`, `with_async`: deprecated, ignored."""
+        warn_deprecated_kwargs(max_workers=max_workers, with_concurrent=with_concurrent, with_async=with_async)
+        self._run_engine(DOWN_POSTALS_WIKIPEDIA, verbose=verbose, batch_size=batch_size, batches_in_flight=batches_in_flight)
+
+    def download_postals_from_wikipedia_dump(
+            self,
+            path_dump: str,
+            path_dump_index: str | None = None,
+            path_wikidata_index: str | None = None,
+            processes: int = DEFAULT_PROCESSES,
+            verbose: bool = True
+        ) -> None:
+        """ Offline counterpart of `download_postals_wikipedia`, from a local enwiki `pages-articles-multistream.xml.bz2`.
+        - `path_dump_index`: its `multistream-index.txt.bz2`, to decompress only the streams with our articles.
+        - `path_wikidata_index`: the enwiki titles are read from the Wikidata dump index, else with `wbgetentities`.
+        """
+        colls = self.colls_to_download(DOWN_POSTALS_WIKIPEDIA)
+        models = {
+            name: list(coll.iter_models(coll.get_filter_models(filter_=coll.filter_pending(DOWN_POSTALS_WIKIPEDIA), down_type=DOWN_POSTALS_WIKIPEDIA)))
+            for name, coll in colls
+        }
+        ids_wikidata = [model.id_wikidata for name in models for model in models[name] if model.id_wikidata is not None]
+        if path_wikidata_index is not None:
+            index = WikidataDumpIndex(path_wikidata_index)
+            titles = {id_wikidata: e.enwiki for id_wikidata, e in index.entities(ids_wikidata).items() if e.enwiki is not None}
+            index.close()
+        else:
+            titles = wikipedia_titles_from_ids_wikidata(ids_wikidata)
+
+        self.print_delimiter("dump")
+        postals_by_title = postal_codes_from_dump(path_dump, titles.values(), path_index=path_dump_index, processes=processes, verbose=verbose)
+        print(f"{len(postals_by_title)}/{len(set(titles.values()))} articles found in {path_dump}")
+
+        for name, coll in colls:
+            self.print_delimiter(name)
+            coll.set_postals_wikipedia_from_dump(models[name], titles, postals_by_title, verbose=verbose)
+
+    def download_from_dump(
+            self,
+            path_dump: str | None,
+            path_index: str = DEFAULT_DUMP_INDEX_PATH,
+            processes: int = DEFAULT_PROCESSES,
+            verbose: bool = True
+        ) -> None:
+        """ Fill the id wikidata, websites/postal codes and names of every collection from a local Wikidata dump.
+        - `path_dump`: the dump is indexed into `path_index` first, `None` reuses an index already built.
+        - Countries, states and cities in order, so each level can use the ids of the one above.
+        """
+        index = WikidataDumpIndex(path_index)
+        if path_dump is not None:
+            self.print_delimiter("dump")
+            print(f"{index.build(path_dump, processes=processes, verbose=verbose)} entities in {path_index}")
+
+        self.print_delimiter(COUNTRIES)
+        self.countries.fill_all_from_dump(index, ids_country={}, verbose=verbose)
+        ids_country = {
+            country.country_code: country.id_wikidata
+            for country in self.countries.iter_models({self.countries.column_id_wikidata: {"$ne": None}})
+        }
+
+        self.print_delimiter(STATES)
+        self.states.fill_all_from_dump(index, ids_country=ids_country, verbose=verbose)
+        ids_state = self.states.ids_wikidata_by_id_csc()
+
+        self.print_delimiter(CITIES)
+        self.cities.fill_all_from_dump(index, ids_country=ids_country, ids_state=ids_state, verbose=verbose)
+        index.close()
+
+    def postprocess_postals_wikipedia(self, verbose: bool = True, processes: int = DEFAULT_PROCESSES) -> None:
         self.print_delimiter("states")
-        self.states.postprocess_all_postal_codes_wikipedia(verbose=verbose)
+        self.states.postprocess_all_postal_codes_wikipedia(verbose=verbose, processes=processes)
 
         self.print_delimiter("cities")
-        self.cities.postprocess_all_postal_codes_wikipedia(verbose=verbose)
\ No newline at end of file
+        self.cities.postprocess_all_postal_codes_wikipedia(verbose=verbose, processes=processes)
+
+    def migrate_postal_codes_wikipedia_ranges(self, verbose: bool = True) -> None:
+        """ `postal_codes_wikipedia_clean` (every code as a string) -> `postal_codes_wikipedia_ranges` (intervals)."""
+        self.print_delimiter("states")
+        self.states.migrate_postal_codes_wikipedia_ranges(verbose=verbose)
+
+        self.print_delimiter("cities")
+        self.cities.migrate_postal_codes_wikipedia_ranges(verbose=verbose)
+
+    def build_postal_index(self, path: str | None = DEFAULT_POSTAL_INDEX_PATH, verbose: bool = True) -> PostalReverseIndex:
+        """ Reverse index postal code -> states/cities of every state and city with postal codes, saved to `path` if given."""
+        index = PostalReverseIndex.build(
+            row
+            for kind, coll in ((STATE, self.states), (CITY, self.cities))
+            for row in coll.iter_postal_index_rows(kind)
+        )
+        if path is not None:
+            index.save(path)
+        if verbose:
+            print(f"postal index: {len(index)} intervals and codes" + (f" | saved to {path}" if path is not None else ""))
+        return index
+
+    def load_postal_index(self, path: str = DEFAULT_POSTAL_INDEX_PATH) -> PostalReverseIndex:
+        """ The index saved by `build_postal_index`, built first if missing."""
+        if not os.path.exists(path):
+            return self.build_postal_index(path=path)
+        return PostalReverseIndex.load(path)
@@ -1,50 +1,114 @@
-from typing import Type, Tuple, List, Generator
+from typing import Type, Tuple, List, Dict, Generator, Iterable, get_args
 from datetime import datetime
 from abc import ABC, abstractmethod
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache, partial
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 import json
-import time
 
-from pymongo import errors
+from pymongo import errors, InsertOne, UpdateOne, ReplaceOne, ASCENDING
 from pymongo.results import UpdateResult
 from pymongo.collection import Collection
 from pymongo.cursor import Cursor
 import numpy as np
 import pandas as pd
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from tenacity import retry, stop_after_attempt, wait_fixed
 
 from geodata.wikidata.search import (
-    search_websites_and_postal_codes, country_code_to_lang,
-    search_id_wikidata, search_name_native, search_name_english
+    search_websites_and_postal_codes, search_websites_and_postal_codes_batch, country_code_to_lang,
+    search_id_wikidata, search_ids_wikidata_batch, search_name_native, search_name_english
 )
 from geodata.db.models.base import (
     GeoZoneModel, OK, EXEC, STATUS, DownType, DownStatus,
     DOWN_ID_WIKIDATA, DOWN_WEBSITES_POSTALS,
     DOWN_NAME_NATIVE_ENGLISH, DOWN_POSTALS_WIKIPEDIA
 )
+from geodata.db.indexes import IndexSpec, IndexReport, apply_index_specs, collscan_queries
 from geodata.db.models.country import Country
 from geodata.db.models.state import State
 from geodata.db.models.city import City
-from geodata.wikipedia.postal_wikipedia import get_postal_codes_from_wikipedia
-from geodata.wikipedia.process_postals.utils import postprocess_postal_codes_wikipedia
+from geodata.wikidata.api import labels_from_ids_wikidata
+from geodata.wikidata.dump import DEFAULT_PROCESSES, map_bounded
+from geodata.wikidata.dump_index import WikidataDumpIndex
+from geodata.wikipedia.postal_wikipedia import (
+    get_postal_codes_from_wikipedia, postal_codes_from_ids_wikidata
+)
+from geodata.wikipedia.process_postals.utils import postprocess_postal_intervals_wikipedia
+from geodata.wikipedia.process_postals.rules import (
+    POSTAL_RULES, normalize_ranges_rows, fingerprint_postal_codes, rules_version
+)
+from geodata.wikipedia.process_postals.intervals import PostalIntervals
+from geodata.csc.sync import (
+    CSCChangeset, HASH, CSC_DELETED, hash_rows_csc,
+    diff_hashes_csc, ids_deleted_csc, split_by_kind
+)
 from geodata.utils_time import UTC
 
 DEFAULT_WORKERS = 5
 COUNTRY_CODE = "country_code"
+COUNTRY_ID_CSC = "country_id_csc"
+STATE_ID_CSC = "state_id_csc"
 CREATED_TIME = "created_time"
 UPDATED_TIME = "updated_time"
 WEBSITES_WIKIDATA = "websites_wikidata"
 POSTAL_CODES_WIKIDATA = "postal_codes_wikidata"
 POSTAL_CODES_WIKIPEDIA = "postal_codes_wikipedia"
 POSTAL_CODES_WIKIPEDIA_CLEAN = "postal_codes_wikipedia_clean"
+POSTAL_CODES_WIKIPEDIA_RANGES = "postal_codes_wikipedia_ranges"
+POSTAL_CODES_WIKIPEDIA_FINGERPRINT = "postal_codes_wikipedia_fingerprint"
+POSTAL_RULES_VERSION = "postal_rules_version"
 
 TENACITY_WAIT = 60
 TENACITY_STOP = 3
+BULK_BATCH_SIZE = 2000
+CSC_HASHES_SUFFIX = "_csc_hashes"
 
 
 def datetime_now_str() -> str:
     return datetime.now(tz=UTC).strftime("%Y_%m_%d_%H_%M_%S")
 
+def fields_to_update_csc(doc_old: dict, doc_new: dict) -> dict:
+    """ Fields of `doc_new` that are missing or None inside `doc_old`."""
+    update_fields = {}
+    for k,v in doc_new.items():
+        if k not in doc_old or (doc_old[k] is None and v is not None):
+            update_fields[k] = v
+    return update_fields
+
+
+def normalize_df_csc(df_csc: pd.DataFrame, current_time: datetime) -> pd.DataFrame:
+    """ Python scalars with None instead of NaN, plus the time columns. Done once for the whole frame."""
+    df = df_csc.astype(object).where(df_csc.notna(), None)
+    df[CREATED_TIME] = current_time
+    df[UPDATED_TIME] = current_time
+    return df
+
+def records_json_df(df: pd.DataFrame) -> List[dict]:
+    """ Rows of `df` as json-serializable dicts, used for the broken report."""
+    return json.loads(df.to_json(orient="records"))
+
+@lru_cache
+def models_adapter(cls_coll: Type[GeoZoneModel]) -> TypeAdapter:
+    """ `TypeAdapter(List[cls_coll])`, built once per model class."""
+    return TypeAdapter(List[cls_coll])
+
+
+class CSCUpsertReport(BaseModel):
+    """ Count of documents touched by a CSC ingestion."""
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    errors: int = 0
+
+    def merge(self, other: "CSCUpsertReport") -> "CSCUpsertReport":
+        return CSCUpsertReport(
+            inserted = self.inserted + other.inserted,
+            updated = self.updated + other.updated,
+            unchanged = self.unchanged + other.unchanged,
+            errors = self.errors + other.errors
+        )
+
 class BaseRegionColl(ABC):
     def __init__(self, coll: Collection):
         self._coll = coll
@@ -94,11 +158,72 @@ class BaseRegionColl(ABC):
     def update_one_status(self, id_csc: int, down_type: DownType, down_status: DownStatus) -> None:
         self.coll.update_one({self.column_id_csc: id_csc}, {"$set": {self.status_key(down_type=down_type): down_status}})
     
+    @property
+    def lookup_columns(self) -> List[str]:
+        """ Join/lookup fields of the collection, each one with its index."""
+        return []
+
+    @property
+    def with_postals(self) -> bool:
+        return True
+
+    @property
+    def index_specs(self) -> List[IndexSpec]:
+        """ Indexes of the collection, see `geodata/db/indexes.py`.
+        - `exec` of every stage as a partial index, `is_status_exec` and `get_filter_models` only look for those.
+        - The fields of `filter_pending`, each branch of the `$or` of the names has its own index.
+        - The postal ones serve each branch of `filter_postals_outdated`, `(country_code, postal_rules_version)` also
+        serves the lookups by `country_code`.
+        """
+        specs = [
+            IndexSpec(((self.column_id_csc, ASCENDING),), unique=True),
+            IndexSpec(((self.column_id_wikidata, ASCENDING),)),
+            IndexSpec(((self.column_name_native, ASCENDING),)),
+            IndexSpec(((self.column_name_english, ASCENDING),)),
+            *(
+                IndexSpec(((status_key, ASCENDING),), partial={status_key: EXEC}, name=f"{status_key}_{EXEC}")
+                for status_key in (self.status_key(down_type=down_type) for down_type in get_args(DownType))
+            ),
+            *(IndexSpec(((column, ASCENDING),)) for column in self.lookup_columns)
+        ]
+        if self.with_postals:
+            specs += [
+                IndexSpec(((POSTAL_CODES_WIKIPEDIA_FINGERPRINT, ASCENDING),)),
+                IndexSpec(((COUNTRY_CODE, ASCENDING), (POSTAL_RULES_VERSION, ASCENDING)))
+            ]
+        return specs
+
+    def set_indexes(self, verbose: bool = True) -> IndexReport:
+        return apply_index_specs(self.coll, self.index_specs, verbose=verbose)
+
+    @property
+    def stage_queries(self) -> Dict[str, dict]:
+        """ `{name: filter}` of the queries of the enrichment stages, checked by `collscan_stage_queries`."""
+        queries = {}
+        for down_type in get_args(DownType):
+            queries[f"{down_type} {EXEC}"] = self.filter_status(down_type=down_type, down_status=EXEC)
+            if (filter_pending := self.filter_pending(down_type)) != {}:
+                queries[f"{down_type} pending"] = filter_pending
+        queries[COUNTRY_CODE] = {COUNTRY_CODE: ""}
+        queries.update((column, {column: 0}) for column in self.lookup_columns)
+        if self.with_postals:
+            queries["postals outdated"] = self.filter_postals_outdated()
+        return queries
+
+    def collscan_stage_queries(self) -> List[str]:
+        """ Names of the `stage_queries` still doing a `COLLSCAN`, empty once `set_indexes` was applied."""
+        return collscan_queries(self.coll, self.stage_queries)
+
     def iter_models(self, search_dict: dict = None) -> Generator[Country | State | City, None, None]:
         if search_dict is None:
             search_dict = {}
         return (self.cls_coll(**model_doc) for model_doc in self.coll.find(search_dict))
 
+    def ids_wikidata_by_id_csc(self) -> Dict[int, str]:
+        """ `{id_csc: id_wikidata}` of the documents already resolved."""
+        cursor = self.coll.find({self.column_id_wikidata: {"$ne": None}}, {self.column_id_csc: 1, self.column_id_wikidata: 1})
+        return {doc[self.column_id_csc]: doc[self.column_id_wikidata] for doc in cursor}
+
     def add_updated_time_to_set(self, dict2set: dict) -> dict:
         current_time = datetime.now(tz=UTC)
         dict2set[UPDATED_TIME] = current_time
@@ -107,6 +232,21 @@ class BaseRegionColl(ABC):
     def update_one_by_id_csc(self, id_csc: int, dict2set: dict) -> UpdateResult:
         return self.coll.update_one({self.column_id_csc: int(id_csc)}, {"$set": dict2set})
 
+    def bulk_set_by_id_csc(self, dicts2set: Dict[int, dict]) -> None:
+        """ One `$set` per `id_csc`, sent in a single unordered `bulk_write`."""
+        operations = [
+            UpdateOne({self.column_id_csc: int(id_csc)}, {"$set": dict2set})
+            for id_csc, dict2set in dicts2set.items()
+        ]
+        if len(operations) != 0:
+            self.coll.bulk_write(operations, ordered=False)
+
+    def update_many_status(self, ids_csc: List[int], down_type: DownType, down_status: DownStatus) -> UpdateResult:
+        return self.coll.update_many(
+            {self.column_id_csc: {"$in": [int(i) for i in ids_csc]}},
+            {"$set": {self.status_key(down_type=down_type): down_status}}
+        )
+
     def update_id_wikidata(self, id_csc: int, id_wikidata: str) -> UpdateResult:
         dict2set = {self.column_id_wikidata: id_wikidata}
         dict2set = self.add_updated_time_to_set(dict2set)
@@ -133,7 +273,7 @@ class BaseRegionColl(ABC):
         return result
 
     def update_postal_codes_wikipedia(self, id_csc: int, postal_codes: List[str]) -> UpdateResult:
-        dict2set = {POSTAL_CODES_WIKIPEDIA: postal_codes}
+        dict2set = {POSTAL_CODES_WIKIPEDIA: postal_codes, POSTAL_CODES_WIKIPEDIA_FINGERPRINT: None}
         dict2set = self.add_updated_time_to_set(dict2set)
         result = self.update_one_by_id_csc(id_csc=id_csc, dict2set=dict2set)
         return result
@@ -144,6 +284,21 @@ class BaseRegionColl(ABC):
         result = self.update_one_by_id_csc(id_csc=id_csc, dict2set=dict2set)
         return result
 
+    def update_postal_codes_wikipedia_ranges(
+            self,
+            id_csc: int,
+            intervals: PostalIntervals,
+            fingerprint: str | None = None,
+            version: int | None = None
+        ) -> UpdateResult:
+        dict2set = {POSTAL_CODES_WIKIPEDIA_RANGES: intervals.to_list()}
+        if fingerprint is not None:
+            dict2set[POSTAL_CODES_WIKIPEDIA_FINGERPRINT] = fingerprint
+            dict2set[POSTAL_RULES_VERSION] = version
+        dict2set = self.add_updated_time_to_set(dict2set)
+        result = self.update_one_by_id_csc(id_csc=id_csc, dict2set=dict2set)
+        return result
+
     @retry(stop=stop_after_attempt(TENACITY_STOP), wait=wait_fixed(TENACITY_WAIT))
     def _search_id_wikidata(self, model: Country | State | City, verbose: bool = True) -> None:
         id_csc, id_wikidata = search_id_wikidata(model)
@@ -170,27 +325,36 @@ class BaseRegionColl(ABC):
             self.coll.update_many(filter_models, {"$set": {status_key: EXEC}})
             return filter_models
 
-    def search_all_none_id_wikidata(self, max_workers: int = DEFAULT_WORKERS, verbose: bool = True, with_concurrent: bool = True) -> None:
-        filter_models = self.get_filter_models(filter_={self.column_id_wikidata: None}, down_type=DOWN_ID_WIKIDATA)
-        models = list(self.iter_models(filter_models))
-        num_docs = len(models)
-
-        if with_concurrent:
-            with ThreadPoolExecutor(max_workers=max_workers) as pool:
-                iter_futures = (pool.submit(self.search_id_wikidata, model, verbose) for model in models)
-                
-                for i, future in enumerate(as_completed(iter_futures), start=1):
-                    future.result()
-                    if verbose:
-                        print(f"{i}/{num_docs}")
+    def filter_pending(self, down_type: DownType) -> dict:
+        """ Documents processed by the enrichment stage `down_type` when none is left in `exec`."""
+        if down_type == DOWN_ID_WIKIDATA:
+            return {self.column_id_wikidata: None}
+        elif down_type == DOWN_NAME_NATIVE_ENGLISH:
+            return {"$or": [{self.column_name_native: None}, {self.column_name_english: None}]}
         else:
-            i = 1
-            while models:
-                model = models.pop(0)
-                self.search_id_wikidata(model, verbose)
-                if verbose:
-                    print(f"{i}/{num_docs}")
-                i += 1
+            return {}
+
+    def set_ids_wikidata_batch(self, ids_wikidata: Dict[int, str | None], verbose: bool = True) -> None:
+        """ Write the `id_wikidata` found, `{id_csc: id_wikidata | None}`."""
+        dicts2set = {
+            id_csc: self.add_updated_time_to_set({self.column_id_wikidata: id_wikidata})
+            for id_csc, id_wikidata in ids_wikidata.items() if id_wikidata is not None
+        }
+        self.bulk_set_by_id_csc(dicts2set)
+        if verbose:
+            for id_csc, dict2set in dicts2set.items():
+                print(f"Updated: {self.column_id_csc}={id_csc} | {self.column_id_wikidata}={dict2set[self.column_id_wikidata]}")
+
+    @retry(stop=stop_after_attempt(TENACITY_STOP), wait=wait_fixed(TENACITY_WAIT))
+    def _search_ids_wikidata_batch(self, models: List[Country | State | City], verbose: bool = True) -> None:
+        self.set_ids_wikidata_batch(search_ids_wikidata_batch(models), verbose=verbose)
+
+    def search_ids_wikidata_batch(self, models: List[Country | State | City], verbose: bool = True) -> None:
+        try:
+            self._search_ids_wikidata_batch(models=models, verbose=verbose)
+            self.update_many_status(ids_csc=[model.id_csc for model in models], down_type=DOWN_ID_WIKIDATA, down_status=OK)
+        except Exception as e:
+            print(e)
 
     @retry(stop=stop_after_attempt(TENACITY_STOP), wait=wait_fixed(TENACITY_WAIT))
     def _search_websites_and_postal_codes(self, model: Country | State | City, verbose: bool = True) -> None:
@@ -212,83 +376,344 @@ class BaseRegionColl(ABC):
         except Exception as e:
             print(e)
     
-    def search_all_websites_and_postal_codes(self, max_workers: int = DEFAULT_WORKERS, verbose: bool = True, with_concurrent: bool = True) -> None:
-        filter_models = self.get_filter_models(filter_={}, down_type=DOWN_WEBSITES_POSTALS)
-        models = list(self.iter_models(filter_models))
-        num_docs = len(models)
-
-        if with_concurrent:
-            with ThreadPoolExecutor(max_workers=max_workers) as pool:
-                iter_futures = (pool.submit(self.search_websites_and_postal_codes, model, verbose) for model in models)
-                for i, future in enumerate(as_completed(iter_futures), start=1):
-                    future.result()
-                    if verbose:
-                        print(f"{i}/{num_docs}")
-        else:
-            i = 1
-            while models:
-                model = models.pop(0)
-                self.search_websites_and_postal_codes(model=model, verbose=verbose)
+    def set_websites_postal_codes_batch(
+            self,
+            models: List[Country | State | City],
+            websites_postals: Dict[str, Tuple[List[str], List[str]]],
+            verbose: bool = True
+        ) -> None:
+        """ Append the new websites and postal codes, `{id_wikidata: (websites, postal_codes)}`."""
+        dicts2set = {}
+        for model in models:
+            if model.id_wikidata is None:
+                continue
+            websites, postal_codes = websites_postals.get(model.id_wikidata, ([], []))
+            websites = list(np.unique([w for w in websites if w not in model.websites_wikidata]))
+            postal_codes = list(np.unique([p for p in postal_codes if p not in model.postal_codes_wikidata]))
+            if len(websites) != 0 or len(postal_codes) != 0:
+                model.websites_wikidata.extend(websites)
+                model.postal_codes_wikidata.extend(postal_codes)
+                dicts2set[model.id_csc] = self.add_updated_time_to_set({
+                    WEBSITES_WIKIDATA: model.websites_wikidata,
+                    POSTAL_CODES_WIKIDATA: model.postal_codes_wikidata
+                })
                 if verbose:
-                    print(f"{i}/{num_docs}")
-                i += 1
+                    print(f"id_csc={model.id_csc} | websites_wikidata={model.websites_wikidata} | postal_codes_wikidata={model.postal_codes_wikidata}")
+        self.bulk_set_by_id_csc(dicts2set)
+
+    @retry(stop=stop_after_attempt(TENACITY_STOP), wait=wait_fixed(TENACITY_WAIT))
+    def _search_websites_and_postal_codes_batch(self, models: List[Country | State | City], verbose: bool = True) -> None:
+        ids_wikidata = [model.id_wikidata for model in models if model.id_wikidata is not None]
+        websites_postals = search_websites_and_postal_codes_batch(ids_wikidata)
+        self.set_websites_postal_codes_batch(models, websites_postals, verbose=verbose)
+
+    def search_websites_and_postal_codes_batch(self, models: List[Country | State | City], verbose: bool = True) -> None:
+        try:
+            self._search_websites_and_postal_codes_batch(models=models, verbose=verbose)
+            self.update_many_status(ids_csc=[model.id_csc for model in models], down_type=DOWN_WEBSITES_POSTALS, down_status=OK)
+        except Exception as e:
+            print(e)
 
     def random_docs(self, size: int = 1) -> List[dict]:
         return list(self.coll.aggregate([{"$sample": {"size": size}}]))
 
-    def upsert_model_csc(self, model_new: Country | State | City) -> bool:
-        """ Return True if is a new document."""
+    def _upsert_model_csc(self, model_new: Country | State | City) -> CSCUpsertReport:
+        """ Report of a single row, a new document is counted as inserted but not written."""
         doc_old = self.coll.find_one({self.column_id_csc: model_new.id_csc})
         doc_new = model_new.model_dump()
         
         if doc_old is None:
-            is_new = True
-            return is_new
+            return CSCUpsertReport(inserted=1)
         else:
-            update_fields = {}
-            for k,v in doc_new.items():
-                if k not in doc_old or (doc_old[k] is None and v is not None):
-                    update_fields[k] = v
-            
+            update_fields = fields_to_update_csc(doc_old, doc_new)
             if update_fields:
                 update_fields[UPDATED_TIME] = doc_new[UPDATED_TIME]
                 self.coll.update_one({self.column_id_csc: model_new.id_csc}, {"$set": update_fields})
-            is_new = False
-            return is_new
+                return CSCUpsertReport(updated=1)
+            return CSCUpsertReport(unchanged=1)
+
+    def upsert_model_csc(self, model_new: Country | State | City) -> bool:
+        """ Return True if is a new document."""
+        is_new = self._upsert_model_csc(model_new).inserted == 1
+        return is_new
+
+    def bulk_upsert_models_csc(self, models_new: List[Country | State | City]) -> CSCUpsertReport:
+        """ Same merge rule as `upsert_model_csc`, but with one `find` and one
+        unordered `bulk_write` for the whole batch."""
+        report = CSCUpsertReport()
+        if len(models_new) == 0:
+            return report
+
+        ids_csc = [model_new.id_csc for model_new in models_new]
+        docs_old = {
+            doc[self.column_id_csc]: doc
+            for doc in self.coll.find({self.column_id_csc: {"$in": ids_csc}}, {"_id": 0})
+        }
+
+        operations = []
+        for model_new in models_new:
+            doc_new = model_new.model_dump()
+            doc_old = docs_old.get(model_new.id_csc)
+            if doc_old is None:
+                operations.append(InsertOne(doc_new))
+                docs_old[model_new.id_csc] = doc_new
+                report.inserted += 1
+            else:
+                update_fields = fields_to_update_csc(doc_old, doc_new)
+                if update_fields:
+                    update_fields[UPDATED_TIME] = doc_new[UPDATED_TIME]
+                    operations.append(UpdateOne({self.column_id_csc: model_new.id_csc}, {"$set": update_fields}))
+                    doc_old.update(update_fields)
+                    report.updated += 1
+                else:
+                    report.unchanged += 1
+
+        if len(operations) != 0:
+            try:
+                self.coll.bulk_write(operations, ordered=False)
+            except errors.BulkWriteError as e:
+                print(e.details)
+                # The failed operations were counted as inserted/updated above.
+                for write_error in e.details.get("writeErrors", []):
+                    if isinstance(operations[write_error["index"]], InsertOne):
+                        report.inserted -= 1
+                    else:
+                        report.updated -= 1
+                    report.errors += 1
+        return report
+
+    def requeue_ids(self, ids_csc: List[int], down_types: List[DownType] | None = None) -> UpdateResult:
+        """ Mark `ids_csc` as `exec` so the next run of each enrichment stage only processes them."""
+        if down_types is None:
+            down_types = list(get_args(DownType))
+        dict2set = {self.status_key(down_type=down_type): EXEC for down_type in down_types}
+        return self.coll.update_many({self.column_id_csc: {"$in": [int(i) for i in ids_csc]}}, {"$set": dict2set})
+
+    @property
+    def coll_csc_hashes(self) -> Collection:
+        """ Content hash of each row of the last CSC sync, `{_id: *_id_csc, hash: int}`."""
+        return self.coll.database[f"{self.coll.name}{CSC_HASHES_SUFFIX}"]
+
+    def load_csc_hashes(self) -> pd.DataFrame:
+        docs = list(self.coll_csc_hashes.find({}, {"_id": 1, HASH: 1}))
+        df_hashes = pd.DataFrame(docs, columns=["_id", HASH]).set_index("_id")
+        df_hashes.index = df_hashes.index.astype(np.int64)
+        return df_hashes
+
+    def save_csc_hashes(self, ids_csc: pd.Series, hashes: pd.Series) -> None:
+        operations = [
+            ReplaceOne({"_id": id_csc}, {"_id": id_csc, HASH: hash_row}, upsert=True)
+            for id_csc, hash_row in zip(ids_csc.astype(int).tolist(), hashes.astype(int).tolist())
+        ]
+        if len(operations) != 0:
+            self.coll_csc_hashes.bulk_write(operations, ordered=False)
+
+    @property
+    def columns_enriched(self) -> List[str]:
+        """ Fields written by the enrichment stages that CSC may also provide (e.g. `wikiDataId`)."""
+        return [self.column_id_wikidata, self.column_name_native, self.column_name_english]
+
+    def bulk_set_fields_csc(self, models: List[Country | State | City], fields: Iterable[str]) -> None:
+        """ Overwrite `fields` with the CSC values, used for the rows that changed upstream.
+        The `columns_enriched` follow the rule of `fields_to_update_csc`: only set where they are missing or None,
+        so a changed row does not lose what the enrichment stages found."""
+        fields = set(fields)
+        fields_enriched = fields.intersection(self.columns_enriched)
+        operations = []
+        for model in models:
+            dict2set = model.model_dump(include=fields - fields_enriched)
+            dict2set[UPDATED_TIME] = model.updated_time
+            operations.append(UpdateOne({self.column_id_csc: model.id_csc}, {"$set": dict2set}))
+            for field, value in model.model_dump(include=fields_enriched).items():
+                if value is not None:
+                    operations.append(UpdateOne({self.column_id_csc: model.id_csc, field: None}, {"$set": {field: value}}))
+        if len(operations) != 0:
+            try:
+                self.coll.bulk_write(operations, ordered=False)
+            except errors.BulkWriteError as e:
+                print(e.details)
 
-    def process_df_csc(self, df_csc: pd.DataFrame, verbose: bool = False) -> None:
+    def sync_df_csc(
+            self,
+            df_csc: pd.DataFrame | Iterable[pd.DataFrame],
+            verbose: bool = False,
+            with_tombstones: bool = False,
+            batch_size: int = BULK_BATCH_SIZE
+        ) -> CSCChangeset:
+        """ Apply only the rows whose content hash changed since the last sync.
+        - New rows are upserted with the same rule as `process_df_csc`.
+        - Changed rows overwrite their CSC fields, except the `columns_enriched` already filled.
+        - Rows missing from the csv are reported, and flagged with `csc_deleted` if `with_tombstones=True`.
+        - Without a previous sync every row counts as inserted.
+        """
+        iter_df_csc = [df_csc] if isinstance(df_csc, pd.DataFrame) else df_csc
+        df_hashes_old = self.load_csc_hashes()
+        changeset = CSCChangeset()
         csc_broken = {"broken": [], "no_country_code": []}
+        ids_seen = []
+        for df_chunk in iter_df_csc:
+            ids_seen.append(df_chunk[self.column_id_csc].to_numpy(dtype=np.int64))
+            is_no_country_code = df_chunk[COUNTRY_CODE].isna()
+            csc_broken["no_country_code"].extend(records_json_df(df_chunk[is_no_country_code]))
+            df_chunk = df_chunk[~is_no_country_code]
+
+            hashes = hash_rows_csc(df_chunk)
+            kinds = diff_hashes_csc(df_chunk[self.column_id_csc], hashes, df_hashes_old)
+            index_inserted, index_updated, num_unchanged = split_by_kind(kinds)
+            changeset.unchanged += num_unchanged
+
+            models_inserted, broken_inserted = self.models_from_df_csc(df_chunk.loc[index_inserted], batch_size=batch_size, verbose=verbose)
+            for start in range(0, len(models_inserted), batch_size):
+                self.bulk_upsert_models_csc(models_inserted[start:start+batch_size])
+            ids_inserted = [model.id_csc for model in models_inserted]
+            self.coll.update_many(
+                {self.column_id_csc: {"$in": ids_inserted}, CSC_DELETED: True},
+                {"$unset": {CSC_DELETED: ""}}
+            )
+
+            models_updated, broken_updated = self.models_from_df_csc(df_chunk.loc[index_updated], batch_size=batch_size, verbose=verbose)
+            for start in range(0, len(models_updated), batch_size):
+                self.bulk_set_fields_csc(models_updated[start:start+batch_size], fields=df_chunk.columns)
+
+            index_broken = list(broken_inserted) + list(broken_updated)
+            csc_broken["broken"].extend(records_json_df(df_chunk.loc[index_broken]))
+            index_applied = index_inserted.union(index_updated).difference(index_broken)
+            self.save_csc_hashes(df_chunk.loc[index_applied, self.column_id_csc], hashes.loc[index_applied])
+
+            changeset.inserted.extend(ids_inserted)
+            changeset.updated.extend(model.id_csc for model in models_updated)
+            changeset.broken += len(index_broken)
+            if verbose:
+                print(changeset.summary())
+
+        changeset.deleted = ids_deleted_csc(df_hashes_old, ids_seen)
+        if with_tombstones and len(changeset.deleted) != 0:
+            dict2set = self.add_updated_time_to_set({CSC_DELETED: True})
+            self.coll.update_many({self.column_id_csc: {"$in": changeset.deleted}}, {"$set": dict2set})
+            self.coll_csc_hashes.delete_many({"_id": {"$in": changeset.deleted}})
+
+        self.dump_csc_broken(csc_broken)
+        return changeset
+
+    def dump_csc_changeset(self, changeset: CSCChangeset) -> str:
+        date_now_str = datetime_now_str()
+        path = f"{self.name_singular}_changeset_{date_now_str}.json"
+        with open(path, "w") as f:
+            f.write(changeset.model_dump_json())
+        return path
+
+    def dump_csc_broken(self, csc_broken: dict) -> None:
+        date_now_str = datetime_now_str()
+        with open(f"{self.name_singular}_broken_{date_now_str}.json", "w") as f:
+            json.dump(csc_broken, f)
+
+    def models_from_df_csc(
+            self,
+            df_csc: pd.DataFrame,
+            batch_size: int = BULK_BATCH_SIZE,
+            verbose: bool = False
+        ) -> Tuple[List[Country | State | City], list]:
+        """ Columnar conversion of `df_csc` into models, validated in batches.
+        - Returns the valid models and the index labels of the broken rows.
+        """
+        df = normalize_df_csc(df_csc, current_time=datetime.now(tz=UTC))
+        records = df.to_dict("records")
+        index = list(df.index)
+        adapter = models_adapter(self.cls_coll)
+
+        models = []
+        broken_index = []
+        for start in range(0, len(records), batch_size):
+            batch = records[start:start+batch_size]
+            try:
+                models.extend(adapter.validate_python(batch))
+            except ValidationError as e:
+                if verbose:
+                    print(e)
+                positions_broken = {err["loc"][0] for err in e.errors() if len(err["loc"]) != 0}
+                broken_index.extend(index[start+k] for k in sorted(positions_broken))
+                batch_ok = [record for k, record in enumerate(batch) if k not in positions_broken]
+                models.extend(adapter.validate_python(batch_ok))
+        return models, broken_index
+
+    def _process_df_csc_bulk(self, iter_df_csc: Iterable[pd.DataFrame], verbose: bool = False, batch_size: int = BULK_BATCH_SIZE) -> CSCUpsertReport:
+        csc_broken = {"broken": [], "no_country_code": []}
+        report = CSCUpsertReport()
+        num_rows = 0
+        for df_chunk in iter_df_csc:
+            num_rows += len(df_chunk)
+            is_no_country_code = df_chunk[COUNTRY_CODE].isna()
+            if verbose and is_no_country_code.any():
+                print(f"no country_code: {int(is_no_country_code.sum())}")
+
+            models_new, broken_index = self.models_from_df_csc(df_chunk[~is_no_country_code], batch_size=batch_size, verbose=verbose)
+            csc_broken["broken"].extend(records_json_df(df_chunk.loc[broken_index]))
+            csc_broken["no_country_code"].extend(records_json_df(df_chunk[is_no_country_code]))
+
+            for start in range(0, len(models_new), batch_size):
+                report = report.merge(self.bulk_upsert_models_csc(models_new[start:start+batch_size]))
+            if verbose:
+                print(f"{num_rows} rows | {report}")
+
+        self.dump_csc_broken(csc_broken)
+        return report
+
+    def process_df_csc(
+            self,
+            df_csc: pd.DataFrame | Iterable[pd.DataFrame],
+            verbose: bool = False,
+            with_bulk: bool = False,
+            batch_size: int = BULK_BATCH_SIZE
+        ) -> CSCUpsertReport:
+        """ Insert the new rows of `df_csc` and fill the fields that are missing or None.
+        - `df_csc` can be a dataframe or an iterable of chunks (`iter_download_csv`), consumed one at a time.
+        - `with_bulk=True`: prefetch the existing ids and write in unordered batches.
+        - Both paths return a `CSCUpsertReport` and, with `verbose`, print it once per chunk.
+        """
+        is_df = isinstance(df_csc, pd.DataFrame)
+        iter_df_csc = [df_csc] if is_df else df_csc
+        if with_bulk:
+            return self._process_df_csc_bulk(iter_df_csc, verbose=verbose, batch_size=batch_size)
+
+        csc_broken = {"broken": [], "no_country_code": []}
+        report = CSCUpsertReport()
+        num_rows = 0
         docs_new = []
-        for i, row in df_csc.iterrows():
-            row_json = json.loads(row.to_json())
-            if row[COUNTRY_CODE] is not None:
-                try:
-                    current_time = datetime.now(tz=UTC)
-                    model_new = self.cls_coll(
-                        created_time = current_time,
-                        updated_time = current_time,
-                        **row_json
-                    )
-                    is_new = self.upsert_model_csc(model_new)
-                    if is_new:
-                        docs_new.append(model_new.model_dump())
-                except Exception as e:
+        for df_chunk in iter_df_csc:
+            num_rows += len(df_chunk)
+            for i, row in df_chunk.iterrows():
+                row_json = json.loads(row.to_json())
+                if row[COUNTRY_CODE] is not None:
+                    try:
+                        current_time = datetime.now(tz=UTC)
+                        model_new = self.cls_coll(
+                            created_time = current_time,
+                            updated_time = current_time,
+                            **row_json
+                        )
+                        report_row = self._upsert_model_csc(model_new)
+                        if report_row.inserted == 1:
+                            docs_new.append(model_new.model_dump())
+                        report = report.merge(report_row)
+                    except Exception as e:
+                        if verbose:
+                            print(e)
+                        csc_broken["broken"].append(row_json)
+                        report.errors += 1
+                else:
                     if verbose:
-                        print(e)
-                    csc_broken["broken"].append(row_json)
-            else:
-                if verbose:
-                    print("no country_code")
-                csc_broken["no_country_code"].append(row_json)
-            
-            print(f"{i+1}/{len(df_csc)}")
-            if i % 2000 == 0:
-                try:
-                    if len(docs_new) != 0:
-                        self.coll.insert_many(docs_new, ordered=False)
-                        docs_new = []
-                except errors.BulkWriteError as e:
-                    print(e.details)
+                        print("no country_code")
+                    csc_broken["no_country_code"].append(row_json)
+                
+                if i % 2000 == 0:
+                    try:
+                        if len(docs_new) != 0:
+                            self.coll.insert_many(docs_new, ordered=False)
+                            docs_new = []
+                    except errors.BulkWriteError as e:
+                        print(e.details)
+            if verbose:
+                print(f"{num_rows} rows | {report}")
         
         try:
             if len(docs_new) != 0:
@@ -297,9 +722,8 @@ class BaseRegionColl(ABC):
         except errors.BulkWriteError as e:
             print(e.details)
         
-        date_now_str = datetime_now_str()
-        with open(f"{self.name_singular}_broken_{date_now_str}.json", "w") as f:
-            json.dump(csc_broken, f)
+        self.dump_csc_broken(csc_broken)
+        return report
 
     def search_name_native_and_english(self, model: Country | State | City, verbose: bool = True) -> None:
         is_all_exec_ok = True
@@ -312,8 +736,6 @@ class BaseRegionColl(ABC):
                 is_all_exec_ok = False
         else:
             name_native = None
-        
-        time.sleep(1)
 
         if model.id_wikidata is not None:
             try:
@@ -342,41 +764,145 @@ class BaseRegionColl(ABC):
         if is_all_exec_ok:
             self.update_one_status(id_csc=model.id_csc, down_type=DOWN_NAME_NATIVE_ENGLISH, down_status=OK)
 
-    def search_all_name_native_and_english(self, max_workers: int = DEFAULT_WORKERS, verbose: bool = True, with_concurrent: bool = True) -> None:
-        _f = {"$or": [{self.column_name_native: None}, {self.column_name_english: None}]}
-        filter_models = self.get_filter_models(filter_=_f, down_type=DOWN_NAME_NATIVE_ENGLISH)
-        models = list(self.iter_models(filter_models))
-        num_docs = len(models)
-        
-        if with_concurrent:
-            with ThreadPoolExecutor(max_workers=max_workers) as pool:
-                iter_futures = (pool.submit(self.search_name_native_and_english, model, verbose) for model in models)
-                for i, future in enumerate(as_completed(iter_futures), start=1):
-                    future.result()
-                    if verbose:
-                        print(f"{i}/{num_docs}")
-        else:
-            i = 1
-            while models:
-                model = models.pop(0)
-                self.search_name_native_and_english(model=model, verbose=verbose)
+    def set_names_native_and_english_batch(
+            self,
+            models: List[Country | State | City],
+            labels: Dict[str, Dict[str, str]],
+            verbose: bool = True
+        ) -> None:
+        """ Fill the missing native and English names from the labels, `{id_wikidata: {lang: label}}`."""
+        langs = {model.id_csc: country_code_to_lang(model.country_code) for model in models}
+        dicts2set = {}
+        for model in models:
+            if model.id_wikidata is None:
+                continue
+            labels_model = labels.get(model.id_wikidata, {})
+            lang = langs[model.id_csc]
+            name_native = labels_model.get(lang) if model.name_native is None and lang != "" else None
+            name_english = labels_model.get("en") if model.name_english is None else None
+
+            dict2set = {}
+            if name_native is not None:
+                dict2set[self.column_name_native] = name_native
+            if name_english is not None:
+                dict2set[self.column_name_english] = name_english
+            if dict2set:
+                dicts2set[model.id_csc] = self.add_updated_time_to_set(dict2set)
                 if verbose:
-                    print(f"{i}/{num_docs}")
-                i += 1
+                    print(" | ".join([f"id_csc={model.id_csc}", *(f"{k}={v}" for k, v in dict2set.items() if k != UPDATED_TIME)]))
+        self.bulk_set_by_id_csc(dicts2set)
+
+    @retry(stop=stop_after_attempt(TENACITY_STOP), wait=wait_fixed(TENACITY_WAIT))
+    def _search_names_native_and_english_batch(self, models: List[Country | State | City], verbose: bool = True) -> None:
+        ids_wikidata = [model.id_wikidata for model in models if model.id_wikidata is not None]
+        languages = ["en", *(country_code_to_lang(model.country_code) for model in models)]
+        labels = labels_from_ids_wikidata(ids_wikidata, languages=languages)
+        self.set_names_native_and_english_batch(models, labels, verbose=verbose)
+
+    def search_names_native_and_english_batch(self, models: List[Country | State | City], verbose: bool = True) -> None:
+        try:
+            self._search_names_native_and_english_batch(models=models, verbose=verbose)
+            self.update_many_status(ids_csc=[model.id_csc for model in models], down_type=DOWN_NAME_NATIVE_ENGLISH, down_status=OK)
+        except Exception as e:
+            print(e)
+
+    def fill_from_dump_batch(
+            self,
+            models: List[Country | State | City],
+            index: WikidataDumpIndex,
+            ids_country: Dict[str, str],
+            ids_state: Dict[int, str] | None = None,
+            verbose: bool = True
+        ) -> None:
+        """ Id wikidata, websites/postal codes and names of a batch, from the local dump index.
+        Only the stages the index could serve are marked `ok`: the models left unresolved, or whose entity is not in
+        the index (filtered or partial dump), are left in `exec` for the online stages."""
+        ids_wikidata = {
+            model.id_csc: index.resolve_id_wikidata(model, ids_country=ids_country, ids_state=ids_state)
+            for model in models if model.id_wikidata is None
+        }
+        self.set_ids_wikidata_batch(ids_wikidata, verbose=verbose)
+        for model in models:
+            if ids_wikidata.get(model.id_csc) is not None:
+                setattr(model, self.column_id_wikidata, ids_wikidata[model.id_csc])
+
+        entities = index.entities(model.id_wikidata for model in models if model.id_wikidata is not None)
+        websites_postals = {id_wikidata: (list(e.websites), list(e.postal_codes)) for id_wikidata, e in entities.items()}
+        self.set_websites_postal_codes_batch(models, websites_postals, verbose=verbose)
+        labels = {id_wikidata: e.labels for id_wikidata, e in entities.items()}
+        self.set_names_native_and_english_batch(models, labels, verbose=verbose)
+
+        is_resolved = {model.id_csc: model.id_wikidata is not None for model in models}
+        is_found = {model.id_csc: model.id_wikidata in entities for model in models}
+        for down_type, is_done in (
+                (DOWN_ID_WIKIDATA, is_resolved),
+                (DOWN_WEBSITES_POSTALS, is_found),
+                (DOWN_NAME_NATIVE_ENGLISH, is_found)
+            ):
+            self.update_many_status(ids_csc=[id_csc for id_csc, done in is_done.items() if done], down_type=down_type, down_status=OK)
+            self.update_many_status(ids_csc=[id_csc for id_csc, done in is_done.items() if not done], down_type=down_type, down_status=EXEC)
+
+    def fill_all_from_dump(
+            self,
+            index: WikidataDumpIndex,
+            ids_country: Dict[str, str],
+            ids_state: Dict[int, str] | None = None,
+            verbose: bool = True,
+            batch_size: int = BULK_BATCH_SIZE
+        ) -> None:
+        """ Offline counterpart of the id wikidata, websites/postal codes and names stages, over every document.
+        - `ids_country`: `{country_code: id_wikidata}`, to match the names within the same country.
+        - `ids_state`: `{state_id_csc: id_wikidata}`, to prefer the cities located in their state.
+        """
+        num_docs = self.coll.count_documents({})
+        iter_models = self.iter_models()
+        i = 0
+        while models := list(islice(iter_models, batch_size)):
+            self.fill_from_dump_batch(models, index, ids_country=ids_country, ids_state=ids_state, verbose=verbose)
+            i += len(models)
+            if verbose:
+                print(f"{i}/{num_docs}")
+
+    def set_postals_wikipedia_from_dump(
+            self,
+            models: List[State | City],
+            titles: Dict[str, str],
+            postals_by_title: Dict[str, List[str]],
+            verbose: bool = True,
+            batch_size: int = BULK_BATCH_SIZE
+        ) -> None:
+        """ Offline counterpart of the postal codes of wikipedia stage of `AsyncEnrichEngine`.
+        - `titles`: `{id_wikidata: enwiki title}`.
+        - `postals_by_title`: from `postal_codes_from_dump`. The models whose article is not in the dump stay pending.
+        """
+        for i in range(0, len(models), batch_size):
+            batch = models[i:i+batch_size]
+            postals = {
+                model.id_wikidata: postals_by_title[titles[model.id_wikidata]]
+                for model in batch if titles.get(model.id_wikidata) in postals_by_title
+            }
+            self.set_postal_codes_wikipedia_batch(batch, postals, verbose=verbose)
+            ids_csc = [
+                model.id_csc for model in batch
+                if titles.get(model.id_wikidata) is None or titles[model.id_wikidata] in postals_by_title
+            ]
+            self.update_many_status(ids_csc=ids_csc, down_type=DOWN_POSTALS_WIKIPEDIA, down_status=OK)
+            if verbose:
+                print(f"{i + len(batch)}/{len(models)}")
 
     def _postprocess_postal_codes_wikipedia(self, model: State | City, verbose: bool = True) -> None:
-        postal_codes_clean = postprocess_postal_codes_wikipedia(model=model)
-        
-        is_updated = False
-        for postal in postal_codes_clean:
-            if postal not in model.postal_codes_wikipedia_clean:
-                model.postal_codes_wikipedia_clean.append(postal)
-                is_updated = True
-        
-        if is_updated:
-            self.update_postal_codes_wikipedia_clean(model.id_csc, model.postal_codes_wikipedia_clean)
+        """ The ranges are recomputed from `postal_codes_wikipedia`, see `normalize_ranges_rows`."""
+        intervals_old = PostalIntervals.from_list(model.postal_codes_wikipedia_ranges)
+        intervals = postprocess_postal_intervals_wikipedia(model=model)
+
+        fingerprint = fingerprint_postal_codes(model.country_code, model.postal_codes_wikipedia)
+        if intervals != intervals_old or fingerprint != model.postal_codes_wikipedia_fingerprint:
+            model.postal_codes_wikipedia_ranges = intervals.to_list()
+            model.postal_codes_wikipedia_fingerprint = fingerprint
+            model.postal_rules_version = rules_version(model.country_code)
+            self.update_postal_codes_wikipedia_ranges(model.id_csc, intervals, fingerprint=fingerprint, version=model.postal_rules_version)
             if verbose:
-                print(f"id_csc={model.id_csc} | postal_codes_wikipedia_clean={model.postal_codes_wikipedia_clean}")
+                print(f"id_csc={model.id_csc} | postal_codes_wikipedia_ranges={model.postal_codes_wikipedia_ranges}")
 
     def postprocess_postal_codes_wikipedia(self, model: State | City, verbose: bool = True) -> None:
         try:
@@ -384,16 +910,142 @@ class BaseRegionColl(ABC):
         except Exception as e:
             print(e)
 
-    def postprocess_all_postal_codes_wikipedia(self, verbose: bool = True) -> None:
-        models = list(self.iter_models())
-        num_docs = len(models)
+    def filter_postals_outdated(self) -> dict:
+        """ Documents to postprocess: never fingerprinted, reset by a writer of `postal_codes_wikipedia`, or normalized
+        with an older rule of their country. Each branch of the `$or` is served by one of the postal `index_specs`."""
+        return {"$or": [
+            {POSTAL_CODES_WIKIPEDIA_FINGERPRINT: None},
+            *(
+                {COUNTRY_CODE: country_code, POSTAL_RULES_VERSION: {"$lt": rules_version(country_code)}}
+                for country_code in POSTAL_RULES.country_codes
+            )
+        ]}
+
+
+    def iter_postals_rows(self, filter_: dict | None = None, batch_size: int = BULK_BATCH_SIZE) -> Generator[List[tuple], None, None]:
+        """ Chunks of `(id_csc, country_code, postal_codes_wikipedia, postal_codes_wikipedia_ranges, fingerprint)`,
+        from a projected cursor over `filter_`, `filter_postals_outdated` by default."""
+        filter_ = self.filter_postals_outdated() if filter_ is None else filter_
+        projection = {
+            "_id": 0, self.column_id_csc: 1, COUNTRY_CODE: 1, POSTAL_CODES_WIKIPEDIA: 1,
+            POSTAL_CODES_WIKIPEDIA_RANGES: 1, POSTAL_CODES_WIKIPEDIA_FINGERPRINT: 1
+        }
+        rows = (
+            (
+                doc[self.column_id_csc], doc[COUNTRY_CODE], doc.get(POSTAL_CODES_WIKIPEDIA, []),
+                doc.get(POSTAL_CODES_WIKIPEDIA_RANGES, []), doc.get(POSTAL_CODES_WIKIPEDIA_FINGERPRINT)
+            )
+            for doc in self.coll.find(filter_, projection, batch_size=batch_size)
+        )
+        while chunk := list(islice(rows, batch_size)):
+            yield chunk
+
+    def iter_postal_index_rows(self, kind: int) -> Generator[Tuple[int, int, str, List[str], List[List[int]]], None, None]:
+        """ `(kind, id_csc, country_code, postal codes, ranges)` of the documents with postal codes, for `PostalReverseIndex.build`.
+        The postal codes are `postal_codes_wikidata` plus the not migrated `postal_codes_wikipedia_clean`."""
+        filter_ = {"$or": [
+            {field: {"$exists": True, "$ne": []}}
+            for field in (POSTAL_CODES_WIKIDATA, POSTAL_CODES_WIKIPEDIA_CLEAN, POSTAL_CODES_WIKIPEDIA_RANGES)
+        ]}
+        projection = {
+            "_id": 0, self.column_id_csc: 1, COUNTRY_CODE: 1, POSTAL_CODES_WIKIDATA: 1,
+            POSTAL_CODES_WIKIPEDIA_CLEAN: 1, POSTAL_CODES_WIKIPEDIA_RANGES: 1
+        }
+        for doc in self.coll.find(filter_, projection, batch_size=BULK_BATCH_SIZE):
+            yield (
+                kind, doc[self.column_id_csc], doc[COUNTRY_CODE],
+                [*(doc.get(POSTAL_CODES_WIKIDATA) or []), *(doc.get(POSTAL_CODES_WIKIPEDIA_CLEAN) or [])],
+                doc.get(POSTAL_CODES_WIKIPEDIA_RANGES) or []
+            )
 
-        i = 1
-        while models:
-            model = models.pop(0)
-            self.postprocess_postal_codes_wikipedia(model=model, verbose=verbose)
-            print(f"{i}/{num_docs}")
-            i += 1
+    def postprocess_all_postal_codes_wikipedia(
+            self,
+            verbose: bool = True,
+            processes: int = DEFAULT_PROCESSES,
+            batch_size: int = BULK_BATCH_SIZE,
+            with_all: bool = False
+        ) -> None:
+        """ `postprocess_postal_codes_wikipedia` of the documents whose fingerprint is outdated, streamed in chunks of `batch_size`.
+        - The parsing runs in `processes` worker processes, `1` parses in this process.
+        - The fingerprints and changed ranges of each chunk are written with one `bulk_write`.
+        - `with_all`: every document, its current fingerprint ignored, e.g. after editing a rule without bumping its version.
+        """
+        chunks = self.iter_postals_rows(filter_={} if with_all else None, batch_size=batch_size)
+        normalize = partial(normalize_ranges_rows, with_all=with_all)
+        num_fingerprinted, num_updated = 0, 0
+        if processes <= 1:
+            iter_rows = map(normalize, chunks)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=processes)
+            iter_rows = map_bounded(executor, normalize, chunks, max_pending=processes * 2)
+        try:
+            for i, rows in enumerate(iter_rows, start=1):
+                dicts2set = {}
+                for row in rows:
+                    dict2set = {POSTAL_CODES_WIKIPEDIA_FINGERPRINT: row.fingerprint, POSTAL_RULES_VERSION: row.version}
+                    if row.ranges is not None:
+                        dict2set = self.add_updated_time_to_set({**dict2set, POSTAL_CODES_WIKIPEDIA_RANGES: row.ranges})
+                    dicts2set[row.id_csc] = dict2set
+                self.bulk_set_by_id_csc(dicts2set)
+                num_fingerprinted += len(rows)
+                num_updated += sum(row.ranges is not None for row in rows)
+                if verbose:
+                    print(f"chunk {i} | {len(rows)} fingerprinted")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        if verbose:
+            print(f"{num_fingerprinted} documents fingerprinted | {num_updated} ranges updated")
+
+    def migrate_postal_codes_wikipedia_ranges(self, verbose: bool = True, batch_size: int = BULK_BATCH_SIZE) -> int:
+        """ Move the expanded `postal_codes_wikipedia_clean` of the documents into `postal_codes_wikipedia_ranges`,
+        merged with the intervals already there, and drop the list. Returns the number of documents migrated.
+        The fingerprint is reset, so the next postprocessing recomputes the ranges with the current rules.
+        """
+        filter_ = {POSTAL_CODES_WIKIPEDIA_CLEAN: {"$exists": True, "$ne": []}}
+        projection = {self.column_id_csc: 1, POSTAL_CODES_WIKIPEDIA_CLEAN: 1, POSTAL_CODES_WIKIPEDIA_RANGES: 1}
+        num_docs = self.coll.count_documents(filter_)
+        num_migrated = 0
+        operations = []
+        for doc in self.coll.find(filter_, projection):
+            intervals = PostalIntervals.from_codes(doc[POSTAL_CODES_WIKIPEDIA_CLEAN]) \
+                | PostalIntervals.from_list(doc.get(POSTAL_CODES_WIKIPEDIA_RANGES))
+            operations.append(UpdateOne(
+                {self.column_id_csc: doc[self.column_id_csc]},
+                {
+                    "$set": {POSTAL_CODES_WIKIPEDIA_RANGES: intervals.to_list(), POSTAL_CODES_WIKIPEDIA_FINGERPRINT: None},
+                    "$unset": {POSTAL_CODES_WIKIPEDIA_CLEAN: ""}
+                }
+            ))
+            if len(operations) == batch_size:
+                self.coll.bulk_write(operations, ordered=False)
+                num_migrated += len(operations)
+                operations = []
+                if verbose:
+                    print(f"{num_migrated}/{num_docs}")
+        if len(operations) != 0:
+            self.coll.bulk_write(operations, ordered=False)
+            num_migrated += len(operations)
+        if verbose:
+            print(f"{num_migrated}/{num_docs}")
+        return num_migrated
+
+    def set_postal_codes_wikipedia_batch(self, models: List[State | City], postals: Dict[str, List[str]], verbose: bool = True) -> None:
+        """ Append the new postal codes of wikipedia, `{id_wikidata: postal_codes}`."""
+        dicts2set = {}
+        for model in models:
+            postal_codes = postals.get(model.id_wikidata, [])
+            postal_codes = list(np.unique([p for p in postal_codes if p not in model.postal_codes_wikipedia]))
+            if len(postal_codes) != 0:
+                model.postal_codes_wikipedia.extend(postal_codes)
+                dicts2set[model.id_csc] = self.add_updated_time_to_set({
+                    POSTAL_CODES_WIKIPEDIA: model.postal_codes_wikipedia,
+                    POSTAL_CODES_WIKIPEDIA_FINGERPRINT: None
+                })
+                if verbose:
+                    print(f"id_csc={model.id_csc} | postal_codes_wikipedia={model.postal_codes_wikipedia}")
+        self.bulk_set_by_id_csc(dicts2set)
 
     @retry(stop=stop_after_attempt(TENACITY_STOP), wait=wait_fixed(TENACITY_WAIT))
     def _search_postals_wikipedia(self, model: Country | State | City, verbose: bool = True) -> None:
@@ -413,23 +1065,14 @@ class BaseRegionColl(ABC):
         except Exception as e:
             print(e)
 
-    def search_all_postals_wikipedia(self, max_workers: int = DEFAULT_WORKERS, verbose: bool = True, with_concurrent: bool = True) -> None:
-        filter_models = self.get_filter_models(filter_={}, down_type=DOWN_POSTALS_WIKIPEDIA)
-        models = list(self.iter_models(filter_models))
-        num_docs = len(models)
-        
-        if with_concurrent:
-            with ThreadPoolExecutor(max_workers=max_workers) as pool:
-                iter_futures = (pool.submit(self.search_postals_wikipedia, model, verbose) for model in models)
-                for i, future in enumerate(as_completed(iter_futures), start=1):
-                    future.result()
-                    if verbose:
-                        print(f"{i}/{num_docs}")
-        else:
-            i = 1
-            while models:
-                model = models.pop(0)
-                self.search_postals_wikipedia(model=model, verbose=verbose)
-                if verbose:
-                    print(f"{i}/{num_docs}")
-                i += 1
\ No newline at end of file
+    @retry(stop=stop_after_attempt(TENACITY_STOP), wait=wait_fixed(TENACITY_WAIT))
+    def _search_postals_wikipedia_batch(self, models: List[State | City], verbose: bool = True) -> None:
+        postals = postal_codes_from_ids_wikidata([model.id_wikidata for model in models if model.id_wikidata is not None])
+        self.set_postal_codes_wikipedia_batch(models, postals, verbose=verbose)
+
+    def search_postals_wikipedia_batch(self, models: List[State | City], verbose: bool = True) -> None:
+        try:
+            self._search_postals_wikipedia_batch(models=models, verbose=verbose)
+            self.update_many_status(ids_csc=[model.id_csc for model in models], down_type=DOWN_POSTALS_WIKIPEDIA, down_status=OK)
+        except Exception as e:
+            print(e)
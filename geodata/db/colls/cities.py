@@ -1,7 +1,15 @@
+from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from pymongo.collection import Collection
+from tenacity import retry, stop_after_attempt, wait_fixed
 
-from geodata.db.colls.base import BaseRegionColl
+from geodata.db.colls.base import BaseRegionColl, DEFAULT_WORKERS, TENACITY_STOP, TENACITY_WAIT, COUNTRY_ID_CSC, STATE_ID_CSC
+from geodata.db.models.base import OK, DOWN_ID_WIKIDATA
 from geodata.db.models.city import City
+from geodata.wikidata.search import search_cities_ids_wikidata_in_state
+
+FALLBACK_BATCH_SIZE = 50
 
 class CitiesColl(BaseRegionColl):
     def __init__(self, coll: Collection):
@@ -14,3 +22,84 @@ class CitiesColl(BaseRegionColl):
     @property
     def cls_coll(self) -> City:
         return City
+
+    @property
+    def lookup_columns(self) -> List[str]:
+        return [STATE_ID_CSC, COUNTRY_ID_CSC]
+
+    @retry(stop=stop_after_attempt(TENACITY_STOP), wait=wait_fixed(TENACITY_WAIT))
+    def _search_ids_wikidata_in_state(
+            self,
+            id_state_wikidata: str,
+            cities: List[City],
+            recursive: bool = True,
+            verbose: bool = True
+        ) -> Dict[int, str | None]:
+        ids_wikidata = search_cities_ids_wikidata_in_state(id_state_wikidata, cities, recursive=recursive)
+        self.set_ids_wikidata_batch(ids_wikidata, verbose=verbose)
+        return ids_wikidata
+
+    def search_ids_wikidata_in_state(
+            self,
+            id_state_wikidata: str | None,
+            cities: List[City],
+            verbose: bool = True,
+            with_fallback: bool = True
+        ) -> None:
+        """ Resolve the cities of one state with the settlements directly in it (`P131`), then the missed ones with
+        the settlements anywhere below it (`P131*`). `with_fallback` the cities still missed, or all the cities not
+        resolved when a state query fails, go to `search_ids_wikidata_batch` (whole country, by exact label)."""
+        cities_missed = cities
+        if id_state_wikidata is not None:
+            for recursive in (False, True):
+                if len(cities_missed) == 0:
+                    break
+                try:
+                    ids_wikidata = self._search_ids_wikidata_in_state(id_state_wikidata, cities_missed, recursive=recursive, verbose=verbose)
+                except Exception as e:
+                    print(e)
+                    break
+                ids_csc_found = [city.id_csc for city in cities_missed if ids_wikidata.get(city.id_csc) is not None]
+                self.update_many_status(ids_csc=ids_csc_found, down_type=DOWN_ID_WIKIDATA, down_status=OK)
+                cities_missed = [city for city in cities_missed if ids_wikidata.get(city.id_csc) is None]
+                if recursive and not with_fallback:
+                    self.update_many_status(ids_csc=[city.id_csc for city in cities_missed], down_type=DOWN_ID_WIKIDATA, down_status=OK)
+
+        if not with_fallback:
+            return
+        for i in range(0, len(cities_missed), FALLBACK_BATCH_SIZE):
+            self.search_ids_wikidata_batch(cities_missed[i:i+FALLBACK_BATCH_SIZE], verbose=verbose)
+
+    def search_all_none_id_wikidata_by_state(
+            self,
+            ids_state: Dict[int, str],
+            max_workers: int = DEFAULT_WORKERS,
+            verbose: bool = True,
+            with_concurrent: bool = True,
+            with_fallback: bool = True
+        ) -> None:
+        """ The id wikidata stage of the cities scoped by state: one or two queries per state (`P131`, then `P131*`)
+        instead of one per city.
+        - `ids_state`: `{state_id_csc: state_id_wikidata}`, the states must be resolved first.
+        """
+        filter_models = self.get_filter_models(filter_=self.filter_pending(DOWN_ID_WIKIDATA), down_type=DOWN_ID_WIKIDATA)
+        cities_by_state: Dict[int, List[City]] = {}
+        for city in self.iter_models(filter_models):
+            cities_by_state.setdefault(city.state_id_csc, []).append(city)
+        num_states = len(cities_by_state)
+
+        def search_state(state_id_csc: int) -> None:
+            self.search_ids_wikidata_in_state(ids_state.get(state_id_csc), cities_by_state[state_id_csc], verbose=verbose, with_fallback=with_fallback)
+
+        if with_concurrent:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                futures = [pool.submit(search_state, state_id_csc) for state_id_csc in cities_by_state]
+                for i, future in enumerate(as_completed(futures), start=1):
+                    future.result()
+                    if verbose:
+                        print(f"{i}/{num_states} states")
+        else:
+            for i, state_id_csc in enumerate(cities_by_state, start=1):
+                search_state(state_id_csc)
+                if verbose:
+                    print(f"{i}/{num_states} states")
@@ -1,6 +1,8 @@
+from typing import List
+
 from pymongo.collection import Collection
 
-from geodata.db.colls.base import BaseRegionColl
+from geodata.db.colls.base import BaseRegionColl, COUNTRY_CODE
 from geodata.db.models.country import Country
 
 class CountriesColl(BaseRegionColl):
@@ -14,6 +16,11 @@ class CountriesColl(BaseRegionColl):
     @property
     def cls_coll(self) -> Country:
         return Country
-    
-    def search_all_postals_wikipedia(self, *args, **kwargs) -> None:
-        raise NotImplementedError("The countries have no apparent postal code.")
\ No newline at end of file
+
+    @property
+    def lookup_columns(self) -> List[str]:
+        return [COUNTRY_CODE]
+
+    @property
+    def with_postals(self) -> bool:
+        return False
\ No newline at end of file
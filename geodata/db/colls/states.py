@@ -1,6 +1,8 @@
+from typing import List
+
 from pymongo.collection import Collection
 
-from geodata.db.colls.base import BaseRegionColl
+from geodata.db.colls.base import BaseRegionColl, COUNTRY_ID_CSC
 from geodata.db.models.state import State
 
 class StatesColl(BaseRegionColl):
@@ -13,4 +15,8 @@ class StatesColl(BaseRegionColl):
     
     @property
     def cls_coll(self) -> State:
-        return State
\ No newline at end of file
+        return State
+
+    @property
+    def lookup_columns(self) -> List[str]:
+        return [COUNTRY_ID_CSC]
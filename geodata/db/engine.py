@@ -0,0 +1,212 @@
+""" asyncio enrichment engine of the four stages run by `WorldDataDB.download_*`:
+id wikidata, websites/postal codes, native/English names and postal codes of wikipedia.
+- The models are streamed from the cursor in batches, a bounded number of batches is in flight.
+- HTTP goes through `AsyncHttpClient` (semaphore per host + shared `RateLimiter` and `ResponseCache`).
+- pymongo has no asyncio API, the bulk writes run in the default thread pool with `asyncio.to_thread`.
+- A failed batch (timeout, connection reset, 5xx...) is retried with exponential backoff, the `id_csc`s of the
+batches still failing are kept in `failed_ids_csc` and stay pending for the next run.
+"""
+from typing import Dict, List, Tuple
+from itertools import islice
+import asyncio
+
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential, retry_if_not_exception_type
+
+from geodata.http_async import AsyncHttpClient
+from geodata.response_cache import CacheMissError
+from geodata.http_session import HTTP_CLIENT
+from geodata.db.colls.base import BaseRegionColl, TENACITY_STOP, TENACITY_WAIT
+from geodata.db.models.base import (
+    DownType, OK, DOWN_ID_WIKIDATA, DOWN_WEBSITES_POSTALS,
+    DOWN_NAME_NATIVE_ENGLISH, DOWN_POSTALS_WIKIPEDIA
+)
+from geodata.db.models.country import Country
+from geodata.db.models.state import State
+from geodata.db.models.city import City
+from geodata.wikidata.sparql import url_wikidata_sparql, ACCEPT_SPARQL_JSON
+from geodata.wikidata.querys import query_websites_and_postal_codes_batch
+from geodata.wikidata.search import (
+    query_ids_wikidata_batch, ids_wikidata_from_results_batch,
+    models_language_fallback, websites_postals_from_results_batch
+)
+from geodata.wikidata.lang import country_code_to_lang
+from geodata.wikidata.api import (
+    URL_WIKIDATA_API, MAX_IDS_WBGETENTITIES, LABELS,
+    params_wbgetentities, labels_from_data, join_languages
+)
+from geodata.wikipedia.postal_wikipedia import (
+    URL_WIKIPEDIA_API, MAX_TITLES_QUERY, SECTION_FETCH_STATS, params_wikipedia_titles, wikipedia_titles_from_data,
+    params_wikipedia_contents, params_continue, contents_from_data, postal_codes_from_titles
+)
+
+DEFAULT_BATCHES_IN_FLIGHT = 16
+DEFAULT_RETRY_WAIT = 2.0
+MAX_FAILED_IDS_LOGGED = 10
+DEFAULT_BATCH_SIZES = {
+    DOWN_ID_WIKIDATA: 50,
+    DOWN_WEBSITES_POSTALS: 200,
+    DOWN_NAME_NATIVE_ENGLISH: 50,
+    DOWN_POSTALS_WIKIPEDIA: 50
+}
+
+
+def _next_batch(iter_models, batch_size: int) -> list:
+    return list(islice(iter_models, batch_size))
+
+
+class AsyncEnrichEngine:
+    def __init__(
+            self,
+            http_client: AsyncHttpClient | None = None,
+            batches_in_flight: int = DEFAULT_BATCHES_IN_FLIGHT,
+            retries: int = TENACITY_STOP,
+            retry_wait: float = DEFAULT_RETRY_WAIT,
+            verbose: bool = True
+        ):
+        """
+        - `retries`: attempts per batch, waiting `retry_wait`, then twice as long... up to `TENACITY_WAIT` seconds.
+        """
+        self._http_client = AsyncHttpClient(cache=HTTP_CLIENT.cache) if http_client is None else http_client
+        self._batches_in_flight = batches_in_flight
+        self._retries = retries
+        self._retry_wait = retry_wait
+        self._verbose = verbose
+        self._failed_ids_csc: Dict[str, List[int]] = {}
+
+    @property
+    def http_client(self) -> AsyncHttpClient:
+        return self._http_client
+
+    @property
+    def verbose(self) -> bool:
+        return self._verbose
+
+    @property
+    def failed_ids_csc(self) -> Dict[str, List[int]]:
+        """ `{collection name: id_csc}` of the batches that still failed after the retries."""
+        return self._failed_ids_csc
+
+    async def sparql(self, query: str) -> dict:
+        return await self.http_client.post_json(url_wikidata_sparql(), data={"query": query}, headers={"Accept": ACCEPT_SPARQL_JSON})
+
+    async def _ids_wikidata(self, coll: BaseRegionColl, models: List[Country | State | City]) -> None:
+        ids_wikidata = ids_wikidata_from_results_batch(await self.sparql(query_ids_wikidata_batch(models)), models)
+        models_missed, languages_missed = models_language_fallback(models, ids_wikidata)
+        if len(models_missed) != 0:
+            results = await self.sparql(query_ids_wikidata_batch(models_missed, languages_missed))
+            ids_wikidata.update(ids_wikidata_from_results_batch(results, models_missed))
+        await asyncio.to_thread(coll.set_ids_wikidata_batch, ids_wikidata, self.verbose)
+
+    async def _websites_postals(self, coll: BaseRegionColl, models: List[Country | State | City]) -> None:
+        ids_wikidata = [model.id_wikidata for model in models if model.id_wikidata is not None]
+        websites_postals = {}
+        if len(ids_wikidata) != 0:
+            results = await self.sparql(query_websites_and_postal_codes_batch(ids_wikidata))
+            websites_postals = websites_postals_from_results_batch(results, ids_wikidata)
+        await asyncio.to_thread(coll.set_websites_postal_codes_batch, models, websites_postals, self.verbose)
+
+    async def _names_native_english(self, coll: BaseRegionColl, models: List[Country | State | City]) -> None:
+        ids_wikidata = list(dict.fromkeys(model.id_wikidata for model in models if model.id_wikidata is not None))
+        languages = join_languages(["en", *(country_code_to_lang(model.country_code) for model in models)])
+        responses = await asyncio.gather(*(
+            self.http_client.get_json(URL_WIKIDATA_API, params=params_wbgetentities(ids_wikidata[i:i+MAX_IDS_WBGETENTITIES], props=LABELS, languages=languages))
+            for i in range(0, len(ids_wikidata), MAX_IDS_WBGETENTITIES)
+        ))
+        labels = {}
+        for data in responses:
+            labels.update(labels_from_data(data))
+        await asyncio.to_thread(coll.set_names_native_and_english_batch, models, labels, self.verbose)
+
+    async def _contents_wikipedia(self, wikipedia_titles: List[str]) -> Dict[str, str]:
+        contents = {}
+        params = params_wikipedia_contents(wikipedia_titles)
+        while params is not None:
+            data = await self.http_client.get_json(URL_WIKIPEDIA_API, params=params)
+            SECTION_FETCH_STATS.add_data(data)
+            contents.update(contents_from_data(data, wikipedia_titles))
+            params = params_continue(params, data)
+        return contents
+
+    async def _postals_wikipedia(self, coll: BaseRegionColl, models: List[State | City]) -> None:
+        ids_wikidata = list(dict.fromkeys(model.id_wikidata for model in models if model.id_wikidata is not None))
+        responses = await asyncio.gather(*(
+            self.http_client.get_json(URL_WIKIDATA_API, params=params_wikipedia_titles(ids_wikidata[i:i+MAX_IDS_WBGETENTITIES]))
+            for i in range(0, len(ids_wikidata), MAX_IDS_WBGETENTITIES)
+        ))
+        titles = {}
+        for data in responses:
+            titles.update(wikipedia_titles_from_data(data))
+        wikipedia_titles = list(dict.fromkeys(titles.values()))
+        responses = await asyncio.gather(*(
+            self._contents_wikipedia(wikipedia_titles[i:i+MAX_TITLES_QUERY])
+            for i in range(0, len(wikipedia_titles), MAX_TITLES_QUERY)
+        ))
+        contents = {}
+        for contents_chunk in responses:
+            contents.update(contents_chunk)
+        postals = postal_codes_from_titles(titles, contents)
+        await asyncio.to_thread(coll.set_postal_codes_wikipedia_batch, models, postals, self.verbose)
+
+    def _fn_stage(self, down_type: DownType):
+        return {
+            DOWN_ID_WIKIDATA: self._ids_wikidata,
+            DOWN_WEBSITES_POSTALS: self._websites_postals,
+            DOWN_NAME_NATIVE_ENGLISH: self._names_native_english,
+            DOWN_POSTALS_WIKIPEDIA: self._postals_wikipedia
+        }[down_type]
+
+    async def _run_stage(self, down_type: DownType, coll: BaseRegionColl, models: List[Country | State | City]) -> None:
+        """ The stage of one batch, retried with exponential backoff. A cache miss in replay mode is not retried."""
+        retrying = AsyncRetrying(
+            stop = stop_after_attempt(self._retries),
+            wait = wait_exponential(multiplier=self._retry_wait, max=TENACITY_WAIT),
+            retry = retry_if_not_exception_type(CacheMissError),
+            reraise = True
+        )
+        async for attempt in retrying:
+            with attempt:
+                await self._fn_stage(down_type)(coll, models)
+
+    async def _run_batch(self, down_type: DownType, coll: BaseRegionColl, models: List[Country | State | City]) -> None:
+        ids_csc = [model.id_csc for model in models]
+        try:
+            await self._run_stage(down_type, coll, models)
+            await asyncio.to_thread(coll.update_many_status, ids_csc, down_type, OK)
+        except Exception as e:
+            self._failed_ids_csc.setdefault(coll.coll.name, []).extend(ids_csc)
+            ids_logged = ", ".join(map(str, ids_csc[:MAX_FAILED_IDS_LOGGED])) + (", ..." if len(ids_csc) > MAX_FAILED_IDS_LOGGED else "")
+            print(f"{down_type} | {coll.coll.name}: batch of {len(ids_csc)} failed, left pending | {type(e).__name__}: {e} | id_csc={ids_logged}")
+
+    async def run_coll(self, down_type: DownType, coll: BaseRegionColl, batch_size: int | None = None) -> int:
+        """ Run one stage over the pending documents of `coll`. Returns the number of documents processed."""
+        batch_size = DEFAULT_BATCH_SIZES[down_type] if batch_size is None else batch_size
+        filter_models = await asyncio.to_thread(coll.get_filter_models, filter_=coll.filter_pending(down_type), down_type=down_type)
+        iter_models = coll.iter_models(filter_models)
+
+        semaphore = asyncio.Semaphore(self._batches_in_flight)
+        tasks = set()
+        num_docs = 0
+        while models := await asyncio.to_thread(_next_batch, iter_models, batch_size):
+            await semaphore.acquire()
+            task = asyncio.create_task(self._run_batch(down_type, coll, models))
+            task.add_done_callback(lambda t: semaphore.release())
+            task.add_done_callback(tasks.discard)
+            tasks.add(task)
+            num_docs += len(models)
+            if self.verbose:
+                print(f"{num_docs} queued | {num_docs - len(tasks)} done")
+        await asyncio.gather(*tasks)
+        return num_docs
+
+    async def run(self, down_type: DownType, colls: List[Tuple[str, BaseRegionColl]], batch_size: int | None = None) -> Dict[str, int]:
+        """ Run one stage over each `(name, coll)`, in order. Returns the documents processed per name."""
+        num_docs = {}
+        async with self.http_client:
+            for name, coll in colls:
+                num_docs[name] = await self.run_coll(down_type, coll, batch_size=batch_size)
+                if self.verbose:
+                    num_failed = len(self.failed_ids_csc.get(coll.coll.name, []))
+                    print(f"{name}: {num_docs[name]} documents | {num_failed} failed")
+        if self.verbose and down_type == DOWN_POSTALS_WIKIPEDIA:
+            print(f"wikipedia section 0: {SECTION_FETCH_STATS.stats()}")
+        return num_docs
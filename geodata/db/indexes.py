@@ -0,0 +1,96 @@
+""" Declarative indexes of the collections, applied idempotently, and an `explain` check of the stage queries.
+- Each collection declares its `IndexSpec`s (`BaseRegionColl.index_specs`): the unique `*_id_csc`, the fields of the
+"still pending" filters, the join fields and the postal ones.
+- The `exec` status of each enrichment stage is a partial index, it only holds the documents in `exec`.
+- `apply_index_specs` compares the specs with `index_information`: missing indexes are created, the ones whose
+keys or options changed are rebuilt, the rest are left as they are.
+- `collscan_queries` runs `explain` on the stage queries and returns the ones whose winning plan still has a `COLLSCAN`.
+"""
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+from pymongo import IndexModel
+from pymongo.collection import Collection
+
+COLLSCAN = "COLLSCAN"
+
+
+class IndexSpec(NamedTuple):
+    keys: Tuple[Tuple[str, int], ...]
+    unique: bool = False
+    partial: dict | None = None
+    name: str | None = None
+
+    @property
+    def index_name(self) -> str:
+        """ `name`, or the default name of Mongo (`field_1_field_1`)."""
+        return self.name or "_".join(f"{field}_{direction}" for field, direction in self.keys)
+
+    def to_model(self) -> IndexModel:
+        options = {"name": self.index_name}
+        if self.unique:
+            options["unique"] = True
+        if self.partial is not None:
+            options["partialFilterExpression"] = self.partial
+        return IndexModel(list(self.keys), **options)
+
+    def is_same(self, info: dict) -> bool:
+        """ Same keys and options as an entry of `index_information`."""
+        keys = tuple((field, int(direction)) for field, direction in info["key"])
+        partial = info.get("partialFilterExpression")
+        return (
+            keys == self.keys
+            and bool(info.get("unique", False)) == self.unique
+            and (dict(partial) if partial is not None else None) == self.partial
+        )
+
+
+class IndexReport(NamedTuple):
+    created: List[str]
+    replaced: List[str]
+    kept: List[str]
+
+
+def apply_index_specs(coll: Collection, specs: List[IndexSpec], verbose: bool = True) -> IndexReport:
+    """ Create the missing indexes of `specs` and rebuild the changed ones, by name. Other indexes are not touched."""
+    info = coll.index_information()
+    to_create, report = [], IndexReport(created=[], replaced=[], kept=[])
+    for spec in specs:
+        name = spec.index_name
+        if name not in info:
+            report.created.append(name)
+        elif not spec.is_same(info[name]):
+            coll.drop_index(name)
+            report.replaced.append(name)
+        else:
+            report.kept.append(name)
+            continue
+        to_create.append(spec.to_model())
+    if len(to_create) != 0:
+        coll.create_indexes(to_create)
+    if verbose:
+        print(f"{coll.name} | created: {report.created} | replaced: {report.replaced} | kept: {len(report.kept)}")
+    return report
+
+
+def plan_stages(plan: dict | list) -> Set[str]:
+    """ Every `stage` of an `explain` plan, whatever its nesting (`inputStage`, `inputStages`, `queryPlan`...)."""
+    stages = set()
+    if isinstance(plan, dict):
+        if isinstance(plan.get("stage"), str):
+            stages.add(plan["stage"])
+        for value in plan.values():
+            stages |= plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            stages |= plan_stages(value)
+    return stages
+
+
+def collscan_queries(coll: Collection, queries: Dict[str, dict]) -> List[str]:
+    """ Names of the `{name: filter}` queries whose winning plan has a `COLLSCAN`."""
+    names = []
+    for name, filter_ in queries.items():
+        explain = coll.find(filter_).explain()
+        if COLLSCAN in plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {})):
+            names.append(name)
+    return names
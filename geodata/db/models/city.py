@@ -14,6 +14,9 @@ class City(GeoZoneModel):
     city_id_wikidata: Optional[str] = None
     postal_codes_wikipedia: List[str] = Field(default_factory=list)
     postal_codes_wikipedia_clean: List[str] = Field(default_factory=list)
+    postal_codes_wikipedia_ranges: List[List[int]] = Field(default_factory=list)
+    postal_codes_wikipedia_fingerprint: Optional[str] = None
+    postal_rules_version: Optional[int] = None
     municipality_street: Optional[str] = None
     municipality_postal_code: Optional[str] = None
     municipality_place: Optional[str] = None
@@ -0,0 +1,204 @@
+""" In-memory reverse index postal code -> `state_id_csc`/`city_id_csc`, for exact, prefix and range lookups.
+- Built from `postal_codes_wikidata`, `postal_codes_wikipedia_ranges` and the not migrated `postal_codes_wikipedia_clean`.
+- The range strings of wikidata (`01067–01328`) are parsed with `POSTAL_RULES`, or split on the dash for the countries
+without a rule, into intervals.
+- Numeric codes are kept as `[start, end]` intervals per `(country, width)`, sorted by start, without expanding the ranges.
+The few long intervals (e.g. a whole state) are kept apart and compared in full, so a lookup only slices the short ones.
+- The other codes (`SW1A 1AA`) are a sorted string array per country.
+- `save`/`load` keep it as flat numpy arrays in one `.npz`.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+from collections import defaultdict
+import os
+import re
+
+import numpy as np
+
+from geodata.wikipedia.process_postals.intervals import Interval, PostalIntervals
+from geodata.wikipedia.process_postals.rules import POSTAL_RULES
+from geodata.wikipedia.utils import DASHES_TABLE
+
+STATE = 0
+CITY = 1
+MAX_SHORT_SPAN = 256
+DEFAULT_POSTAL_INDEX_PATH = ".cache_postal/postal_index.npz"
+NO_KEYS = np.empty(0, dtype=np.int64)
+RE_DASH_RANGE = re.compile(r"(\d+)\s*-\s*(\d+)")
+
+
+class PostalMatches(NamedTuple):
+    states_id_csc: List[int]
+    cities_id_csc: List[int]
+
+
+def normalize_postal_code(code: str) -> str:
+    return " ".join(code.upper().split())
+
+def code_intervals(country_code: str, code: str) -> List[Interval] | None:
+    """ Intervals of a code or range string, `None` if it is not numeric (kept as a string code).
+    `POSTAL_RULES` first, else a single `start-end` range of digits of the same width."""
+    if code.isdigit():
+        return [(int(code), int(code), len(code))]
+    intervals = POSTAL_RULES.normalize(country_code, code)
+    if intervals:
+        return intervals
+    match = RE_DASH_RANGE.fullmatch(code.translate(DASHES_TABLE).strip())
+    if match is None:
+        return None
+    start, end = match.groups()
+    if len(start) != len(end) or int(start) > int(end):
+        return None
+    return [(int(start), int(end), len(start))]
+
+def _keys(kinds: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """ `id << 1 | kind`: one array to slice per lookup instead of two."""
+    return (ids.astype(np.int64) << 1) | kinds.astype(np.int64)
+
+def _matches(keys: np.ndarray) -> PostalMatches:
+    """ Sorted, unique ids. The matches are few, so they are deduplicated in python (`np.unique` costs more per call)."""
+    keys = set(keys.tolist())
+    return PostalMatches(
+        states_id_csc = sorted(key >> 1 for key in keys if key & 1 == STATE),
+        cities_id_csc = sorted(key >> 1 for key in keys if key & 1 == CITY)
+    )
+
+
+class _IntervalGroup:
+    """ Intervals of one `(country, width)`, split in short (sorted by start) and long."""
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, keys: np.ndarray):
+        is_long = (ends - starts) > MAX_SHORT_SPAN
+        order = np.argsort(starts[~is_long], kind="stable")
+        self.starts, self.ends, self.keys = starts[~is_long][order], ends[~is_long][order], keys[~is_long][order]
+        self.max_span = int((self.ends - self.starts).max()) if len(self.starts) != 0 else 0
+        self.long_starts, self.long_ends, self.long_keys = starts[is_long], ends[is_long], keys[is_long]
+
+    def overlap(self, lo: int, hi: int) -> np.ndarray:
+        """ Keys of the intervals overlapping `[lo, hi]`."""
+        i = self.starts.searchsorted(lo - self.max_span, side="left")
+        j = self.starts.searchsorted(hi, side="right")
+        keys = self.keys[i:j][self.ends[i:j] >= lo]
+        if len(self.long_keys) == 0:
+            return keys
+        return np.concatenate([keys, self.long_keys[(self.long_starts <= hi) & (self.long_ends >= lo)]])
+
+
+class _StringGroup:
+    """ Non-numeric codes of one country, sorted."""
+    def __init__(self, codes: np.ndarray, keys: np.ndarray):
+        order = np.argsort(codes, kind="stable")
+        self.codes, self.keys = codes[order], keys[order]
+
+    def between(self, lo: str, hi: str) -> np.ndarray:
+        i = self.codes.searchsorted(lo, side="left")
+        j = self.codes.searchsorted(hi, side="right")
+        return self.keys[i:j]
+
+
+class PostalReverseIndex:
+    def __init__(self, intervals: Dict[str, np.ndarray], strings: Dict[str, np.ndarray]):
+        """ Flat arrays, see `build`: intervals `country, width, start, end, kind, id` and strings `country, code, kind, id`."""
+        self._intervals = intervals
+        self._strings = strings
+        self._groups: Dict[Tuple[str, int], _IntervalGroup] = {}
+        self._widths: Dict[str, List[int]] = defaultdict(list)
+        keys = np.rec.fromarrays([intervals["country"], intervals["width"]])
+        for (country_code, width) in np.unique(keys).tolist():
+            mask = (intervals["country"] == country_code) & (intervals["width"] == width)
+            self._groups[(country_code, width)] = _IntervalGroup(
+                intervals["start"][mask], intervals["end"][mask], _keys(intervals["kind"][mask], intervals["id"][mask])
+            )
+            self._widths[country_code].append(width)
+        self._string_groups: Dict[str, _StringGroup] = {}
+        for country_code in np.unique(strings["country"]).tolist():
+            mask = strings["country"] == country_code
+            self._string_groups[country_code] = _StringGroup(strings["code"][mask], _keys(strings["kind"][mask], strings["id"][mask]))
+
+    @classmethod
+    def build(cls, docs: Iterable[Tuple[int, int, str, List[str], List[List[int]]]]) -> "PostalReverseIndex":
+        """ From `(kind, id_csc, country_code, postal codes, ranges)`, see `iter_postal_index_rows` of the collections."""
+        intervals = defaultdict(list)
+        strings = defaultdict(list)
+        for kind, id_csc, country_code, postal_codes, ranges in docs:
+            codes_intervals, codes_strings = [], set()
+            for code in map(normalize_postal_code, postal_codes):
+                intervals_code = code_intervals(country_code, code) if code != "" else []
+                if intervals_code is None:
+                    codes_strings.add(code)
+                else:
+                    codes_intervals.extend(intervals_code)
+            numeric = PostalIntervals.from_list(ranges) | PostalIntervals(codes_intervals)
+            for start, end, width in numeric.intervals:
+                for key, value in zip(("country", "width", "start", "end", "kind", "id"), (country_code, width, start, end, kind, id_csc)):
+                    intervals[key].append(value)
+            for code in codes_strings:
+                for key, value in zip(("country", "code", "kind", "id"), (country_code, code, kind, id_csc)):
+                    strings[key].append(value)
+        return cls(
+            intervals = {
+                "country": np.array(intervals["country"], dtype="U3"),
+                "width": np.array(intervals["width"], dtype=np.int8),
+                "start": np.array(intervals["start"], dtype=np.int64),
+                "end": np.array(intervals["end"], dtype=np.int64),
+                "kind": np.array(intervals["kind"], dtype=np.int8),
+                "id": np.array(intervals["id"], dtype=np.int64)
+            },
+            strings = {
+                "country": np.array(strings["country"], dtype="U3"),
+                "code": np.array(strings["code"], dtype=str),
+                "kind": np.array(strings["kind"], dtype=np.int8),
+                "id": np.array(strings["id"], dtype=np.int64)
+            }
+        )
+
+    def save(self, path: str = DEFAULT_POSTAL_INDEX_PATH) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(
+            path,
+            **{f"intervals_{key}": value for key, value in self._intervals.items()},
+            **{f"strings_{key}": value for key, value in self._strings.items()}
+        )
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_POSTAL_INDEX_PATH) -> "PostalReverseIndex":
+        with np.load(path) as data:
+            return cls(
+                intervals = {key[len("intervals_"):]: data[key] for key in data.files if key.startswith("intervals_")},
+                strings = {key[len("strings_"):]: data[key] for key in data.files if key.startswith("strings_")}
+            )
+
+    def __len__(self) -> int:
+        """ Number of intervals and non-numeric codes."""
+        return len(self._intervals["id"]) + len(self._strings["id"])
+
+    def _overlap(self, country_code: str, width: int, lo: int, hi: int) -> np.ndarray:
+        group = self._groups.get((country_code, width))
+        return NO_KEYS if group is None else group.overlap(lo, hi)
+
+    def _between(self, country_code: str, lo: str, hi: str) -> np.ndarray:
+        group = self._string_groups.get(country_code)
+        return NO_KEYS if group is None else group.between(lo, hi)
+
+    def exact(self, country_code: str, postal_code: str) -> PostalMatches:
+        postal_code = normalize_postal_code(postal_code)
+        if postal_code.isdigit():
+            number = int(postal_code)
+            return _matches(self._overlap(country_code, len(postal_code), number, number))
+        return _matches(self._between(country_code, postal_code, postal_code))
+
+    def prefix(self, country_code: str, prefix: str) -> PostalMatches:
+        """ Codes starting with `prefix`: every numeric width longer than a digit prefix, and the non-numeric codes."""
+        prefix = normalize_postal_code(prefix)
+        keys = [self._between(country_code, prefix, prefix + "\uffff")]
+        if prefix.isdigit():
+            for width in self._widths.get(country_code, []):
+                if width >= len(prefix):
+                    scale = 10 ** (width - len(prefix))
+                    keys.append(self._overlap(country_code, width, int(prefix) * scale, (int(prefix) + 1) * scale - 1))
+        return _matches(np.concatenate(keys))
+
+    def range(self, country_code: str, start: str, end: str) -> PostalMatches:
+        """ Codes in `[start, end]`: numerically for digit codes of the same width, else in string order."""
+        start, end = normalize_postal_code(start), normalize_postal_code(end)
+        if start.isdigit() and end.isdigit() and len(start) == len(end):
+            return _matches(self._overlap(country_code, len(start), int(start), int(end)))
+        return _matches(self._between(country_code, start, end))
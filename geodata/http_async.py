@@ -0,0 +1,121 @@
+""" aiohttp counterpart of `HttpClient`, used by the asyncio enrichment engine.
+- Bounded number of requests in flight per host, with one semaphore each.
+- Same shared `RateLimiter`, 429/503 handling and optional `ResponseCache` as `HttpClient`. The cache is SQLite,
+its reads and writes run in the default thread pool with `asyncio.to_thread`.
+"""
+from typing import Dict
+from urllib.parse import urlparse
+import asyncio
+
+import aiohttp
+
+from geodata.limiter import RateLimiter, WIKIMEDIA_LIMITER, THROTTLE_STATUS_CODES, parse_retry_after
+from geodata.http_session import DEFAULT_TIMEOUT, MAX_THROTTLED_RETRIES
+from geodata.response_cache import ResponseCache, CacheMissError, key_request, is_cacheable
+from geodata.utils import user_agent
+
+DEFAULT_IN_FLIGHT = 8
+
+
+class ThrottledError(RuntimeError):
+    """ Still throttled after `MAX_THROTTLED_RETRIES` attempts."""
+
+
+def params_aiohttp(params: dict) -> dict:
+    """ aiohttp only accepts str/int/float params, the MediaWiki flags (`True`) are sent as `1`."""
+    return {k: (1 if v is True else v) for k, v in params.items() if v is not None and v is not False}
+
+
+class AsyncHttpClient:
+    def __init__(
+            self,
+            limiter: RateLimiter | None = WIKIMEDIA_LIMITER,
+            max_in_flight: int = DEFAULT_IN_FLIGHT,
+            max_in_flight_hosts: Dict[str, int] | None = None,
+            timeout: float = DEFAULT_TIMEOUT,
+            cache: ResponseCache | None = None
+        ):
+        """
+        - `max_in_flight`: requests in flight per host.
+        - `max_in_flight_hosts`: overrides `max_in_flight` for some hosts, e.g. `{"query.wikidata.org": 5}`.
+        """
+        self._limiter = limiter
+        self._max_in_flight = max_in_flight
+        self._max_in_flight_hosts = {} if max_in_flight_hosts is None else max_in_flight_hosts
+        self._timeout = timeout
+        self._cache = cache
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._session: aiohttp.ClientSession | None = None
+
+    @property
+    def limiter(self) -> RateLimiter | None:
+        return self._limiter
+
+    @property
+    def cache(self) -> ResponseCache | None:
+        return self._cache
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        assert self._session is not None, "Use `async with AsyncHttpClient() as client`."
+        return self._session
+
+    async def __aenter__(self) -> "AsyncHttpClient":
+        self._session = aiohttp.ClientSession(
+            headers = {"User-Agent": user_agent()},
+            timeout = aiohttp.ClientTimeout(total=self._timeout)
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.session.close()
+        self._session = None
+
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self._max_in_flight_hosts.get(host, self._max_in_flight))
+        return self._semaphores[host]
+
+    async def request_json(self, method: str, url: str, **kwargs) -> dict:
+        if self.cache is None:
+            return await self._request_json(method, url, **kwargs)
+
+        key = key_request(method, url, params=kwargs.get("params"), data=kwargs.get("data"))
+        data = await asyncio.to_thread(self.cache.get, key)
+        if data is not None:
+            return data
+        if self.cache.read_only:
+            raise CacheMissError(f"{method} {url} is not cached.")
+        data = await self._request_json(method, url, **kwargs)
+        if is_cacheable(data):
+            await asyncio.to_thread(self.cache.set, key, data)
+        return data
+
+    async def _request_json(self, method: str, url: str, **kwargs) -> dict:
+        if "params" in kwargs:
+            kwargs["params"] = params_aiohttp(kwargs["params"])
+        async with self._semaphore(url):
+            for _ in range(MAX_THROTTLED_RETRIES):
+                if self.limiter is not None:
+                    await self.limiter.acquire_async()
+                try:
+                    async with self.session.request(method, url, **kwargs) as response:
+                        if response.status in THROTTLE_STATUS_CODES and self.limiter is not None:
+                            self.limiter.on_throttle(parse_retry_after(response.headers.get("Retry-After")))
+                            continue
+                        if self.limiter is not None:
+                            self.limiter.on_response(response.status)
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+                except (asyncio.TimeoutError, aiohttp.ClientConnectionError):
+                    if self.limiter is not None:
+                        self.limiter.on_throttle()
+                    raise
+        raise ThrottledError(f"{method} {url} still throttled after {MAX_THROTTLED_RETRIES} attempts.")
+
+    async def get_json(self, url: str, **kwargs) -> dict:
+        return await self.request_json("GET", url, **kwargs)
+
+    async def post_json(self, url: str, **kwargs) -> dict:
+        return await self.request_json("POST", url, **kwargs)
@@ -0,0 +1,169 @@
+""" Long-lived HTTP client shared by every Wikimedia call of the process.
+- One `requests.Session` with a keep-alive connection pool, safe to share between threads.
+- gzip enabled and one user agent for the whole process.
+- Every request waits on the shared `RateLimiter`, a 429/503 slows it down and is retried after `Retry-After`,
+another 5xx or a timeout only slows it down.
+- Each request is timed, for metrics.
+- `request_json` reads and fills the optional `ResponseCache`, configured from the env (`HTTP_CACHE_PATH`).
+"""
+from typing import Any, Callable, List, NamedTuple
+from collections import deque
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from geodata.limiter import RateLimiter, WIKIMEDIA_LIMITER, THROTTLE_STATUS_CODES, parse_retry_after
+from geodata.response_cache import ResponseCache, CacheMissError, key_request, is_cacheable
+from geodata.utils import user_agent
+
+DEFAULT_POOL_SIZE = 32
+DEFAULT_TIMEOUT = 60
+MAX_TIMINGS = 10_000
+MAX_THROTTLED_RETRIES = 5
+
+
+class RequestTiming(NamedTuple):
+    method: str
+    url: str
+    status_code: int
+    elapsed: float
+    num_bytes: int
+
+
+class HttpClient:
+    def __init__(
+            self,
+            pool_size: int = DEFAULT_POOL_SIZE,
+            timeout: float = DEFAULT_TIMEOUT,
+            limiter: RateLimiter | None = WIKIMEDIA_LIMITER,
+            cache: ResponseCache | None = None
+        ):
+        self._timeout = timeout
+        self._limiter = limiter
+        self._cache = cache
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._session.headers.update({
+            "User-Agent": user_agent(),
+            "Accept-Encoding": "gzip, deflate"
+        })
+        self._timings = deque(maxlen=MAX_TIMINGS)
+        self._listeners: List[Callable[[RequestTiming], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        return self._session
+
+    @property
+    def limiter(self) -> RateLimiter | None:
+        return self._limiter
+
+    @property
+    def cache(self) -> ResponseCache | None:
+        return self._cache
+
+    def set_cache(self, cache: ResponseCache | None) -> None:
+        self._cache = cache
+
+    @property
+    def timings(self) -> List[RequestTiming]:
+        """ Last `MAX_TIMINGS` requests."""
+        with self._lock:
+            return list(self._timings)
+
+    def add_listener(self, listener: Callable[[RequestTiming], None]) -> None:
+        """ `listener(timing)` is called after each request, e.g. to export metrics."""
+        self._listeners.append(listener)
+
+    def stats(self) -> dict:
+        timings = self.timings
+        num_requests = len(timings)
+        total_elapsed = sum(t.elapsed for t in timings)
+        return {
+            "requests": num_requests,
+            "elapsed_total": total_elapsed,
+            "elapsed_mean": total_elapsed / num_requests if num_requests != 0 else 0.0,
+            "bytes_total": sum(t.num_bytes for t in timings),
+            "throttled": sum(t.status_code in THROTTLE_STATUS_CODES for t in timings),
+            "rate": self.limiter.rate if self.limiter is not None else None
+        }
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """ Send a request through the limiter. A 429/503 is retried up to `MAX_THROTTLED_RETRIES` times,
+        after that the throttled response is returned as is. Another 5xx or a timeout slows the limiter down
+        but is not retried here."""
+        kwargs.setdefault("timeout", self._timeout)
+        if self.limiter is None:
+            return self._request(method, url, **kwargs)
+
+        for _ in range(MAX_THROTTLED_RETRIES):
+            self.limiter.acquire()
+            try:
+                response = self._request(method, url, **kwargs)
+            except (requests.Timeout, requests.ConnectionError):
+                self.limiter.on_throttle()
+                raise
+            if response.status_code not in THROTTLE_STATUS_CODES:
+                self.limiter.on_response(response.status_code)
+                return response
+            self.limiter.on_throttle(parse_retry_after(response.headers.get("Retry-After")))
+        return response
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        time_i = time.perf_counter()
+        response = self._session.request(method, url, **kwargs)
+        timing = RequestTiming(
+            method = method,
+            url = url,
+            status_code = response.status_code,
+            elapsed = time.perf_counter() - time_i,
+            num_bytes = len(response.content)
+        )
+        with self._lock:
+            self._timings.append(timing)
+        for listener in self._listeners:
+            listener(timing)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def request_json(self, method: str, url: str, **kwargs) -> Any:
+        """ JSON of a successful response, read from the `cache` if it has one.
+        - Only successful responses are cached, not the ones with a top-level `error`.
+        - In replay mode a miss raises `CacheMissError`.
+        """
+        if self.cache is None:
+            response = self.request(method, url, **kwargs)
+            response.raise_for_status()
+            return response.json()
+
+        key = key_request(method, url, params=kwargs.get("params"), data=kwargs.get("data"))
+        data = self.cache.get(key)
+        if data is not None:
+            return data
+        if self.cache.read_only:
+            raise CacheMissError(f"{method} {url} is not cached.")
+        response = self.request(method, url, **kwargs)
+        response.raise_for_status()
+        data = response.json()
+        if is_cacheable(data):
+            self.cache.set(key, data)
+        return data
+
+    def get_json(self, url: str, **kwargs) -> Any:
+        return self.request_json("GET", url, **kwargs)
+
+    def post_json(self, url: str, **kwargs) -> Any:
+        return self.request_json("POST", url, **kwargs)
+
+
+HTTP_CLIENT = HttpClient(cache=ResponseCache.from_env())
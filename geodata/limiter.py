@@ -0,0 +1,118 @@
+""" Request limiter shared by every thread that calls the Wikimedia endpoints.
+- Token bucket, the rate adapts with AIMD: it grows a little on each success (2xx/304) and halves on a 429/503,
+on any other 5xx and on a timeout. A 4xx leaves it as is.
+- A `Retry-After` pauses every caller until it expires.
+"""
+from email.utils import parsedate_to_datetime
+from datetime import datetime
+import asyncio
+import threading
+import time
+
+from geodata.utils_time import UTC
+
+DEFAULT_RATE = 5.0
+DEFAULT_BURST = 5.0
+MIN_RATE = 0.2
+MAX_RATE = 50.0
+RATE_INCREASE = 0.05
+RATE_DECREASE = 0.5
+DECREASE_COOLDOWN = 1.0
+THROTTLE_STATUS_CODES = (429, 503)
+NOT_MODIFIED = 304
+
+
+def is_success_status(status_code: int) -> bool:
+    return 200 <= status_code < 300 or status_code == NOT_MODIFIED
+
+def is_overload_status(status_code: int) -> bool:
+    """ 5xx: the server (or its gateway) is overloaded or timing out, like a 429/503 without `Retry-After`."""
+    return 500 <= status_code < 600
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """ Seconds to wait from a `Retry-After` header, in seconds or as an HTTP date."""
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_time = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_time - datetime.now(tz=UTC)).total_seconds())
+
+
+class RateLimiter:
+    def __init__(
+            self,
+            rate: float = DEFAULT_RATE,
+            burst: float = DEFAULT_BURST,
+            min_rate: float = MIN_RATE,
+            max_rate: float = MAX_RATE
+        ):
+        self._rate = rate
+        self._burst = burst
+        self._min_rate = min_rate
+        self._max_rate = max_rate
+        self._tokens = burst
+        self._last_time = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        """ Current requests per second."""
+        return self._rate
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self._burst, self._tokens + (now - self._last_time) * self._rate)
+        self._last_time = now
+
+    def _try_acquire(self) -> float:
+        """ Take one token and return 0, or return the seconds to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now >= self._paused_until and self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return max(self._paused_until - now, (1 - self._tokens) / self._rate)
+
+    def acquire(self) -> None:
+        """ Block until the caller is allowed to send one request."""
+        while (wait := self._try_acquire()) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """ `acquire` for coroutines, waits without blocking the event loop."""
+        while (wait := self._try_acquire()) > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(self) -> None:
+        """ Additive increase."""
+        with self._lock:
+            self._rate = min(self._max_rate, self._rate + RATE_INCREASE)
+
+    def on_response(self, status_code: int) -> None:
+        """ `on_success` for a 2xx/304, `on_throttle` for a 5xx, nothing for the rest."""
+        if is_success_status(status_code):
+            self.on_success()
+        elif is_overload_status(status_code):
+            self.on_throttle()
+
+    def on_throttle(self, retry_after: float | None = None) -> None:
+        """ Multiplicative decrease (at most once per `DECREASE_COOLDOWN` seconds), and pause if `retry_after`."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease >= DECREASE_COOLDOWN:
+                self._rate = max(self._min_rate, self._rate * RATE_DECREASE)
+                self._last_decrease = now
+            self._tokens = 0.0
+            if retry_after is not None:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+
+WIKIMEDIA_LIMITER = RateLimiter()
@@ -0,0 +1,181 @@
+""" Persistent response cache of the Wikimedia calls, on SQLite.
+- Content addressed: the key is a hash of the method, url, params and body. Only the whitespace of the SPARQL `query`
+is normalized, outside its string literals; every other value is kept as is.
+- Bodies with a top-level `error` (MediaWiki `maxlag`, `ratelimited`... sent with HTTP 200) are not cached.
+- `ttl`: seconds before a response is fetched again, `None` keeps them forever.
+- `max_bytes`: size cap, the least recently used responses are evicted first.
+- `read_only`: replay mode, nothing is written and a miss raises `CacheMissError` instead of going to the network.
+"""
+from typing import Any
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+from dotenv import load_dotenv
+
+DEFAULT_CACHE_PATH = ".cache_http/responses.sqlite"
+DEFAULT_MAX_BYTES = 2 * 1024**3
+EVICT_RATIO = 0.9
+EVICT_CHUNK = 1000
+NORMALIZED_KEYS = frozenset({"query"})
+RE_WHITESPACE = re.compile(r"\s+")
+RE_SPARQL_LITERAL = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'')
+
+
+class CacheMissError(KeyError):
+    """ Response not cached while replaying in `read_only` mode."""
+
+
+def normalize_text(text: str) -> str:
+    """ Whitespace of a SPARQL query collapsed outside its string literals, which are kept as they are."""
+    parts, end = [], 0
+    for match in RE_SPARQL_LITERAL.finditer(text):
+        parts.append(RE_WHITESPACE.sub(" ", text[end:match.start()]))
+        parts.append(match.group())
+        end = match.end()
+    parts.append(RE_WHITESPACE.sub(" ", text[end:]))
+    return "".join(parts).strip()
+
+def normalize_items(items: dict | None) -> list:
+    if items is None:
+        return []
+    return sorted(
+        (str(k), normalize_text(v) if k in NORMALIZED_KEYS and isinstance(v, str) else str(v))
+        for k, v in items.items()
+    )
+
+def is_cacheable(data: Any) -> bool:
+    """ False for an API error sent as a successful response (`{"error": {...}}`)."""
+    return not (isinstance(data, dict) and "error" in data)
+
+def key_request(method: str, url: str, params: dict | None = None, data: dict | None = None) -> str:
+    payload = json.dumps([method.upper(), url, normalize_items(params), normalize_items(data)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(
+            self,
+            path: str = DEFAULT_CACHE_PATH,
+            ttl: float | None = None,
+            max_bytes: int | None = DEFAULT_MAX_BYTES,
+            read_only: bool = False
+        ):
+        self._path = path
+        self._ttl = ttl
+        self._max_bytes = max_bytes
+        self._read_only = read_only
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+        if read_only:
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._conn.commit()
+        self._num_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache | None":
+        """ Cache configured by `HTTP_CACHE_PATH`, `HTTP_CACHE_TTL` (seconds), `HTTP_CACHE_MAX_MB` and
+        `HTTP_CACHE_REPLAY` (`1`/`true`). `None` when `HTTP_CACHE_PATH` is not set."""
+        load_dotenv()
+        path = os.getenv("HTTP_CACHE_PATH")
+        if not path:
+            return None
+        ttl = os.getenv("HTTP_CACHE_TTL")
+        max_mb = os.getenv("HTTP_CACHE_MAX_MB")
+        return cls(
+            path = path,
+            ttl = float(ttl) if ttl else None,
+            max_bytes = int(float(max_mb) * 1024**2) if max_mb else DEFAULT_MAX_BYTES,
+            read_only = os.getenv("HTTP_CACHE_REPLAY", "").lower() in ("1", "true")
+        )
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def read_only(self) -> bool:
+        return self._read_only
+
+    def stats(self) -> dict:
+        with self._lock:
+            num_responses = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {"hits": self._hits, "misses": self._misses, "responses": num_responses, "bytes": self._num_bytes}
+
+    def get(self, key: str) -> Any | None:
+        """ Cached JSON of `key`, `None` on a miss or an expired response. The TTL is ignored when replaying."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and not self.read_only and self._ttl is not None and now - row[1] > self._ttl:
+                self._delete([key])
+                row = None
+            if row is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            if not self.read_only:
+                self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, key: str, data: Any) -> None:
+        if self.read_only:
+            return
+        value = zlib.compress(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._delete([key])
+            self._conn.execute(
+                "INSERT INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now)
+            )
+            self._num_bytes += len(value)
+            if self._max_bytes is not None and self._num_bytes > self._max_bytes:
+                self._evict(int(self._max_bytes * EVICT_RATIO))
+            self._conn.commit()
+
+    def _delete(self, keys: list) -> None:
+        placeholders = ",".join("?" * len(keys))
+        size = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM responses WHERE key IN ({placeholders})", keys).fetchone()[0]
+        self._conn.execute(f"DELETE FROM responses WHERE key IN ({placeholders})", keys)
+        self._num_bytes -= size
+
+    def _evict(self, target_bytes: int) -> None:
+        """ Delete the least recently used responses until the cache is under `target_bytes`."""
+        while self._num_bytes > target_bytes:
+            rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed LIMIT ?", (EVICT_CHUNK,)).fetchall()
+            if len(rows) == 0:
+                break
+            keys, num_bytes = [], self._num_bytes
+            for key, size in rows:
+                if num_bytes <= target_bytes:
+                    break
+                keys.append(key)
+                num_bytes -= size
+            self._delete(keys)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,4 +1,11 @@
+from functools import lru_cache
+
 from fake_useragent import UserAgent
 
 def random_user_agent() -> str:
     return UserAgent().random
+
+@lru_cache(maxsize=1)
+def user_agent() -> str:
+    """ Random user agent, chosen once per process."""
+    return random_user_agent()
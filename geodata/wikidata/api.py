@@ -0,0 +1,48 @@
+""" Wikidata API (`wbgetentities`), batched up to 50 ids per call."""
+from typing import Dict, List, Iterable
+
+from geodata.http_session import HTTP_CLIENT
+
+URL_WIKIDATA_API = "https://www.wikidata.org/w/api.php"
+MAX_IDS_WBGETENTITIES = 50
+ENTITIES = "entities"
+LABELS = "labels"
+REDIRECTS = "redirects"
+
+
+def params_wbgetentities(ids_wikidata: List[str], **params) -> dict:
+    """ Query params of one `wbgetentities` call, `ids_wikidata` must have at most 50 ids."""
+    assert len(ids_wikidata) <= MAX_IDS_WBGETENTITIES, f"wbgetentities accepts at most {MAX_IDS_WBGETENTITIES} ids."
+    return {"action": "wbgetentities", "format": "json", "ids": "|".join(ids_wikidata), **params}
+
+def wbgetentities(ids_wikidata: List[str], **params) -> dict:
+    return HTTP_CLIENT.get_json(URL_WIKIDATA_API, params=params_wbgetentities(ids_wikidata, **params))
+
+def iter_entities(data: dict) -> Iterable[tuple]:
+    """ `(id_wikidata, entity)` of a `wbgetentities` response, also under the requested id when it was a redirect."""
+    for id_wikidata, entity in data.get(ENTITIES, {}).items():
+        yield id_wikidata, entity
+        if REDIRECTS in entity:
+            yield entity[REDIRECTS]["from"], entity
+
+def join_languages(languages: Iterable[str]) -> str:
+    return "|".join(sorted(set(lang for lang in languages if lang != "")))
+
+def labels_from_data(data: dict) -> Dict[str, Dict[str, str]]:
+    """ `{id_wikidata: {lang: label}}` of a `wbgetentities` response with `props=labels`."""
+    return {
+        id_wikidata: {lang: label["value"] for lang, label in entity.get(LABELS, {}).items()}
+        for id_wikidata, entity in iter_entities(data)
+    }
+
+def labels_from_ids_wikidata(ids_wikidata: List[str], languages: Iterable[str]) -> Dict[str, Dict[str, str]]:
+    """ Labels of many entities in the requested `languages`.
+    - Returns `{id_wikidata: {lang: label}}`, the ids without labels are not included.
+    """
+    languages = join_languages(languages)
+    ids_wikidata = list(dict.fromkeys(ids_wikidata))
+    labels = {}
+    for i in range(0, len(ids_wikidata), MAX_IDS_WBGETENTITIES):
+        data = wbgetentities(ids_wikidata[i:i+MAX_IDS_WBGETENTITIES], props=LABELS, languages=languages)
+        labels.update(labels_from_data(data))
+    return labels
@@ -0,0 +1,178 @@
+""" Streaming reader of a Wikidata JSON entity dump (`latest-all.json.gz`/`.bz2`, or a filtered subset).
+- The dump is a JSON array with one entity per line, decompressed on the fly and never loaded whole.
+- The lines are parsed in worker processes, in chunks.
+- Only the instances (`P31`) of `DEFAULT_CLASSES` are kept, as a `DumpEntity`.
+"""
+from typing import Dict, FrozenSet, Iterable, Generator, List, NamedTuple, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+import bz2
+import gzip
+import json
+import os
+
+from geodata.wikidata.lang import languages_native
+
+DEFAULT_CHUNK_LINES = 2000
+DEFAULT_PROCESSES = max(1, (os.cpu_count() or 1) - 1)
+
+COUNTRY = "country"
+ADMIN = "admin"
+SETTLEMENT = "settlement"
+
+COUNTRY_CLASSES = frozenset({
+    "Q6256",        # country
+    "Q3624078",     # sovereign state
+})
+ADMIN_CLASSES = frozenset({
+    "Q10864048",    # first-level administrative country subdivision
+    "Q13220204",    # second-level administrative country subdivision
+    "Q13221722",    # third-level administrative country subdivision
+    "Q56061",       # administrative territorial entity
+    "Q35657",       # state of the United States
+    "Q34876",       # province
+    "Q107390",      # federated state
+    "Q28575",       # county
+})
+SETTLEMENT_CLASSES = frozenset({
+    "Q486972",      # human settlement
+    "Q515",         # city
+    "Q1549591",     # big city
+    "Q5119",        # capital
+    "Q3957",        # town
+    "Q532",         # village
+    "Q15284",       # municipality
+    "Q1093829",     # city in the United States
+    "Q747074",      # comune of Italy
+    "Q484170",      # commune of France
+    "Q262166",      # municipality of Germany
+    "Q2039348",     # municipality of the Netherlands
+})
+DEFAULT_CLASSES = COUNTRY_CLASSES | ADMIN_CLASSES | SETTLEMENT_CLASSES
+
+
+class DumpEntity(NamedTuple):
+    id_wikidata: str
+    kind: str
+    iso2: str | None
+    country: str | None
+    located_in: Tuple[str, ...]
+    labels: Dict[str, str]
+    websites: Tuple[str, ...]
+    postal_codes: Tuple[str, ...]
+    enwiki: str | None
+    latitude: float | None
+    longitude: float | None
+
+
+def open_dump(path: str):
+    """ Text stream of the dump, decompressed according to the extension."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8")
+    return open(path, "rt", encoding="utf-8")
+
+def iter_dump_lines(path: str) -> Generator[str, None, None]:
+    """ One JSON entity per line, without the array brackets and trailing commas."""
+    with open_dump(path) as f:
+        for line in f:
+            line = line.strip().rstrip(",")
+            if line not in ("", "[", "]"):
+                yield line
+
+def _values_claims(claims: dict, prop: str) -> List:
+    values = []
+    for claim in claims.get(prop, []):
+        mainsnak = claim.get("mainsnak", {})
+        if claim.get("rank") == "deprecated" or mainsnak.get("snaktype") != "value":
+            continue
+        values.append(mainsnak["datavalue"]["value"])
+    return values
+
+def _ids_claims(claims: dict, prop: str) -> List[str]:
+    return [value["id"] for value in _values_claims(claims, prop) if isinstance(value, dict) and "id" in value]
+
+def _strs_claims(claims: dict, prop: str) -> List[str]:
+    return [value for value in _values_claims(claims, prop) if isinstance(value, str)]
+
+def kind_from_classes(classes: Iterable[str]) -> str:
+    classes = set(classes)
+    if classes & COUNTRY_CLASSES:
+        return COUNTRY
+    if classes & ADMIN_CLASSES:
+        return ADMIN
+    return SETTLEMENT
+
+def entity_from_json(data: dict, classes: FrozenSet[str], languages: FrozenSet[str]) -> DumpEntity | None:
+    claims = data.get("claims", {})
+    instance_of = _ids_claims(claims, "P31")
+    if not classes.intersection(instance_of):
+        return None
+
+    coordinates = _values_claims(claims, "P625")
+    countries = _ids_claims(claims, "P17")
+    iso2 = _strs_claims(claims, "P297")
+    enwiki = data.get("sitelinks", {}).get("enwiki")
+    return DumpEntity(
+        id_wikidata = data["id"],
+        kind = kind_from_classes(instance_of),
+        iso2 = iso2[0] if len(iso2) != 0 else None,
+        country = countries[0] if len(countries) != 0 else None,
+        located_in = tuple(_ids_claims(claims, "P131")),
+        labels = {lang: label["value"] for lang, label in data.get("labels", {}).items() if lang in languages},
+        websites = tuple(_strs_claims(claims, "P856")),
+        postal_codes = tuple(_strs_claims(claims, "P281")),
+        enwiki = enwiki["title"] if enwiki is not None else None,
+        latitude = coordinates[0]["latitude"] if len(coordinates) != 0 else None,
+        longitude = coordinates[0]["longitude"] if len(coordinates) != 0 else None
+    )
+
+def _parse_lines(lines: List[str], classes: FrozenSet[str], languages: FrozenSet[str]) -> List[DumpEntity]:
+    """ Worker: the `"id":"Q..."` substring check skips `json.loads` on most of the lines of a full dump."""
+    needles = [f'"id":"{id_class}"' for id_class in classes]
+    entities = []
+    for line in lines:
+        if not any(needle in line for needle in needles):
+            continue
+        entity = entity_from_json(json.loads(line), classes=classes, languages=languages)
+        if entity is not None:
+            entities.append(entity)
+    return entities
+
+def _iter_chunks(lines: Iterable[str], chunk_lines: int) -> Generator[List[str], None, None]:
+    lines = iter(lines)
+    while chunk := list(islice(lines, chunk_lines)):
+        yield chunk
+
+def iter_dump_entities(
+        path: str,
+        processes: int = DEFAULT_PROCESSES,
+        chunk_lines: int = DEFAULT_CHUNK_LINES,
+        classes: FrozenSet[str] = DEFAULT_CLASSES,
+        languages: FrozenSet[str] | None = None
+    ) -> Generator[List[DumpEntity], None, None]:
+    """ Chunks of entities of the dump, in order.
+    - `processes`: worker processes parsing the lines, `1` parses in this process.
+    - `languages`: labels kept, English and the native languages by default.
+    """
+    languages = frozenset({"en", *languages_native()}) if languages is None else languages
+    parse = partial(_parse_lines, classes=classes, languages=languages)
+    chunks = _iter_chunks(iter_dump_lines(path), chunk_lines)
+    if processes <= 1:
+        yield from map(parse, chunks)
+        return
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        yield from map_bounded(executor, parse, chunks, max_pending=processes * 2)
+
+def map_bounded(executor: ProcessPoolExecutor, fn, chunks: Iterable, max_pending: int) -> Generator:
+    """ `executor.map` submits every chunk upfront, here at most `max_pending` are read ahead of the consumer."""
+    pending = deque()
+    for chunk in chunks:
+        pending.append(executor.submit(fn, chunk))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    for future in pending:
+        yield future.result()
@@ -0,0 +1,169 @@
+""" Local index of the entities of a Wikidata dump, on SQLite, to resolve and enrich the models offline.
+- `entities`: one row per `DumpEntity`, the lists and labels as JSON.
+- `labels`: casefolded label -> id, to match the CSC names.
+"""
+from typing import Dict, Iterable, List
+import json
+import math
+import os
+import sqlite3
+
+from geodata.wikidata.dump import (
+    DumpEntity, COUNTRY, ADMIN, SETTLEMENT, DEFAULT_PROCESSES, DEFAULT_CHUNK_LINES, iter_dump_entities
+)
+from geodata.wikidata._etc import _raise_model_error
+from geodata.db.models.country import Country
+from geodata.db.models.state import State
+from geodata.db.models.city import City
+
+MAX_SQL_VARIABLES = 900
+
+
+def normalize_label(label: str) -> str:
+    return label.strip().casefold()
+
+def distance_degrees(entity: DumpEntity, model: Country | State | City) -> float:
+    """ Rough distance for the tie-breaks, `inf` without coordinates."""
+    if entity.latitude is None or entity.longitude is None:
+        return math.inf
+    return math.hypot(entity.latitude - model.latitude, entity.longitude - model.longitude)
+
+
+class WikidataDumpIndex:
+    def __init__(self, path: str):
+        self._path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entities (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                iso2 TEXT,
+                country TEXT,
+                located_in TEXT NOT NULL,
+                labels TEXT NOT NULL,
+                websites TEXT NOT NULL,
+                postal_codes TEXT NOT NULL,
+                enwiki TEXT,
+                latitude REAL,
+                longitude REAL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS labels (
+                label TEXT NOT NULL,
+                id TEXT NOT NULL,
+                PRIMARY KEY (label, id)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entities_iso2 ON entities (iso2)")
+        self._conn.commit()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM entities").fetchone()[0]
+
+    def add_entities(self, entities: List[DumpEntity]) -> None:
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(
+                e.id_wikidata, e.kind, e.iso2, e.country, json.dumps(e.located_in),
+                json.dumps(e.labels, ensure_ascii=False), json.dumps(e.websites), json.dumps(e.postal_codes),
+                e.enwiki, e.latitude, e.longitude
+            ) for e in entities]
+        )
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO labels VALUES (?, ?)",
+            [(normalize_label(label), e.id_wikidata) for e in entities for label in set(e.labels.values())]
+        )
+        self._conn.commit()
+
+    def build(
+            self,
+            path_dump: str,
+            processes: int = DEFAULT_PROCESSES,
+            chunk_lines: int = DEFAULT_CHUNK_LINES,
+            verbose: bool = True
+        ) -> int:
+        """ Add every kept entity of the dump. Returns the number of entities in the index."""
+        num_entities = 0
+        for entities in iter_dump_entities(path_dump, processes=processes, chunk_lines=chunk_lines):
+            self.add_entities(entities)
+            num_entities += len(entities)
+            if verbose and len(entities) != 0:
+                print(f"{num_entities} entities indexed")
+        return len(self)
+
+    def _entity_from_row(self, row: tuple) -> DumpEntity:
+        return DumpEntity(
+            id_wikidata = row[0],
+            kind = row[1],
+            iso2 = row[2],
+            country = row[3],
+            located_in = tuple(json.loads(row[4])),
+            labels = json.loads(row[5]),
+            websites = tuple(json.loads(row[6])),
+            postal_codes = tuple(json.loads(row[7])),
+            enwiki = row[8],
+            latitude = row[9],
+            longitude = row[10]
+        )
+
+    def entities(self, ids_wikidata: Iterable[str]) -> Dict[str, DumpEntity]:
+        ids_wikidata = list(dict.fromkeys(ids_wikidata))
+        entities = {}
+        for i in range(0, len(ids_wikidata), MAX_SQL_VARIABLES):
+            chunk = ids_wikidata[i:i+MAX_SQL_VARIABLES]
+            rows = self._conn.execute(f"SELECT * FROM entities WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            entities.update((row[0], self._entity_from_row(row)) for row in rows)
+        return entities
+
+    def id_country(self, country_code: str) -> str | None:
+        row = self._conn.execute(
+            "SELECT id FROM entities WHERE iso2 = ? ORDER BY kind = ? DESC LIMIT 1", (country_code, COUNTRY)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def entities_from_label(self, label: str) -> List[DumpEntity]:
+        ids_wikidata = [row[0] for row in self._conn.execute("SELECT id FROM labels WHERE label = ?", (normalize_label(label),))]
+        return list(self.entities(ids_wikidata).values())
+
+    def resolve_id_wikidata(
+            self,
+            model: Country | State | City,
+            ids_country: Dict[str, str],
+            ids_state: Dict[int, str] | None = None
+        ) -> str | None:
+        """ `id_wikidata` of the model, `None` if no entity matches.
+        - Countries by ISO code (`P297`).
+        - States and cities by label within the same country (`P17`). Ties are broken by the expected kind,
+        by the state of the city (`P131`), and then by the closest coordinates.
+        """
+        if isinstance(model, Country):
+            return self.id_country(model.country_code)
+        elif isinstance(model, State):
+            kind, id_state = ADMIN, None
+        elif isinstance(model, City):
+            kind, id_state = SETTLEMENT, (ids_state or {}).get(model.state_id_csc)
+        else:
+            _raise_model_error()
+
+        id_country = ids_country.get(model.country_code)
+        candidates = [
+            entity for entity in self.entities_from_label(model.name)
+            if id_country is None or entity.country == id_country
+        ]
+        if len(candidates) == 0:
+            return None
+        best = min(candidates, key=lambda entity: (
+            entity.kind != kind,
+            id_state is not None and id_state not in entity.located_in,
+            distance_degrees(entity, model)
+        ))
+        return best.id_wikidata
+
+    def close(self) -> None:
+        self._conn.close()
@@ -1,251 +1,256 @@
+DICT_COUNTRY_CODE_LANG = {
+    "AF": "ps",
+    "AX": "sv",
+    "AL": "sq",
+    "DZ": "ar",
+    "AS": "en",
+    "AD": "ca",
+    "AO": "pt",
+    "AI": "en",
+    "AQ": "",
+    "AG": "en",
+    "AR": "es",
+    "AM": "hy",
+    "AW": "nl",
+    "AU": "en",
+    "AT": "de",
+    "AZ": "az",
+    "BS": "en",
+    "BH": "ar",
+    "BD": "bn",
+    "BB": "en",
+    "BY": "be",
+    "BE": "nl",
+    "BZ": "en",
+    "BJ": "fr",
+    "BM": "en",
+    "BT": "dz",
+    "BO": "es",
+    "BA": "bs",
+    "BW": "en",
+    "BV": "",
+    "BR": "pt",
+    "IO": "en",
+    "VG": "en",
+    "BN": "ms",
+    "BG": "bg",
+    "BF": "fr",
+    "BI": "fr",
+    "KH": "km",
+    "CM": "fr",
+    "CA": "en",
+    "CV": "pt",
+    "KY": "en",
+    "CF": "fr",
+    "TD": "fr",
+    "CL": "es",
+    "CN": "zh",
+    "CX": "en",
+    "CC": "ms",
+    "CO": "es",
+    "KM": "ar",
+    "CG": "fr",
+    "CD": "fr",
+    "CK": "en",
+    "CR": "es",
+    "CI": "fr",
+    "HR": "hr",
+    "CU": "es",
+    "CY": "el",
+    "CZ": "cs",
+    "DK": "da",
+    "DJ": "fr",
+    "DM": "en",
+    "DO": "es",
+    "EC": "es",
+    "EG": "ar",
+    "SV": "es",
+    "GQ": "es",
+    "ER": "aa",
+    "EE": "et",
+    "ET": "am",
+    "FK": "en",
+    "FO": "fo",
+    "FJ": "en",
+    "FI": "fi",
+    "FR": "fr",
+    "GF": "fr",
+    "PF": "fr",
+    "TF": "fr",
+    "GA": "fr",
+    "GM": "en",
+    "GE": "ka",
+    "DE": "de",
+    "GH": "en",
+    "GI": "en",
+    "GR": "el",
+    "GL": "kl",
+    "GD": "en",
+    "GP": "fr",
+    "GU": "en",
+    "GT": "es",
+    "GG": "en",
+    "GN": "fr",
+    "GW": "pt",
+    "GY": "en",
+    "HT": "ht",
+    "HM": "",
+    "HN": "es",
+    "HK": "zh",
+    "HU": "hu",
+    "IS": "is",
+    "IN": "hi",
+    "ID": "id",
+    "IR": "fa",
+    "IQ": "ar",
+    "IE": "ga",
+    "IM": "en",
+    "IL": "he",
+    "IT": "it",
+    "JM": "en",
+    "JP": "ja",
+    "JE": "en",
+    "JO": "ar",
+    "KZ": "kk",
+    "KE": "sw",
+    "KI": "en",
+    "KW": "ar",
+    "KG": "ky",
+    "LA": "lo",
+    "LV": "lv",
+    "LB": "ar",
+    "LS": "st",
+    "LR": "en",
+    "LY": "ar",
+    "LI": "de",
+    "LT": "lt",
+    "LU": "lb",
+    "MO": "zh",
+    "MK": "mk",
+    "MG": "fr",
+    "MW": "ny",
+    "MY": "ms",
+    "MV": "dv",
+    "ML": "fr",
+    "MT": "mt",
+    "MH": "en",
+    "MQ": "fr",
+    "MR": "ar",
+    "MU": "fr",
+    "YT": "fr",
+    "MX": "es",
+    "FM": "en",
+    "MD": "ro",
+    "MC": "fr",
+    "MN": "mn",
+    "ME": "sr",
+    "MS": "en",
+    "MA": "ar",
+    "MZ": "pt",
+    "MM": "my",
+    "NA": "en",
+    "NR": "en",
+    "NP": "ne",
+    "NL": "nl",
+    "AN": "nl",
+    "NC": "fr",
+    "NZ": "en",
+    "NI": "es",
+    "NE": "fr",
+    "NG": "en",
+    "NU": "en",
+    "NF": "en",
+    "KP": "ko",
+    "MP": "en",
+    "NO": "no",
+    "OM": "ar",
+    "PK": "ur",
+    "PW": "en",
+    "PS": "ar",
+    "PA": "es",
+    "PG": "en",
+    "PY": "es",
+    "PE": "es",
+    "PH": "tl",
+    "PN": "en",
+    "PL": "pl",
+    "PT": "pt",
+    "PR": "es",
+    "QA": "ar",
+    "RE": "fr",
+    "RO": "ro",
+    "RU": "ru",
+    "RW": "rw",
+    "BL": "fr",
+    "SH": "en",
+    "KN": "en",
+    "LC": "en",
+    "MF": "fr",
+    "PM": "fr",
+    "VC": "en",
+    "WS": "sm",
+    "SM": "it",
+    "ST": "pt",
+    "SA": "ar",
+    "SN": "fr",
+    "RS": "sr",
+    "SC": "fr",
+    "SL": "en",
+    "SG": "en",
+    "SK": "sk",
+    "SI": "sl",
+    "SB": "en",
+    "SO": "so",
+    "ZA": "zu",
+    "GS": "en",
+    "KR": "ko",
+    "SS": "en",
+    "ES": "es",
+    "LK": "si",
+    "SD": "ar",
+    "SR": "nl",
+    "SJ": "no",
+    "SZ": "ss",
+    "SE": "sv",
+    "CH": "de",
+    "SY": "ar",
+    "TW": "zh",
+    "TJ": "tg",
+    "TZ": "sw",
+    "TH": "th",
+    "TL": "pt",
+    "TG": "fr",
+    "TK": "en",
+    "TO": "to",
+    "TT": "en",
+    "TN": "ar",
+    "TR": "tr",
+    "TM": "tk",
+    "TC": "en",
+    "TV": "en",
+    "UG": "sw",
+    "UA": "uk",
+    "AE": "ar",
+    "GB": "en",
+    "US": "en",
+    "UM": "en",
+    "VI": "en",
+    "UY": "es",
+    "UZ": "uz",
+    "VU": "bi",
+    "VA": "it",
+    "VE": "es",
+    "VN": "vi",
+    "WF": "fr",
+    "EH": "ar",
+    "YE": "ar",
+    "ZM": "en",
+    "ZW": "sn",
+}
+
 def country_code_to_lang(country_code: str) -> str:
-    dict_country_code = {
-        "AF": "ps",
-        "AX": "sv",
-        "AL": "sq",
-        "DZ": "ar",
-        "AS": "en",
-        "AD": "ca",
-        "AO": "pt",
-        "AI": "en",
-        "AQ": "",
-        "AG": "en",
-        "AR": "es",
-        "AM": "hy",
-        "AW": "nl",
-        "AU": "en",
-        "AT": "de",
-        "AZ": "az",
-        "BS": "en",
-        "BH": "ar",
-        "BD": "bn",
-        "BB": "en",
-        "BY": "be",
-        "BE": "nl",
-        "BZ": "en",
-        "BJ": "fr",
-        "BM": "en",
-        "BT": "dz",
-        "BO": "es",
-        "BA": "bs",
-        "BW": "en",
-        "BV": "",
-        "BR": "pt",
-        "IO": "en",
-        "VG": "en",
-        "BN": "ms",
-        "BG": "bg",
-        "BF": "fr",
-        "BI": "fr",
-        "KH": "km",
-        "CM": "fr",
-        "CA": "en",
-        "CV": "pt",
-        "KY": "en",
-        "CF": "fr",
-        "TD": "fr",
-        "CL": "es",
-        "CN": "zh",
-        "CX": "en",
-        "CC": "ms",
-        "CO": "es",
-        "KM": "ar",
-        "CG": "fr",
-        "CD": "fr",
-        "CK": "en",
-        "CR": "es",
-        "CI": "fr",
-        "HR": "hr",
-        "CU": "es",
-        "CY": "el",
-        "CZ": "cs",
-        "DK": "da",
-        "DJ": "fr",
-        "DM": "en",
-        "DO": "es",
-        "EC": "es",
-        "EG": "ar",
-        "SV": "es",
-        "GQ": "es",
-        "ER": "aa",
-        "EE": "et",
-        "ET": "am",
-        "FK": "en",
-        "FO": "fo",
-        "FJ": "en",
-        "FI": "fi",
-        "FR": "fr",
-        "GF": "fr",
-        "PF": "fr",
-        "TF": "fr",
-        "GA": "fr",
-        "GM": "en",
-        "GE": "ka",
-        "DE": "de",
-        "GH": "en",
-        "GI": "en",
-        "GR": "el",
-        "GL": "kl",
-        "GD": "en",
-        "GP": "fr",
-        "GU": "en",
-        "GT": "es",
-        "GG": "en",
-        "GN": "fr",
-        "GW": "pt",
-        "GY": "en",
-        "HT": "ht",
-        "HM": "",
-        "HN": "es",
-        "HK": "zh",
-        "HU": "hu",
-        "IS": "is",
-        "IN": "hi",
-        "ID": "id",
-        "IR": "fa",
-        "IQ": "ar",
-        "IE": "ga",
-        "IM": "en",
-        "IL": "he",
-        "IT": "it",
-        "JM": "en",
-        "JP": "ja",
-        "JE": "en",
-        "JO": "ar",
-        "KZ": "kk",
-        "KE": "sw",
-        "KI": "en",
-        "KW": "ar",
-        "KG": "ky",
-        "LA": "lo",
-        "LV": "lv",
-        "LB": "ar",
-        "LS": "st",
-        "LR": "en",
-        "LY": "ar",
-        "LI": "de",
-        "LT": "lt",
-        "LU": "lb",
-        "MO": "zh",
-        "MK": "mk",
-        "MG": "fr",
-        "MW": "ny",
-        "MY": "ms",
-        "MV": "dv",
-        "ML": "fr",
-        "MT": "mt",
-        "MH": "en",
-        "MQ": "fr",
-        "MR": "ar",
-        "MU": "fr",
-        "YT": "fr",
-        "MX": "es",
-        "FM": "en",
-        "MD": "ro",
-        "MC": "fr",
-        "MN": "mn",
-        "ME": "sr",
-        "MS": "en",
-        "MA": "ar",
-        "MZ": "pt",
-        "MM": "my",
-        "NA": "en",
-        "NR": "en",
-        "NP": "ne",
-        "NL": "nl",
-        "AN": "nl",
-        "NC": "fr",
-        "NZ": "en",
-        "NI": "es",
-        "NE": "fr",
-        "NG": "en",
-        "NU": "en",
-        "NF": "en",
-        "KP": "ko",
-        "MP": "en",
-        "NO": "no",
-        "OM": "ar",
-        "PK": "ur",
-        "PW": "en",
-        "PS": "ar",
-        "PA": "es",
-        "PG": "en",
-        "PY": "es",
-        "PE": "es",
-        "PH": "tl",
-        "PN": "en",
-        "PL": "pl",
-        "PT": "pt",
-        "PR": "es",
-        "QA": "ar",
-        "RE": "fr",
-        "RO": "ro",
-        "RU": "ru",
-        "RW": "rw",
-        "BL": "fr",
-        "SH": "en",
-        "KN": "en",
-        "LC": "en",
-        "MF": "fr",
-        "PM": "fr",
-        "VC": "en",
-        "WS": "sm",
-        "SM": "it",
-        "ST": "pt",
-        "SA": "ar",
-        "SN": "fr",
-        "RS": "sr",
-        "SC": "fr",
-        "SL": "en",
-        "SG": "en",
-        "SK": "sk",
-        "SI": "sl",
-        "SB": "en",
-        "SO": "so",
-        "ZA": "zu",
-        "GS": "en",
-        "KR": "ko",
-        "SS": "en",
-        "ES": "es",
-        "LK": "si",
-        "SD": "ar",
-        "SR": "nl",
-        "SJ": "no",
-        "SZ": "ss",
-        "SE": "sv",
-        "CH": "de",
-        "SY": "ar",
-        "TW": "zh",
-        "TJ": "tg",
-        "TZ": "sw",
-        "TH": "th",
-        "TL": "pt",
-        "TG": "fr",
-        "TK": "en",
-        "TO": "to",
-        "TT": "en",
-        "TN": "ar",
-        "TR": "tr",
-        "TM": "tk",
-        "TC": "en",
-        "TV": "en",
-        "UG": "sw",
-        "UA": "uk",
-        "AE": "ar",
-        "GB": "en",
-        "US": "en",
-        "UM": "en",
-        "VI": "en",
-        "UY": "es",
-        "UZ": "uz",
-        "VU": "bi",
-        "VA": "it",
-        "VE": "es",
-        "VN": "vi",
-        "WF": "fr",
-        "EH": "ar",
-        "YE": "ar",
-        "ZM": "en",
-        "ZW": "sn",
-    }
-    return dict_country_code.get(country_code, "")
\ No newline at end of file
+    return DICT_COUNTRY_CODE_LANG.get(country_code, "")
+
+def languages_native() -> frozenset:
+    """ Every native language of `DICT_COUNTRY_CODE_LANG`."""
+    return frozenset(lang for lang in DICT_COUNTRY_CODE_LANG.values() if lang != "")
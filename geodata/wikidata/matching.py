@@ -0,0 +1,307 @@
+""" Local matching of CSC names against the labels of a set of wikidata places (e.g. the settlements of a state).
+- `LabelIndex`: trigram index over the labels (any language), vectorized top-k for batches of names.
+- `PlaceMatcher`: exact label first, then the normalized label (accents, case and punctuation), then fuzzy (`LabelIndex`).
+- Ties are broken by the distance to the CSC coordinates.
+- `PlaceMatcher.match_many`: the names without an exact or normalized label go through a single `LabelIndex.top_k`,
+ranked with the distance to their coordinates.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Set, Tuple
+import math
+import re
+import unicodedata
+
+import numpy as np
+
+FUZZY_CUTOFF = 0.6
+DEFAULT_TOP_K = 5
+DEFAULT_MIN_SCORE = 0.5
+DEFAULT_DISTANCE_WEIGHT = 0.05
+QUERY_CHUNK = 1024
+EARTH_RADIUS_KM = 6371.0
+PATTERN_NOT_WORD = re.compile(r"[\W_]+")
+
+
+class Place(NamedTuple):
+    id_wikidata: str
+    labels: Set[str]
+    latitude: float | None = None
+    longitude: float | None = None
+
+
+def normalize_name(name: str) -> str:
+    """ Without accents, case and punctuation, `"Saint-Étienne"` -> `"saint etienne"`."""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return " ".join(PATTERN_NOT_WORD.sub(" ", name.casefold()).split())
+
+def haversine_km(latitude_1: float | None, longitude_1: float | None, latitude_2: float | None, longitude_2: float | None) -> float:
+    """ Great-circle distance, `inf` if a coordinate is missing."""
+    if None in (latitude_1, longitude_1, latitude_2, longitude_2):
+        return math.inf
+    phi_1, phi_2 = math.radians(latitude_1), math.radians(latitude_2)
+    d_phi = phi_2 - phi_1
+    d_lambda = math.radians(longitude_2 - longitude_1)
+    a = math.sin(d_phi / 2)**2 + math.cos(phi_1) * math.cos(phi_2) * math.sin(d_lambda / 2)**2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def trigrams(name_normalized: str) -> Set[str]:
+    padded = f"  {name_normalized} "
+    return {padded[i:i+3] for i in range(len(padded) - 2)}
+
+def haversine_km_array(latitudes_1: np.ndarray, longitudes_1: np.ndarray, latitudes_2: np.ndarray, longitudes_2: np.ndarray) -> np.ndarray:
+    """ Vectorized `haversine_km`, NaN coordinates give `inf`."""
+    phi_1, phi_2 = np.radians(latitudes_1), np.radians(latitudes_2)
+    d_lambda = np.radians(longitudes_2 - longitudes_1)
+    a = np.sin((phi_2 - phi_1) / 2)**2 + np.cos(phi_1) * np.cos(phi_2) * np.sin(d_lambda / 2)**2
+    distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+    return np.where(np.isnan(distances), np.inf, distances)
+
+
+class LabelMatches(NamedTuple):
+    """ Top-k of a batch of names, flat arrays sorted by `row` and then by rank.
+    - `row`: index of the name in the batch.
+    - `place`: index of the place in `LabelIndex.places`.
+    - `score`: trigram Dice similarity of the best label of the place, in `[0, 1]`.
+    - `distance_km`: to the coordinates of the name, `inf` if any is missing.
+    """
+    row: np.ndarray
+    place: np.ndarray
+    score: np.ndarray
+    distance_km: np.ndarray
+
+
+class LabelIndex:
+    """ Trigram index over the labels of `places`, built once per country or state.
+    - The postings (trigram -> labels) are numpy arrays in CSR layout, a batch of names is scored with array operations.
+    - Prefix filtering: a label reaching `min_score` must share one of the rarest trigrams of the name, so only
+    their postings generate candidates. The candidates are then verified against the other trigrams of the name.
+    """
+    def __init__(self, places: Sequence[Place]):
+        self._places = list(places)
+        labels_normalized, labels_place = [], []
+        for i, place in enumerate(self._places):
+            for label in {normalize_name(label) for label in place.labels}:
+                labels_normalized.append(label)
+                labels_place.append(i)
+        self._labels_place = np.array(labels_place, dtype=np.int64)
+
+        self._vocabulary: Dict[str, int] = {}
+        pairs_trigram, pairs_label, labels_num_trigrams = [], [], []
+        for i, label in enumerate(labels_normalized):
+            label_trigrams = trigrams(label)
+            labels_num_trigrams.append(len(label_trigrams))
+            for trigram in label_trigrams:
+                pairs_trigram.append(self._vocabulary.setdefault(trigram, len(self._vocabulary)))
+                pairs_label.append(i)
+        self._labels_num_trigrams = np.array(labels_num_trigrams, dtype=np.int64)
+
+        pairs_trigram = np.array(pairs_trigram, dtype=np.int64)
+        pairs_label = np.array(pairs_label, dtype=np.int64)
+        self._postings = pairs_label[np.argsort(pairs_trigram, kind="stable")]
+        self._frequencies = np.bincount(pairs_trigram, minlength=len(self._vocabulary))
+        self._indptr = np.zeros(len(self._vocabulary) + 1, dtype=np.int64)
+        np.cumsum(self._frequencies, out=self._indptr[1:])
+        self._keys_label_trigram = np.sort(pairs_label * len(self._vocabulary) + pairs_trigram)
+
+        self._latitudes = np.array([np.nan if p.latitude is None else p.latitude for p in self._places], dtype=float)
+        self._longitudes = np.array([np.nan if p.longitude is None else p.longitude for p in self._places], dtype=float)
+
+    @property
+    def places(self) -> List[Place]:
+        return self._places
+
+    def __len__(self) -> int:
+        return len(self._places)
+
+    def _query_trigrams(self, names: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ `(rows, trigram ids, trigrams per name)`, each name from its rarest trigram.
+        The unknown trigrams only count in the size of the name."""
+        rows, ids_trigram, names_num_trigrams = [], [], []
+        for row, name in enumerate(names):
+            name_trigrams = trigrams(normalize_name(name))
+            names_num_trigrams.append(len(name_trigrams))
+            for trigram in name_trigrams:
+                if trigram in self._vocabulary:
+                    rows.append(row)
+                    ids_trigram.append(self._vocabulary[trigram])
+        rows, ids_trigram = np.array(rows, dtype=np.int64), np.array(ids_trigram, dtype=np.int64)
+        order = np.lexsort((self._frequencies[ids_trigram], rows))
+        return rows[order], ids_trigram[order], np.array(names_num_trigrams, dtype=np.int64)
+
+    def _top_k_chunk(self, names: Sequence[str], k: int, min_score: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        empty = (np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([], dtype=float))
+        rows, ids_trigram, names_num_trigrams = self._query_trigrams(names)
+        if len(rows) == 0:
+            return empty
+
+        # Dice >= min_score needs `min_shared` common trigrams, so the prefix of the `known - min_shared + 1` rarest ones.
+        num_known = np.bincount(rows, minlength=len(names))
+        starts_rows = np.cumsum(num_known) - num_known
+        positions = np.arange(len(rows)) - starts_rows[rows]
+        min_shared = np.maximum(1, np.ceil(min_score * names_num_trigrams / (2 - min_score))).astype(np.int64)
+        is_prefix = positions < (num_known - min_shared + 1)[rows]
+
+        # Candidates: every (name, label) in the postings of the prefix trigrams.
+        rows_prefix, ids_prefix = rows[is_prefix], ids_trigram[is_prefix]
+        starts = self._indptr[ids_prefix]
+        lengths = self._indptr[ids_prefix + 1] - starts
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        candidates_rows = np.repeat(rows_prefix, lengths)
+        candidates_labels = self._postings[np.repeat(starts, lengths) + offsets]
+        # Length filter: Dice >= min_score needs `min_score / (2 - min_score) <= size label / size name <= (2 - min_score) / min_score`.
+        ratios = self._labels_num_trigrams[candidates_labels] / names_num_trigrams[candidates_rows]
+        is_length_ok = (ratios * (2 - min_score) >= min_score) & (ratios * min_score <= 2 - min_score)
+        num_labels = len(self._labels_place)
+        keys, shared = np.unique(candidates_rows[is_length_ok] * num_labels + candidates_labels[is_length_ok], return_counts=True)
+        rows_pairs, labels_pairs = keys // num_labels, keys % num_labels
+
+        # Drop the pairs that can not reach `min_score`, then verify the rest against the suffix trigrams.
+        num_suffix = num_known - np.bincount(rows_prefix, minlength=len(names))
+        sizes = names_num_trigrams[rows_pairs] + self._labels_num_trigrams[labels_pairs]
+        is_possible = 2 * (shared + num_suffix[rows_pairs]) >= min_score * sizes
+        rows_pairs, labels_pairs, shared, sizes = rows_pairs[is_possible], labels_pairs[is_possible], shared[is_possible], sizes[is_possible]
+        if len(rows_pairs) == 0:
+            return empty
+
+        lengths = num_suffix[rows_pairs]
+        starts = (starts_rows + num_known - num_suffix)[rows_pairs]
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        pairs = np.repeat(np.arange(len(rows_pairs)), lengths)
+        keys = labels_pairs[pairs] * len(self._vocabulary) + ids_trigram[np.repeat(starts, lengths) + offsets]
+        positions = np.minimum(np.searchsorted(self._keys_label_trigram, keys), len(self._keys_label_trigram) - 1)
+        shared = shared + np.bincount(pairs, weights=self._keys_label_trigram[positions] == keys, minlength=len(rows_pairs)).astype(np.int64)
+
+        scores = 2 * shared / sizes
+        is_match = scores >= min_score
+        rows, places, scores = rows_pairs[is_match], self._labels_place[labels_pairs[is_match]], scores[is_match]
+
+        # Best label per (name, place), then the `k` best places per name.
+        order = np.lexsort((-scores, places, rows))
+        rows, places, scores = rows[order], places[order], scores[order]
+        is_first = np.ones(len(rows), dtype=bool)
+        is_first[1:] = (rows[1:] != rows[:-1]) | (places[1:] != places[:-1])
+        rows, places, scores = rows[is_first], places[is_first], scores[is_first]
+
+        order = np.lexsort((-scores, rows))
+        rows, places, scores = rows[order], places[order], scores[order]
+        keep = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left") < k
+        return rows[keep], places[keep], scores[keep]
+
+    def top_k(
+            self,
+            names: Sequence[str],
+            k: int = DEFAULT_TOP_K,
+            min_score: float = DEFAULT_MIN_SCORE,
+            latitudes: Sequence[float | None] | None = None,
+            longitudes: Sequence[float | None] | None = None,
+            distance_weight: float = 0.0
+        ) -> LabelMatches:
+        """ The `k` best places of each name with a score of at least `min_score`.
+        - `latitudes`/`longitudes`: coordinates of the names, for `distance_km`.
+        - `distance_weight`: with coordinates, the candidates are ranked by `score - distance_weight * log1p(distance_km)`,
+        so close places win among similar labels. `0` ranks by `score` only.
+        """
+        k_chunk = k if distance_weight == 0 else max(k * 4, k + 10)
+        all_rows, all_places, all_scores = [], [], []
+        for i in range(0, len(names), QUERY_CHUNK):
+            rows, places, scores = self._top_k_chunk(names[i:i+QUERY_CHUNK], k=k_chunk, min_score=min_score)
+            all_rows.append(rows + i)
+            all_places.append(places)
+            all_scores.append(scores)
+        rows = np.concatenate(all_rows) if all_rows else np.array([], dtype=np.int64)
+        places = np.concatenate(all_places) if all_places else np.array([], dtype=np.int64)
+        scores = np.concatenate(all_scores) if all_scores else np.array([], dtype=float)
+
+        if latitudes is None or longitudes is None:
+            distances = np.full(len(rows), np.inf)
+        else:
+            names_latitudes = np.array([np.nan if x is None else x for x in latitudes], dtype=float)
+            names_longitudes = np.array([np.nan if x is None else x for x in longitudes], dtype=float)
+            distances = haversine_km_array(names_latitudes[rows], names_longitudes[rows], self._latitudes[places], self._longitudes[places])
+
+        if distance_weight != 0:
+            penalty = np.where(np.isinf(distances), 0.0, distance_weight * np.log1p(np.where(np.isinf(distances), 0.0, distances)))
+            order = np.lexsort((-(scores - penalty), rows))
+            rows, places, scores, distances = rows[order], places[order], scores[order], distances[order]
+            keep = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left") < k
+            rows, places, scores, distances = rows[keep], places[keep], scores[keep], distances[keep]
+        return LabelMatches(rows, places, scores, distances)
+
+    def best(self, name: str, min_score: float = FUZZY_CUTOFF) -> List[Place]:
+        """ Places tied at the best score of `name`, empty if below `min_score`."""
+        matches = self.top_k([name], k=len(self._places) or 1, min_score=min_score)
+        if len(matches.score) == 0:
+            return []
+        return [self._places[i] for i in matches.place[matches.score == matches.score[0]]]
+
+
+class PlaceMatcher:
+    def __init__(self, places: Iterable[Place], fuzzy_cutoff: float = FUZZY_CUTOFF):
+        places = list(places)
+        self._fuzzy_cutoff = fuzzy_cutoff
+        self._by_label: Dict[str, List[Place]] = {}
+        self._by_normalized: Dict[str, List[Place]] = {}
+        for place in places:
+            for label in place.labels:
+                self._by_label.setdefault(label, []).append(place)
+                self._by_normalized.setdefault(normalize_name(label), []).append(place)
+        self._label_index = LabelIndex(places)
+
+    def __len__(self) -> int:
+        return len(self._label_index)
+
+    def _candidates_label(self, name: str) -> List[Place]:
+        """ Places with the exact or else the normalized label of `name`."""
+        if name in self._by_label:
+            return self._by_label[name]
+        return self._by_normalized.get(normalize_name(name), [])
+
+    def candidates(self, name: str) -> List[Place]:
+        """ Places of the first level that matches: exact, normalized and then fuzzy."""
+        candidates = self._candidates_label(name)
+        if len(candidates) != 0:
+            return candidates
+        return self._label_index.best(name, min_score=self._fuzzy_cutoff)
+
+    def match(self, name: str, latitude: float | None = None, longitude: float | None = None) -> str | None:
+        """ `id_wikidata` of the best place for `name`, the closest one if several match."""
+        candidates = self.candidates(name)
+        if len(candidates) == 0:
+            return None
+        best = min(candidates, key=lambda place: haversine_km(latitude, longitude, place.latitude, place.longitude))
+        return best.id_wikidata
+
+    def match_many(
+            self,
+            names: Sequence[str],
+            latitudes: Sequence[float | None],
+            longitudes: Sequence[float | None],
+            distance_weight: float = DEFAULT_DISTANCE_WEIGHT
+        ) -> List[str | None]:
+        """ `match` for a batch, the fuzzy level is one `top_k` call for all the names without a label match.
+        - `distance_weight`: see `LabelIndex.top_k`, a close place wins over a slightly better label far away.
+        """
+        ids_wikidata: List[str | None] = [None]*len(names)
+        rows_fuzzy = []
+        for i, name in enumerate(names):
+            candidates = self._candidates_label(name)
+            if len(candidates) == 0:
+                rows_fuzzy.append(i)
+                continue
+            best = min(candidates, key=lambda place: haversine_km(latitudes[i], longitudes[i], place.latitude, place.longitude))
+            ids_wikidata[i] = best.id_wikidata
+        if len(rows_fuzzy) == 0:
+            return ids_wikidata
+
+        matches = self._label_index.top_k(
+            [names[i] for i in rows_fuzzy],
+            k=1,
+            min_score=self._fuzzy_cutoff,
+            latitudes=[latitudes[i] for i in rows_fuzzy],
+            longitudes=[longitudes[i] for i in rows_fuzzy],
+            distance_weight=distance_weight
+        )
+        for row, place in zip(matches.row, matches.place):
+            ids_wikidata[rows_fuzzy[row]] = self._label_index.places[place].id_wikidata
+        return ids_wikidata
@@ -1,3 +1,5 @@
+from typing import List
+
 from geodata.db.models.country import Country
 from geodata.db.models.state import State
 from geodata.db.models.city import City
@@ -65,6 +67,71 @@ def query_city_id_wikidata(city: City) -> str:
 
 
 
+def literal_sparql(text: str, language: str | None = None) -> str:
+    """ SPARQL string literal, with quotes and backslashes escaped and an optional language tag."""
+    text = text.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"' if language is None else f'"{text}"@{language}'
+
+def query_countries_id_wikidata_batch(countries: List[Country]) -> str:
+    values = " ".join(literal_sparql(country.country_code) for country in countries)
+    return f"""
+        SELECT ?cc ?country WHERE {{
+            VALUES ?cc {{ {values} }}
+            ?country wdt:P31 wd:Q6256;
+                    wdt:P297 ?cc.
+        }}
+        """
+
+def _query_places_id_wikidata_batch(models: List[State | City], id_class: str, languages: List[str]) -> str:
+    values = " ".join(
+        f"({literal_sparql(model.name, language)} {literal_sparql(model.country_code)})"
+        for model, language in zip(models, languages)
+    )
+    return f"""
+        SELECT ?name ?cc ?place WHERE {{
+            VALUES (?name ?cc) {{ {values} }}
+            ?place rdfs:label ?name;
+                wdt:P31/wdt:P279* wd:{id_class};
+                wdt:P17 ?country.
+            ?country wdt:P297 ?cc.
+        }}
+        """
+
+def query_states_id_wikidata_batch(states: List[State], languages: List[str]) -> str:
+    """ Same as `query_state_id_wikidata_lang` for many states, `languages[i]` is the label language of `states[i]`."""
+    return _query_places_id_wikidata_batch(states, id_class="Q10864048", languages=languages)
+
+def query_cities_id_wikidata_batch(cities: List[City], languages: List[str]) -> str:
+    """ Same as `query_city_id_wikidata_lang` for many cities, `languages[i]` is the label language of `cities[i]`."""
+    return _query_places_id_wikidata_batch(cities, id_class="Q486972", languages=languages)
+
+
+MAX_SETTLEMENTS_STATE = 50000
+
+def query_settlements_in_state(
+        id_state_wikidata: str,
+        languages: List[str],
+        recursive: bool = True,
+        limit: int = MAX_SETTLEMENTS_STATE
+    ) -> str:
+    """ Every settlement located in the state, with its labels in `languages` and its coordinates.
+    - `recursive`: anywhere below the state (`P131*`), else only directly in it (`P131`).
+    - `limit`: bound of rows, so that a huge state does not run until the WDQS timeout.
+    """
+    languages = ", ".join(literal_sparql(language) for language in languages)
+    located_in = "wdt:P131*" if recursive else "wdt:P131"
+    return f"""
+        SELECT ?place ?label ?coord WHERE {{
+            ?place {located_in} wd:{id_state_wikidata};
+                wdt:P31/wdt:P279* wd:Q486972;
+                rdfs:label ?label.
+            FILTER(LANG(?label) IN ({languages}))
+            OPTIONAL {{ ?place wdt:P625 ?coord. }}
+        }}
+        LIMIT {limit}
+        """
+
+
 def query_websites_and_postal_codes(id_wikidata: str) -> str:
     return f"""
         SELECT ?website ?postalCode WHERE {{
@@ -73,6 +140,19 @@ def query_websites_and_postal_codes(id_wikidata: str) -> str:
         }}
         """
 
+def query_websites_and_postal_codes_batch(ids_wikidata: List[str]) -> str:
+    """ Websites (P856) and postal codes (P281) of many entities. The UNION gives one row per value,
+    instead of the websites x postal codes product of the OPTIONAL/OPTIONAL pattern."""
+    values = " ".join(f"wd:{id_wikidata}" for id_wikidata in ids_wikidata)
+    return f"""
+        SELECT ?item ?website ?postalCode WHERE {{
+            VALUES ?item {{ {values} }}
+            {{ ?item wdt:P856 ?website. }}
+            UNION
+            {{ ?item wdt:P281 ?postalCode. }}
+        }}
+        """
+
 def query_name_native(id_wikidata: str, lang: str) -> str:
     return f"""
         SELECT ?entity ?entityLabel WHERE {{
@@ -1,7 +1,6 @@
-from typing import Tuple, List
+from typing import Tuple, List, Dict
 import time
 
-from SPARQLWrapper import QueryResult
 from tenacity import retry, stop_after_attempt, wait_fixed
 TENACITY_WAIT = 60
 TENACITY_STOP = 3
@@ -12,13 +11,19 @@ from geodata.wikidata.querys import (
     query_state_id_wikidata_lang,
     query_city_id_wikidata,
     query_city_id_wikidata_lang,
+    query_countries_id_wikidata_batch,
+    query_states_id_wikidata_batch,
+    query_cities_id_wikidata_batch,
     query_websites_and_postal_codes,
+    query_websites_and_postal_codes_batch,
+    query_settlements_in_state,
     query_name_native,
     query_name_english
 )
 from geodata.wikidata.lang import country_code_to_lang
-from geodata.wikidata.sparql import results_from_query
+from geodata.wikidata.sparql import SparqlResults, results_from_query
 from geodata.wikidata._etc import _raise_model_error
+from geodata.wikidata.matching import Place, PlaceMatcher
 from geodata.db.models.country import Country
 from geodata.db.models.state import State
 from geodata.db.models.city import City
@@ -36,7 +41,7 @@ def _get_model_name(model: Country | State | City) -> str:
         _raise_model_error()
     return _model_name
 
-def _id_wikidata_from_results(results: QueryResult.ConvertResult, model: Country | State | City) -> str | None:
+def _id_wikidata_from_results(results: SparqlResults, model: Country | State | City) -> str | None:
     bindings = results["results"]["bindings"]
     MODEL_NAME = _get_model_name(model)
     id_wikidata = None if len(bindings) == 0 else bindings[0][MODEL_NAME]["value"].split('/')[-1]
@@ -72,6 +77,102 @@ def search_id_wikidata(model: Country | State | City) -> Tuple[int, str | None]:
     return id_csc, id_wikidata
 
 
+def _id_from_uri(uri: str) -> str:
+    return uri.split('/')[-1]
+
+def query_ids_wikidata_batch(models: List[Country | State | City], languages: List[str] | None = None) -> str:
+    """ `VALUES` query for all `models`, `languages[i]` is the label language of `models[i]` (English by default)."""
+    if languages is None:
+        languages = ["en"]*len(models)
+    if all(isinstance(model, Country) for model in models):
+        return query_countries_id_wikidata_batch(models)
+    elif all(isinstance(model, State) for model in models):
+        return query_states_id_wikidata_batch(models, languages)
+    elif all(isinstance(model, City) for model in models):
+        return query_cities_id_wikidata_batch(models, languages)
+    else:
+        _raise_model_error()
+
+def ids_wikidata_from_results_batch(results: SparqlResults, models: List[Country | State | City]) -> Dict[int, str | None]:
+    """ Map the rows back to each model, by country_code for countries and by (label, country_code) otherwise."""
+    bindings = results["results"]["bindings"]
+    if all(isinstance(model, Country) for model in models):
+        code_to_id = {}
+        for binding in bindings:
+            code_to_id.setdefault(binding["cc"]["value"], _id_from_uri(binding["country"]["value"]))
+        return {model.id_csc: code_to_id.get(model.country_code) for model in models}
+
+    key_to_id = {}
+    for binding in bindings:
+        key = (binding["name"]["value"], binding["cc"]["value"])
+        key_to_id.setdefault(key, _id_from_uri(binding["place"]["value"]))
+    return {model.id_csc: key_to_id.get((model.name, model.country_code)) for model in models}
+
+def models_language_fallback(models: List[Country | State | City], ids_wikidata: Dict[int, str | None]) -> Tuple[list, List[str]]:
+    """ States/cities that missed with the English label, and the native language to retry them."""
+    models_missed = []
+    languages_missed = []
+    for model in models:
+        if isinstance(model, Country) or ids_wikidata.get(model.id_csc) is not None:
+            continue
+        lang = country2lang(model.country_code)
+        if lang not in ("", "en"):
+            models_missed.append(model)
+            languages_missed.append(lang)
+    return models_missed, languages_missed
+
+def search_ids_wikidata_batch(models: List[Country | State | City]) -> Dict[int, str | None]:
+    """ Batched `search_id_wikidata`: one `VALUES` query for all the models with the English label,
+    and a second one with the native language only for the ones that missed.
+    - Returns `{id_csc: id_wikidata | None}`.
+    """
+    if len(models) == 0:
+        return {}
+    results = results_from_query(query=query_ids_wikidata_batch(models))
+    ids_wikidata = ids_wikidata_from_results_batch(results, models)
+
+    models_missed, languages_missed = models_language_fallback(models, ids_wikidata)
+    if len(models_missed) != 0:
+        results = results_from_query(query=query_ids_wikidata_batch(models_missed, languages_missed))
+        ids_wikidata.update(ids_wikidata_from_results_batch(results, models_missed))
+    return ids_wikidata
+
+def _coordinates_from_wkt(wkt: str) -> Tuple[float | None, float | None]:
+    """ `(latitude, longitude)` of a `Point(longitude latitude)` literal."""
+    try:
+        longitude, latitude = wkt[wkt.index("(")+1:wkt.index(")")].split()
+        return float(latitude), float(longitude)
+    except ValueError:
+        return None, None
+
+def places_from_results(results: SparqlResults) -> List[Place]:
+    """ One `Place` per `?place`, with all its labels, from the rows of `query_settlements_in_state`."""
+    places = {}
+    for binding in results["results"]["bindings"]:
+        id_wikidata = _id_from_uri(binding["place"]["value"])
+        if id_wikidata not in places:
+            latitude, longitude = _coordinates_from_wkt(binding["coord"]["value"]) if "coord" in binding else (None, None)
+            places[id_wikidata] = Place(id_wikidata, set(), latitude, longitude)
+        places[id_wikidata].labels.add(binding["label"]["value"])
+    return list(places.values())
+
+def search_cities_ids_wikidata_in_state(id_state_wikidata: str, cities: List[City], recursive: bool = True) -> Dict[int, str | None]:
+    """ One query for all the settlements of the state, then all the cities are matched locally with `PlaceMatcher.match_many`.
+    - `recursive`: the settlements anywhere below the state (`P131*`), else only the ones directly in it.
+    - Returns `{id_csc: id_wikidata | None}`.
+    """
+    if len(cities) == 0:
+        return {}
+    languages = sorted({"en", *(country2lang(city.country_code) for city in cities)} - {""})
+    results = results_from_query(query=query_settlements_in_state(id_state_wikidata, languages, recursive=recursive))
+    matcher = PlaceMatcher(places_from_results(results))
+    ids_wikidata = matcher.match_many(
+        [city.name for city in cities],
+        [city.latitude for city in cities],
+        [city.longitude for city in cities]
+    )
+    return {city.id_csc: id_wikidata for city, id_wikidata in zip(cities, ids_wikidata)}
+
 def search_websites_and_postal_codes(id_wikidata: str | None) -> Tuple[List[str], List[str]]:
     if id_wikidata is None:
         return [], []
@@ -89,6 +190,24 @@ def search_websites_and_postal_codes(id_wikidata: str | None) -> Tuple[List[str]
     return websites, postal_codes
 
 
+def websites_postals_from_results_batch(results: SparqlResults, ids_wikidata: List[str]) -> Dict[str, Tuple[List[str], List[str]]]:
+    """ Group the rows by Q-id, `{id_wikidata: (websites, postal_codes)}` with empty lists for the ids without values."""
+    websites_postals = {id_wikidata: ([], []) for id_wikidata in ids_wikidata}
+    for binding in results["results"]["bindings"]:
+        websites, postal_codes = websites_postals.setdefault(_id_from_uri(binding["item"]["value"]), ([], []))
+        if "website" in binding:
+            websites.append(binding["website"]["value"])
+        if "postalCode" in binding:
+            postal_codes.append(binding["postalCode"]["value"])
+    return websites_postals
+
+def search_websites_and_postal_codes_batch(ids_wikidata: List[str]) -> Dict[str, Tuple[List[str], List[str]]]:
+    """ Batched `search_websites_and_postal_codes`, one query for all `ids_wikidata`."""
+    if len(ids_wikidata) == 0:
+        return {}
+    results = results_from_query(query=query_websites_and_postal_codes_batch(ids_wikidata))
+    return websites_postals_from_results_batch(results, ids_wikidata)
+
 @retry(stop=stop_after_attempt(TENACITY_STOP), wait=wait_fixed(TENACITY_WAIT))
 def search_name_native(id_wikidata: str | None, lang: str) -> str | None:
     if lang == "" or id_wikidata is None:
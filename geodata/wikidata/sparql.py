@@ -1,18 +1,38 @@
-from SPARQLWrapper import SPARQLWrapper, QueryResult, JSON
+from typing import Any, Dict
 
-from geodata.utils import random_user_agent
+from geodata.http_session import HttpClient, HTTP_CLIENT
+
+ACCEPT_SPARQL_JSON = "application/sparql-results+json"
+SparqlResults = Dict[str, Any]      # `{"head": ..., "results": {"bindings": [...]}}`
 
 def url_wikidata_sparql() -> str:
     return "https://query.wikidata.org/sparql"
 
-def get_sparql() -> SPARQLWrapper:
-    return SPARQLWrapper(url_wikidata_sparql())
-
-def results_from_query(query: str, timeout: int = 60) -> QueryResult.ConvertResult:
-    sparql = get_sparql()
-    sparql.setTimeout(timeout=timeout)
-    sparql.setQuery(query)
-    sparql.setReturnFormat(JSON)
-    sparql.addCustomHttpHeader("User-Agent", random_user_agent())
-    results: QueryResult.ConvertResult = sparql.query().convert()
-    return results
+
+class SparqlClient:
+    """ SPARQL endpoint over the pooled `HttpClient`. The query goes in a POST body, so long `VALUES` blocks fit."""
+    def __init__(self, url: str | None = None, http_client: HttpClient = HTTP_CLIENT):
+        self._url = url_wikidata_sparql() if url is None else url
+        self._http_client = http_client
+
+    @property
+    def url(self) -> str:
+        return self._url
+
+    @property
+    def http_client(self) -> HttpClient:
+        return self._http_client
+
+    def query(self, query: str, timeout: int = 60) -> SparqlResults:
+        return self.http_client.post_json(
+            self.url,
+            data = {"query": query},
+            headers = {"Accept": ACCEPT_SPARQL_JSON},
+            timeout = timeout
+        )
+
+
+SPARQL_CLIENT = SparqlClient()
+
+def results_from_query(query: str, timeout: int = 60) -> SparqlResults:
+    return SPARQL_CLIENT.query(query=query, timeout=timeout)
@@ -0,0 +1,180 @@
+""" Offline reader of an enwiki `pages-articles-multistream.xml.bz2` dump, for the postal codes of the articles.
+- A multistream dump is a concatenation of independent bz2 streams of ~100 pages each, so byte ranges of whole
+streams are decompressed and parsed with `iterparse` in worker processes, which read the file themselves.
+- The stream offsets come from the `multistream-index.txt.bz2` (`offset:page_id:title`), which also skips every
+stream without a wanted title, or else from scanning the dump for the bz2 stream headers.
+- A dump of one stream (or a plain `.xml`) is parsed sequentially.
+- Only the articles (namespace 0, not redirects) in `titles` go through `postal_code_lines`.
+"""
+from typing import Dict, FrozenSet, Generator, Iterable, List, Set, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from io import BytesIO
+import bz2
+import os
+import re
+import xml.etree.ElementTree as ET
+
+from geodata.wikidata.dump import DEFAULT_PROCESSES, map_bounded
+from geodata.wikipedia.utils import postal_code_lines
+
+DEFAULT_STREAMS_PER_TASK = 20
+SCAN_BLOCK_BYTES = 1 << 24
+RE_BZ2_STREAM = re.compile(rb"BZh[1-9]1AY&SY")
+LEN_BZ2_STREAM = 10
+
+_WORKER_TITLES: FrozenSet[str] = frozenset()
+
+
+def _local(tag: str) -> str:
+    """ Tag without the `{http://www.mediawiki.org/xml/export-0.11/}` namespace."""
+    return tag.rsplit("}", 1)[-1]
+
+def _child_text(elem: ET.Element, name: str) -> str | None:
+    for child in elem:
+        if _local(child.tag) == name:
+            return child.text
+    return None
+
+def iter_pages(source) -> Generator[Tuple[str, str], None, None]:
+    """ `(title, wikitext)` of the articles of an XML file object, streamed with `iterparse`."""
+    for _, elem in ET.iterparse(source, events=("end",)):
+        if _local(elem.tag) != "page":
+            continue
+        title, ns = _child_text(elem, "title"), _child_text(elem, "ns")
+        is_redirect = any(_local(child.tag) == "redirect" for child in elem)
+        if title is not None and ns == "0" and not is_redirect:
+            for child in elem:
+                if _local(child.tag) == "revision":
+                    yield title, _child_text(child, "text") or ""
+                    break
+        elem.clear()
+
+def iter_pages_streams(data: bytes) -> Generator[Tuple[str, str], None, None]:
+    """ Pages of whole bz2 streams. The first stream also holds `<mediawiki><siteinfo>` and the last `</mediawiki>`,
+    only the `<page>` elements are kept and wrapped into one root."""
+    xml = bz2.decompress(data)
+    i, j = xml.find(b"<page>"), xml.rfind(b"</page>")
+    if i == -1 or j == -1:
+        return
+    yield from iter_pages(BytesIO(b"<pages>" + xml[i:j + len(b"</page>")] + b"</pages>"))
+
+def iter_index_lines(path_index: str) -> Generator[Tuple[int, str], None, None]:
+    """ `(offset, title)` of the `multistream-index.txt(.bz2)` lines."""
+    opener = bz2.open if path_index.endswith(".bz2") else open
+    with opener(path_index, "rt", encoding="utf-8") as f:
+        for line in f:
+            offset, _, title = line.rstrip("\n").split(":", 2)
+            yield int(offset), title
+
+def stream_offsets_from_index(path_index: str, titles: Set[str] | None = None) -> Tuple[List[int], List[int]]:
+    """ `(offsets of every stream, offsets of the streams with a wanted title)`, sorted."""
+    offsets, offsets_wanted = set(), set()
+    for offset, title in iter_index_lines(path_index):
+        offsets.add(offset)
+        if titles is None or title in titles:
+            offsets_wanted.add(offset)
+    return sorted(offsets), sorted(offsets_wanted)
+
+def stream_offsets_from_dump(path_dump: str) -> List[int]:
+    """ Offsets of the bz2 stream headers, scanning the file by blocks."""
+    offsets = []
+    with open(path_dump, "rb") as f:
+        pos, tail = 0, b""
+        while block := f.read(SCAN_BLOCK_BYTES):
+            data = tail + block
+            offsets.extend(pos - len(tail) + m.start() for m in RE_BZ2_STREAM.finditer(data))
+            tail = data[-(LEN_BZ2_STREAM - 1):]
+            pos += len(block)
+    return sorted(set(offsets))
+
+def byte_ranges(
+        offsets: List[int],
+        offsets_wanted: List[int],
+        size: int,
+        streams_per_task: int = DEFAULT_STREAMS_PER_TASK
+    ) -> List[List[Tuple[int, int]]]:
+    """ Tasks of up to `streams_per_task` wanted streams, each one a list of `(start, end)` byte ranges,
+    consecutive streams merged into one range."""
+    ends = dict(zip(offsets, [*offsets[1:], size]))
+    tasks, task, num_streams = [], [], 0
+    for offset in offsets_wanted:
+        if len(task) != 0 and task[-1][1] == offset:
+            task[-1] = (task[-1][0], ends[offset])
+        else:
+            task.append((offset, ends[offset]))
+        num_streams += 1
+        if num_streams == streams_per_task:
+            tasks.append(task)
+            task, num_streams = [], 0
+    if len(task) != 0:
+        tasks.append(task)
+    return tasks
+
+def _init_worker(titles: FrozenSet[str]) -> None:
+    """ The titles are sent once per process, not with every task."""
+    global _WORKER_TITLES
+    _WORKER_TITLES = titles
+
+def _parse_pages(pages: Iterable[Tuple[str, str]]) -> List[Tuple[str, List[str]]]:
+    return [(title, postal_code_lines(text)) for title, text in pages if title in _WORKER_TITLES]
+
+def _parse_ranges(ranges: List[Tuple[int, int]], path_dump: str) -> List[Tuple[str, List[str]]]:
+    """ Worker: the postal codes of the wanted pages of the byte ranges."""
+    postals = []
+    with open(path_dump, "rb") as f:
+        for start, end in ranges:
+            f.seek(start)
+            postals.extend(_parse_pages(iter_pages_streams(f.read(end - start))))
+    return postals
+
+def iter_dump_postal_codes(
+        path_dump: str,
+        titles: Iterable[str],
+        path_index: str | None = None,
+        processes: int = DEFAULT_PROCESSES,
+        streams_per_task: int = DEFAULT_STREAMS_PER_TASK
+    ) -> Generator[List[Tuple[str, List[str]]], None, None]:
+    """ Chunks of `(title, postal codes)` of the wanted articles found in the dump.
+    - `path_index`: the `multistream-index.txt.bz2` of the dump, without it the stream headers are scanned.
+    - `processes`: worker processes, `1` parses in this process.
+    """
+    titles = frozenset(titles)
+    if path_index is not None:
+        offsets, offsets_wanted = stream_offsets_from_index(path_index, titles)
+    elif path_dump.endswith(".bz2"):
+        offsets = stream_offsets_from_dump(path_dump)
+        offsets_wanted = offsets
+    else:
+        offsets, offsets_wanted = [], []
+
+    if len(offsets) <= 1:
+        _init_worker(titles)
+        opener = bz2.open if path_dump.endswith(".bz2") else open
+        with opener(path_dump, "rb") as f:
+            yield _parse_pages(iter_pages(f))
+        return
+
+    tasks = byte_ranges(offsets, offsets_wanted, os.path.getsize(path_dump), streams_per_task=streams_per_task)
+    parse = partial(_parse_ranges, path_dump=path_dump)
+    if processes <= 1:
+        _init_worker(titles)
+        yield from map(parse, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(titles,)) as executor:
+        yield from map_bounded(executor, parse, tasks, max_pending=processes * 2)
+
+def postal_codes_from_dump(
+        path_dump: str,
+        titles: Iterable[str],
+        path_index: str | None = None,
+        processes: int = DEFAULT_PROCESSES,
+        verbose: bool = True
+    ) -> Dict[str, List[str]]:
+    """ `{title: postal codes}` of the wanted articles found in the dump, `[]` for the ones without a `postal_code`."""
+    postals = {}
+    for chunk in iter_dump_postal_codes(path_dump, titles, path_index=path_index, processes=processes):
+        postals.update(chunk)
+        if verbose and len(chunk) != 0:
+            print(f"{len(postals)} articles found")
+    return postals
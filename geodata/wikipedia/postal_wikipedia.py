@@ -1,38 +1,76 @@
-from typing import List
-import re
-import requests
+from typing import Dict, Iterable, List
+import threading
 
-from geodata.utils import random_user_agent
-from geodata.wikipedia.utils import format_str_postal_codes_wikipedia
+from geodata.http_session import HTTP_CLIENT
+from geodata.wikidata.api import MAX_IDS_WBGETENTITIES, params_wbgetentities, iter_entities
+from geodata.wikipedia.utils import postal_code_lines
 
 ENTITIES = "entities"
 SITELINKS = "sitelinks"
 ENWIKI = "enwiki"
 TITLE = "title"
+URL_WIKIDATA_API = "https://www.wikidata.org/w/api.php"
+URL_WIKIPEDIA_API = "https://en.wikipedia.org/w/api.php"
+MAX_TITLES_QUERY = 50
+MAX_TITLE_RENAMES = 5
 
 def extract_postal_code_lines(content: str) -> List[str]:
-    pattern = r'\|?\s*postal_code\s*=\s*([^|\n]*)(?=\n|\|)'
-    matches = re.findall(pattern, content, re.IGNORECASE | re.MULTILINE)
-    matches = [format_str_postal_codes_wikipedia(m.strip()) for m in matches if m.strip() != ""]
-    return matches
+    """ `postal_code` values of the wikitext, the dashes normalized."""
+    return postal_code_lines(content)
 
-def wikipedia_title_from_id_wikidata(id_wikidata: str) -> str | None:
-    url_wikidata_api = "https://www.wikidata.org/w/api.php"
-    params = {
-        "action": "wbgetentities",
-        "format": "json",
-        "ids": id_wikidata
-    }
-    headers = {"User-Agent": random_user_agent()}
-    response = requests.get(url_wikidata_api, params=params, headers=headers)
-    data = response.json()
-    
+def params_wikipedia_title(id_wikidata: str) -> dict:
+    return params_wikipedia_titles([id_wikidata])
+
+def params_wikipedia_titles(ids_wikidata: List[str]) -> dict:
+    """ Only the enwiki sitelink of up to 50 entities, instead of the whole entity JSON."""
+    return params_wbgetentities(ids_wikidata, props=SITELINKS, sitefilter=ENWIKI)
+
+def wikipedia_title_from_data(data: dict, id_wikidata: str) -> str | None:
     if ENTITIES in data and id_wikidata in data[ENTITIES]:
         entity = data[ENTITIES][id_wikidata]
         if SITELINKS in entity and ENWIKI in entity[SITELINKS]:
             return entity[SITELINKS][ENWIKI][TITLE]
     return None
 
+def wikipedia_titles_from_data(data: dict) -> Dict[str, str]:
+    """ `{id_wikidata: enwiki title}` of a `wbgetentities` response, the ids without enwiki article are not included."""
+    return {
+        id_wikidata: entity[SITELINKS][ENWIKI][TITLE]
+        for id_wikidata, entity in iter_entities(data)
+        if ENWIKI in entity.get(SITELINKS, {})
+    }
+
+def wikipedia_titles_from_ids_wikidata(ids_wikidata: List[str]) -> Dict[str, str]:
+    """ Batched `wikipedia_title_from_id_wikidata`, 50 ids per call."""
+    ids_wikidata = list(dict.fromkeys(ids_wikidata))
+    titles = {}
+    for i in range(0, len(ids_wikidata), MAX_IDS_WBGETENTITIES):
+        data = HTTP_CLIENT.get_json(URL_WIKIDATA_API, params=params_wikipedia_titles(ids_wikidata[i:i+MAX_IDS_WBGETENTITIES]))
+        titles.update(wikipedia_titles_from_data(data))
+    return titles
+
+def wikipedia_title_from_id_wikidata(id_wikidata: str) -> str | None:
+    data = HTTP_CLIENT.get_json(URL_WIKIDATA_API, params=params_wikipedia_title(id_wikidata))
+    return wikipedia_title_from_data(data, id_wikidata)
+
+def params_wikipedia_content(wikipedia_title: str) -> dict:
+    return {
+        "action": "query",
+        "format": "json",
+        "prop": "revisions",
+        "titles": wikipedia_title,
+        "rvprop": "content",
+        "formatversion": 2,
+        "redirects": True
+    }
+
+def content_from_data(data: dict) -> str | None:
+    if "query" in data and "pages" in data["query"]:
+        page = data["query"]["pages"][0]
+        if "revisions" in page and len(page["revisions"]) > 0:
+            return page["revisions"][0]["content"]
+    return None
+
 def get_postal_codes_from_wikipedia(id_wikidata: str, verbose: bool = False) -> List[str]:
     if id_wikidata is None:
         return []
@@ -40,28 +78,129 @@ def get_postal_codes_from_wikipedia(id_wikidata: str, verbose: bool = False) ->
     wikipedia_title = wikipedia_title_from_id_wikidata(id_wikidata)
     if wikipedia_title is None:
         return []
-    
-    url_wikipedia_api = "https://en.wikipedia.org/w/api.php"
-    params = {
+    return get_postal_codes_from_wikipedia_title(wikipedia_title, verbose=verbose)
+
+def get_postal_codes_from_wikipedia_title(wikipedia_title: str, verbose: bool = False) -> List[str]:
+    content = content_from_data(HTTP_CLIENT.get_json(URL_WIKIPEDIA_API, params=params_wikipedia_content(wikipedia_title)))
+    if content is None:
+        return []
+    if verbose:
+        for _l in content.split("\n"):
+            print(_l)
+    return extract_postal_code_lines(content)
+
+def params_wikipedia_contents(wikipedia_titles: List[str]) -> dict:
+    """ Only section 0 (lead + infobox) of up to 50 articles. `prop=info` adds the full `length`, for `SectionFetchStats`."""
+    return {
         "action": "query",
         "format": "json",
-        "prop": "revisions",
-        "titles": wikipedia_title,
+        "prop": "revisions|info",
+        "titles": "|".join(wikipedia_titles),
         "rvprop": "content",
+        "rvslots": "main",
+        "rvsection": 0,
         "formatversion": 2,
         "redirects": True
     }
-    headers = {"User-Agent": random_user_agent()}
-    response = requests.get(url_wikipedia_api, params=params, headers=headers)
-    data = response.json()
-    
-    if "query" in data and "pages" in data["query"]:
-        page = data["query"]["pages"][0]
-        if "revisions" in page and len(page["revisions"]) > 0:
-            content = page["revisions"][0]["content"]
-            if verbose:
-                for _l in content.split("\n"):
-                    print(_l)
-            postal_codes = extract_postal_code_lines(content)
-            return postal_codes
-    return []
\ No newline at end of file
+
+def params_continue(params: dict, data: dict) -> dict | None:
+    """ Params of the next request when MediaWiki cut the response short (`continue`, e.g. `rvcontinue`), else `None`.
+    The pages without content in this response come in the next ones."""
+    if "continue" not in data:
+        return None
+    return {**params, **data["continue"]}
+
+def _content_revision(revision: dict) -> str | None:
+    if "slots" in revision:
+        return revision["slots"].get("main", {}).get("content")
+    return revision.get("content")
+
+def _resolve_title(wikipedia_title: str, renames: Dict[str, str]) -> str:
+    for _ in range(MAX_TITLE_RENAMES):
+        if wikipedia_title not in renames:
+            break
+        wikipedia_title = renames[wikipedia_title]
+    return wikipedia_title
+
+def contents_from_data(data: dict, wikipedia_titles: Iterable[str]) -> Dict[str, str]:
+    """ `{requested title: content}` of a `params_wikipedia_contents` response.
+    The requested titles are mapped to the pages through `query.normalized` and `query.redirects`,
+    missing pages are not included.
+    """
+    query = data.get("query", {})
+    renames = {r["from"]: r["to"] for key in ("normalized", "redirects") for r in query.get(key, [])}
+    pages = {page["title"]: page for page in query.get("pages", []) if "title" in page}
+    contents = {}
+    for wikipedia_title in wikipedia_titles:
+        page = pages.get(_resolve_title(wikipedia_title, renames))
+        if page is None or len(page.get("revisions", [])) == 0:
+            continue
+        content = _content_revision(page["revisions"][0])
+        if content is not None:
+            contents[wikipedia_title] = content
+    return contents
+
+
+class SectionFetchStats:
+    """ Bytes of wikitext received with `rvsection=0`, against the full `length` of the same pages."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages = 0
+        self._bytes_section = 0
+        self._bytes_full = 0
+
+    def add_data(self, data: dict) -> None:
+        pages, bytes_section, bytes_full = 0, 0, 0
+        for page in data.get("query", {}).get("pages", []):
+            if len(page.get("revisions", [])) == 0:
+                continue
+            content = _content_revision(page["revisions"][0]) or ""
+            num_bytes = len(content.encode("utf-8"))
+            pages += 1
+            bytes_section += num_bytes
+            bytes_full += max(page.get("length", num_bytes), num_bytes)
+        with self._lock:
+            self._pages += pages
+            self._bytes_section += bytes_section
+            self._bytes_full += bytes_full
+
+    def stats(self) -> dict:
+        with self._lock:
+            bytes_saved = self._bytes_full - self._bytes_section
+            return {
+                "pages": self._pages,
+                "bytes_section": self._bytes_section,
+                "bytes_full": self._bytes_full,
+                "bytes_saved": bytes_saved,
+                "ratio_saved": bytes_saved / self._bytes_full if self._bytes_full != 0 else 0.0
+            }
+
+
+SECTION_FETCH_STATS = SectionFetchStats()
+
+def wikipedia_contents_from_titles(wikipedia_titles: Iterable[str]) -> Dict[str, str]:
+    """ Batched section 0 of the articles, 50 titles per call. `{requested title: content}`."""
+    wikipedia_titles = list(dict.fromkeys(wikipedia_titles))
+    contents = {}
+    for i in range(0, len(wikipedia_titles), MAX_TITLES_QUERY):
+        chunk = wikipedia_titles[i:i+MAX_TITLES_QUERY]
+        params = params_wikipedia_contents(chunk)
+        while params is not None:
+            data = HTTP_CLIENT.get_json(URL_WIKIPEDIA_API, params=params)
+            SECTION_FETCH_STATS.add_data(data)
+            contents.update(contents_from_data(data, chunk))
+            params = params_continue(params, data)
+    return contents
+
+def postal_codes_from_titles(titles: Dict[str, str], contents: Dict[str, str]) -> Dict[str, List[str]]:
+    """ `{id_wikidata: postal codes}` from `{id_wikidata: title}` and `{title: content}`."""
+    return {
+        id_wikidata: extract_postal_code_lines(contents[title])
+        for id_wikidata, title in titles.items()
+        if title in contents
+    }
+
+def postal_codes_from_ids_wikidata(ids_wikidata: List[str]) -> Dict[str, List[str]]:
+    """ Batched `get_postal_codes_from_wikipedia`: enwiki titles, then the section 0 of the articles, 50 per call."""
+    titles = wikipedia_titles_from_ids_wikidata(ids_wikidata)
+    return postal_codes_from_titles(titles, wikipedia_contents_from_titles(titles.values()))
@@ -0,0 +1,88 @@
+""" Sorted, merged `[start, end, width]` intervals of numeric postal codes, instead of every code of a range as a string.
+- `width` is the zero-padded length of the codes: `01067-01328` is `[1067, 1328, 5]`, and `"1067"` is not in it.
+- Stored in Mongo as a list of `[start, end, width]` lists (`to_list`/`from_list`).
+- Membership is a binary search, the codes are only enumerated lazily.
+"""
+from typing import Generator, Iterable, List, Sequence, Tuple
+from bisect import bisect_right
+import re
+
+Interval = Tuple[int, int, int]
+
+
+def _merge(intervals: Iterable[Sequence[int]]) -> List[Interval]:
+    """ Sorted by `(width, start)`, the overlapping or adjacent intervals of the same width merged."""
+    merged = []
+    intervals = ((int(s), int(e), int(w)) for s, e, w in intervals)
+    for start, end, width in sorted((i for i in intervals if i[0] <= i[1]), key=lambda i: (i[2], i[0], i[1])):
+        if len(merged) != 0 and merged[-1][2] == width and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end, width)
+        else:
+            merged.append((start, end, width))
+    return merged
+
+
+class PostalIntervals:
+    def __init__(self, intervals: Iterable[Sequence[int]] = ()):
+        self._intervals = _merge(intervals)
+        self._keys = [(width, start) for start, _, width in self._intervals]
+
+    @classmethod
+    def from_codes(cls, codes: Iterable[str]) -> "PostalIntervals":
+        """ Numeric codes, the other characters split them: `"1010 1020"` is two codes."""
+        return cls(
+            (int(code), int(code), len(code))
+            for text in codes for code in re.findall(r"\d+", text)
+        )
+
+    @classmethod
+    def from_list(cls, intervals: List[List[int]] | None) -> "PostalIntervals":
+        return cls(intervals or [])
+
+    def to_list(self) -> List[List[int]]:
+        return [list(interval) for interval in self._intervals]
+
+    @property
+    def intervals(self) -> List[Interval]:
+        return list(self._intervals)
+
+    def contains(self, code: str) -> bool:
+        if not code.isdigit():
+            return False
+        number, width = int(code), len(code)
+        i = bisect_right(self._keys, (width, number)) - 1
+        if i < 0:
+            return False
+        start, end, width_i = self._intervals[i]
+        return width_i == width and start <= number <= end
+
+    def __contains__(self, code: str) -> bool:
+        return self.contains(code)
+
+    def iter_codes(self) -> Generator[str, None, None]:
+        for start, end, width in self._intervals:
+            for number in range(start, end + 1):
+                yield str(number).zfill(width)
+
+    def __iter__(self) -> Generator[str, None, None]:
+        return self.iter_codes()
+
+    def __len__(self) -> int:
+        """ Number of codes."""
+        return sum(end - start + 1 for start, end, _ in self._intervals)
+
+    def __bool__(self) -> bool:
+        return len(self._intervals) != 0
+
+    def union(self, other: "PostalIntervals") -> "PostalIntervals":
+        return PostalIntervals([*self._intervals, *other._intervals])
+
+    def __or__(self, other: "PostalIntervals") -> "PostalIntervals":
+        return self.union(other)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, PostalIntervals) and self._intervals == other._intervals
+
+    def __repr__(self) -> str:
+        return f"PostalIntervals({self.to_list()})"
@@ -0,0 +1,160 @@
+""" Registry of the postal code rules of each country, for the postprocessing of the postal codes of wikipedia.
+- A `PostalRule` declares the code format of the country and the syntaxes accepted around it.
+- Each rule is compiled once, on `register`, into one regex that validates and classifies the whole raw string,
+the codes and ranges are then read with `findall` from the start of the list.
+- The rules are looked up by country code, so adding a country does not slow the others.
+- `version` is bumped when a rule changes, to reprocess the documents normalized with the old one.
+- `fingerprint_postal_codes` hashes the raw postal codes with that version, a document is only normalized again
+when its fingerprint changes.
+"""
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Tuple
+import hashlib
+import re
+
+from geodata.wikipedia.process_postals.intervals import Interval, PostalIntervals
+from geodata.wikipedia.utils import DASHES_TABLE
+
+SYNTAX_LIST = "list"                # `nnnnn, nnnnn nnnnn`
+SYNTAX_RANGE = "range"              # `nnnnn-nnnnn`, also as an item of a list
+SYNTAX_NR_PREFIX = "nr_prefix"      # `(nr. n) nnnnn, nnnnn`, the number in brackets is ignored
+
+RE_SEPARATOR = r"(?:\s*,\s*|\s+)"
+RE_NR_PREFIX = r"\(nr\.\s?\d+\)\s*"
+
+
+class PostalRule(NamedTuple):
+    country_code: str
+    code: str
+    syntaxes: FrozenSet[str]
+    version: int = 1
+
+
+class _CompiledRule(NamedTuple):
+    rule: PostalRule
+    full: re.Pattern
+    items: re.Pattern
+
+
+def _compile(rule: PostalRule) -> _CompiledRule:
+    code = f"(?:{rule.code})"
+    item = f"{code}(?:\\s*-\\s*{code})?" if SYNTAX_RANGE in rule.syntaxes else code
+    items = f"{item}(?:{RE_SEPARATOR}{item})*" if SYNTAX_LIST in rule.syntaxes else item
+    prefix = f"(?:{RE_NR_PREFIX})?" if SYNTAX_NR_PREFIX in rule.syntaxes else ""
+    return _CompiledRule(
+        rule = rule,
+        full = re.compile(f"{prefix}({items})"),
+        items = re.compile(f"({code})(?:\\s*-\\s*({code}))?")
+    )
+
+
+class PostalRuleRegistry:
+    def __init__(self, rules: Iterable[PostalRule] = ()):
+        self._compiled: Dict[str, _CompiledRule] = {}
+        for rule in rules:
+            self.register(rule)
+
+    def register(self, rule: PostalRule) -> None:
+        self._compiled[rule.country_code] = _compile(rule)
+
+    def __contains__(self, country_code: str) -> bool:
+        return country_code in self._compiled
+
+    @property
+    def country_codes(self) -> List[str]:
+        return sorted(self._compiled)
+
+    def rule(self, country_code: str) -> PostalRule | None:
+        compiled = self._compiled.get(country_code)
+        return None if compiled is None else compiled.rule
+
+    def version(self, country_code: str) -> int | None:
+        rule = self.rule(country_code)
+        return None if rule is None else rule.version
+
+    def normalize(self, country_code: str, postal_code_dirty: str) -> List[Interval] | None:
+        """ Intervals of a raw string, `None` if the country has no rule or the string does not follow it.
+        A range is only kept ascending (`start <= end`)."""
+        compiled = self._compiled.get(country_code)
+        if compiled is None:
+            return None
+        text = postal_code_dirty.translate(DASHES_TABLE).strip()
+        match = compiled.full.fullmatch(text)
+        if match is None:
+            return None
+        intervals = []
+        for start, end in compiled.items.findall(text, match.start(1)):
+            end = end or start
+            if int(start) <= int(end):
+                intervals.append((int(start), int(end), len(start)))
+        return intervals
+
+    def normalize_codes(self, country_code: str, postal_code_dirty: str) -> List[str] | None:
+        """ `normalize` with every code of the ranges as a string."""
+        intervals = self.normalize(country_code, postal_code_dirty)
+        if intervals is None:
+            return None
+        return [str(number).zfill(width) for start, end, width in intervals for number in range(start, end + 1)]
+
+    def normalize_batch(self, country_codes: Iterable[str], postal_codes_dirty: Iterable[str]) -> List[List[Interval] | None]:
+        """ `normalize` of each `(country_code, raw string)` pair, in order. The repeated pairs are normalized once."""
+        normalized: Dict[Tuple[str, str], List[Interval] | None] = {}
+        results = []
+        for key in zip(country_codes, postal_codes_dirty):
+            if key not in normalized:
+                normalized[key] = self.normalize(*key)
+            results.append(normalized[key])
+        return results
+
+
+POSTAL_RULES = PostalRuleRegistry([
+    PostalRule("DE", code=r"\d{5}", syntaxes=frozenset({SYNTAX_LIST, SYNTAX_RANGE, SYNTAX_NR_PREFIX})),
+    PostalRule("AT", code=r"\d{4}", syntaxes=frozenset({SYNTAX_LIST, SYNTAX_RANGE})),
+    PostalRule("CH", code=r"\d{4}", syntaxes=frozenset({SYNTAX_LIST, SYNTAX_RANGE})),
+])
+
+NO_RULES_VERSION = 0
+
+def rules_version(country_code: str) -> int:
+    """ Version of the rule of the country in `POSTAL_RULES`, `NO_RULES_VERSION` without one."""
+    version = POSTAL_RULES.version(country_code)
+    return NO_RULES_VERSION if version is None else version
+
+def fingerprint_postal_codes(country_code: str, postal_codes: Iterable[str]) -> str:
+    """ Hash of the raw postal codes (in any order) and of the rule version of the country."""
+    digest = hashlib.sha1("\x1f".join(sorted(postal_codes)).encode("utf-8")).hexdigest()
+    return f"{digest}:{rules_version(country_code)}"
+
+
+PostalsRow = Tuple[int, str, List[str], List[List[int]], str | None]
+
+class RowNormalized(NamedTuple):
+    id_csc: int
+    ranges: List[List[int]] | None     # `None` when the ranges did not change
+    fingerprint: str
+    version: int
+
+
+def normalize_ranges_rows(rows: List[PostalsRow], with_all: bool = False) -> List[RowNormalized]:
+    """ Worker of the postprocessing: `(id_csc, country_code, postal_codes_wikipedia, postal_codes_wikipedia_ranges, fingerprint)`
+    rows, no `geodata.db` import. The rows whose fingerprint did not change are skipped, unless `with_all`.
+    The ranges are recomputed from the raw codes (`postal_codes_wikipedia` is append-only), not merged with the stored
+    ones, so a new rule version also drops the codes the older rule got wrong."""
+    rows = [
+        (row, fingerprint) for row in rows
+        if (fingerprint := fingerprint_postal_codes(row[1], row[2])) != row[4] or with_all
+    ]
+    pairs = [(country_code, postal) for (_, country_code, postals, _, _), _ in rows for postal in postals]
+    normalized = iter(POSTAL_RULES.normalize_batch((cc for cc, _ in pairs), (postal for _, postal in pairs)))
+
+    results = []
+    for (id_csc, country_code, postals, ranges, _), fingerprint in rows:
+        intervals = [interval for _ in postals for interval in (next(normalized) or [])]
+        intervals_old = PostalIntervals.from_list(ranges)
+        intervals_new = PostalIntervals(intervals)
+        results.append(RowNormalized(
+            id_csc = id_csc,
+            ranges = intervals_new.to_list() if intervals_new != intervals_old else None,
+            fingerprint = fingerprint,
+            version = rules_version(country_code)
+        ))
+    return results
@@ -1,20 +1,20 @@
 from typing import Callable, List
+from functools import partial
 
 from geodata.db.models.state import State
 from geodata.db.models.city import City
-from geodata.wikipedia.process_postals.de import process_postal_code_de
-from geodata.wikipedia.process_postals.ch import process_postal_code_ch
-from geodata.wikipedia.process_postals.at import process_postal_code_at
+from geodata.wikipedia.process_postals.intervals import Interval, PostalIntervals
+from geodata.wikipedia.process_postals.rules import POSTAL_RULES
 
 def fn_process_postal_code(country_code: str) -> Callable[[str], List[str]] | None:
-    if country_code == "DE":
-        return process_postal_code_de
-    elif country_code == "CH":
-        return process_postal_code_ch
-    elif country_code == "AT":
-        return process_postal_code_at
-    else:
+    if country_code not in POSTAL_RULES:
         return None
+    return partial(POSTAL_RULES.normalize_codes, country_code)
+
+def fn_intervals_postal_code(country_code: str) -> Callable[[str], List[Interval]] | None:
+    if country_code not in POSTAL_RULES:
+        return None
+    return partial(POSTAL_RULES.normalize, country_code)
 
 def postprocess_postal_codes_wikipedia(model: State | City):
     fn_process = fn_process_postal_code(model.country_code)
@@ -26,4 +26,17 @@ def postprocess_postal_codes_wikipedia(model: State | City):
         postals_clean = fn_process(postal_code_dirty)
         if postals_clean is not None:
             postal_codes_clean.extend(postals_clean)
-    return postal_codes_clean
\ No newline at end of file
+    return postal_codes_clean
+
+def postprocess_postal_intervals_wikipedia(model: State | City) -> PostalIntervals:
+    """ `postprocess_postal_codes_wikipedia` as merged intervals, the ranges are not expanded."""
+    fn_intervals = fn_intervals_postal_code(model.country_code)
+    if len(model.postal_codes_wikipedia) == 0 or fn_intervals is None:
+        return PostalIntervals()
+
+    intervals = []
+    for postal_code_dirty in model.postal_codes_wikipedia:
+        intervals_clean = fn_intervals(postal_code_dirty)
+        if intervals_clean is not None:
+            intervals.extend(intervals_clean)
+    return PostalIntervals(intervals)
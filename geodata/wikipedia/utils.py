@@ -1,4 +1,22 @@
+from typing import List
+import re
+
+POSTAL_CODE = "postal_code"
+RE_POSTAL_CODE = re.compile(r"\|?\s*postal_code\s*=\s*([^|\n]*?)(?=\n|\||\}\}|$)", re.IGNORECASE | re.MULTILINE)
+
+DASHES_TABLE = str.maketrans({
+    "–": "-",   # en dash
+    "−": "-",   # minus sign
+    "‐": "-",   # hyphen
+    "‑": "-",   # non-breaking hyphen
+    "‒": "-",   # figure dash
+})
+
 def format_str_postal_codes_wikipedia(text: str) -> str:
-    text = text.replace("–", "-")
-    text = text.replace("−", "-")
-    return text
\ No newline at end of file
+    return text.translate(DASHES_TABLE)
+
+def postal_code_lines(content: str) -> List[str]:
+    """ `postal_code` values of the whole wikitext (infoboxes or any other template), the dashes normalized.
+    One precompiled regex pass."""
+    values = (value.strip() for value in RE_POSTAL_CODE.findall(content))
+    return [value.translate(DASHES_TABLE) for value in values if value != ""]
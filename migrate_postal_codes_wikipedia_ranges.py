@@ -0,0 +1,9 @@
+from geodata.db.client import WorldDataDB
+
+def main(verbose: bool = True):
+    db = WorldDataDB()
+    db.migrate_postal_codes_wikipedia_ranges(verbose=verbose)
+
+if __name__ == "__main__":
+    VERBOSE = True      # Can redirect to .log file.
+    main(verbose=VERBOSE)
@@ -1,9 +1,15 @@
+import argparse
+
 from geodata.db.client import WorldDataDB
+from geodata.wikidata.dump import DEFAULT_PROCESSES
 
-def main(verbose: bool = True):
+def main(verbose: bool = True, processes: int = DEFAULT_PROCESSES):
     db = WorldDataDB()
-    db.postprocess_postals_wikipedia(verbose=verbose)
+    db.postprocess_postals_wikipedia(verbose=verbose, processes=processes)
 
 if __name__ == "__main__":
     VERBOSE = True      # Can redirect to .log file.
-    main(verbose=VERBOSE)
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=DEFAULT_PROCESSES, help="Worker processes parsing the postal codes.")
+    args = parser.parse_args()
+    main(verbose=VERBOSE, processes=args.processes)
@@ -0,0 +1,61 @@
+""" Local stand-in for the http sources of the tests."""
+from typing import List, NamedTuple, Tuple
+from functools import partial
+from pathlib import Path
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import hashlib
+import os
+import threading
+
+import pytest
+
+
+class HttpDir(NamedTuple):
+    directory: Path
+    base_url: str
+    requests: List[Tuple[str, int]]
+
+
+class ETagHandler(SimpleHTTPRequestHandler):
+    """ `SimpleHTTPRequestHandler` (with its `Last-Modified`) plus an `ETag` of the file content and
+    `If-None-Match` -> 304. Every GET is appended to `server.requests` as `(path, status)`."""
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                etag = '"%s"' % hashlib.sha256(f.read()).hexdigest()[:16]
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return None
+            self._etag = etag
+        return super().send_head()
+
+    def send_response(self, code, message=None):
+        self.server.requests.append((self.path, code))
+        super().send_response(code, message)
+
+    def end_headers(self):
+        etag = getattr(self, "_etag", None)
+        if etag is not None:
+            self.send_header("ETag", etag)
+            self._etag = None
+        super().end_headers()
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def http_dir(tmp_path):
+    """ The files written to `directory` are served at `base_url`, `requests` are the `(path, status)` received."""
+    directory = tmp_path / "http"
+    directory.mkdir()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(ETagHandler, directory=str(directory)))
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield HttpDir(directory, f"http://127.0.0.1:{server.server_address[1]}", server.requests)
+    server.shutdown()
+    server.server_close()
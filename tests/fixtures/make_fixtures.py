@@ -0,0 +1,92 @@
+""" Writes the tiny dumps of `tests/fixtures`, run again after editing the entities or pages below.
+- `wikidata_dump.json`: Wikidata JSON dump (one entity per line) for `WikidataDumpIndex`.
+- `enwiki-multistream.xml.bz2` + `enwiki-multistream-index.txt.bz2`: enwiki multistream dump, `PAGES_PER_STREAM`
+pages per bz2 stream, with its `offset:page_id:title` index.
+"""
+from xml.sax.saxutils import escape, quoteattr
+import bz2
+import json
+import os
+
+DIR_FIXTURES = os.path.dirname(os.path.abspath(__file__))
+PATH_WIKIDATA_DUMP = os.path.join(DIR_FIXTURES, "wikidata_dump.json")
+PATH_ENWIKI_DUMP = os.path.join(DIR_FIXTURES, "enwiki-multistream.xml.bz2")
+PATH_ENWIKI_INDEX = os.path.join(DIR_FIXTURES, "enwiki-multistream-index.txt.bz2")
+PAGES_PER_STREAM = 2
+NS_MEDIAWIKI = "http://www.mediawiki.org/xml/export-0.11/"
+
+
+def claim(prop: str, value) -> dict:
+    return {"mainsnak": {"snaktype": "value", "property": prop, "datavalue": {"value": value}}, "rank": "normal"}
+
+def entity(id_wikidata: str, classes: list, labels: dict, enwiki: str | None = None, **props) -> dict:
+    """ `props`: `P17`/`P131` as Q-ids, `P297`/`P281`/`P856` as strings, `P625` as `(latitude, longitude)`."""
+    claims = {"P31": [claim("P31", {"id": id_class}) for id_class in classes]}
+    for prop, values in props.items():
+        if prop in ("P17", "P131"):
+            claims[prop] = [claim(prop, {"id": value}) for value in values]
+        elif prop == "P625":
+            claims[prop] = [claim(prop, {"latitude": lat, "longitude": lon}) for lat, lon in values]
+        else:
+            claims[prop] = [claim(prop, value) for value in values]
+    return {
+        "id": id_wikidata,
+        "type": "item",
+        "labels": {lang: {"language": lang, "value": label} for lang, label in labels.items()},
+        "claims": claims,
+        "sitelinks": {"enwiki": {"site": "enwiki", "title": enwiki}} if enwiki is not None else {}
+    }
+
+WIKIDATA_ENTITIES = [
+    entity("Q40", ["Q6256"], {"en": "Austria", "de": "Österreich"}, "Austria", P297=["AT"], P856=["https://www.austria.gv.at"]),
+    entity("Q41967", ["Q10864048"], {"en": "Upper Austria", "de": "Oberösterreich"}, "Upper Austria", P17=["Q40"]),
+    entity("Q41329", ["Q515"], {"en": "Linz", "de": "Linz"}, "Linz", P17=["Q40"], P131=["Q41967"], P281=["4010", "4020"], P625=[(48.3, 14.3)]),
+    entity("Q5000", ["Q532"], {"en": "Linz", "de": "Linz"}, None, P17=["Q40"], P281=["9999"], P625=[(47.0, 10.0)]),
+    entity("Q7000", ["Q5"], {"en": "Steyr"}),       # a human, not indexed
+]
+
+def write_wikidata_dump(path: str = PATH_WIKIDATA_DUMP) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[\n" + ",\n".join(json.dumps(e, ensure_ascii=False, separators=(",", ":")) for e in WIKIDATA_ENTITIES) + "\n]\n")
+
+
+def infobox(postal_code: str) -> str:
+    return "{{Infobox settlement\n|name = x\n|postal_code = %s\n|website = [https://example.org]\n}}\nA town." % postal_code
+
+# (title, namespace, redirect target, wikitext)
+ENWIKI_PAGES = [
+    ("Linz", "0", None, infobox("4010–4030")),
+    ("Munich", "0", None, infobox("80331&ndash;81929")),
+    ("Wikipedia:About", "4", None, infobox("1")),
+    ("Vienna", "0", None, infobox("1010 - 1239, 1400")),
+    ("Wien", "0", "Vienna", "#REDIRECT [[Vienna]]"),
+    ("Steyr", "0", None, "Steyr has no infobox."),
+    ("Salzburg", "0", None, infobox("5020")),
+]
+
+def page_xml(page_id: int, title: str, ns: str, redirect: str | None, text: str) -> str:
+    redirect = f"<redirect title={quoteattr(redirect)} />" if redirect is not None else ""
+    return (
+        f"  <page>\n    <title>{escape(title)}</title>\n    <ns>{ns}</ns>\n    <id>{page_id}</id>\n    {redirect}"
+        f'<revision><id>{page_id}</id><text xml:space="preserve">{escape(text)}</text></revision>\n  </page>\n'
+    )
+
+def write_enwiki_dump(path: str = PATH_ENWIKI_DUMP, path_index: str = PATH_ENWIKI_INDEX) -> None:
+    """ Like the real dump, the first stream holds `<mediawiki><siteinfo>` and the last one `</mediawiki>`."""
+    lines_index = []
+    with open(path, "wb") as f:
+        header = f'<mediawiki xmlns="{NS_MEDIAWIKI}" xml:lang="en">\n  <siteinfo><sitename>Wikipedia</sitename></siteinfo>\n'
+        f.write(bz2.compress(header.encode("utf-8")))
+        for start in range(0, len(ENWIKI_PAGES), PAGES_PER_STREAM):
+            offset = f.tell()
+            pages = list(enumerate(ENWIKI_PAGES[start:start + PAGES_PER_STREAM], start=start + 1))
+            f.write(bz2.compress("".join(page_xml(page_id, *page) for page_id, page in pages).encode("utf-8")))
+            lines_index.extend(f"{offset}:{page_id}:{page[0]}" for page_id, page in pages)
+        f.write(bz2.compress(b"</mediawiki>\n"))
+    with bz2.open(path_index, "wt", encoding="utf-8") as f:
+        f.write("\n".join(lines_index) + "\n")
+
+
+if __name__ == "__main__":
+    write_wikidata_dump()
+    write_enwiki_dump()
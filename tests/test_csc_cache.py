@@ -0,0 +1,71 @@
+""" `CSCCache` over a `file://` folder and over a local http server with `ETag`s (`http_dir` of `conftest.py`)."""
+import os
+
+import pytest
+
+from geodata.csc.cache import CSCCache
+from geodata.csc.downloads import iter_download_csv
+from geodata.csc.urls import UrlsCSC
+
+from tests.test_csc_downloads import CITIES_CSV
+
+CITIES_CSV_NEW = CITIES_CSV + "4,Nuremberg,11,BY,Bavaria,82,DE,Germany,49.45,11.08,Q2090\n"
+
+
+def records(chunks) -> list:
+    return [row for df in chunks for row in df.to_dict("records")]
+
+@pytest.fixture
+def dir_csv(tmp_path):
+    directory = tmp_path / "csv"
+    directory.mkdir()
+    (directory / "cities.csv").write_text(CITIES_CSV)
+    return directory
+
+
+def test_refresh_file(tmp_path, dir_csv):
+    """ A `file://` source is parsed again only when its mtime changes."""
+    cache = CSCCache(cache_dir=str(tmp_path / "cache"), base_url=dir_csv.as_uri())
+    assert cache.refresh(UrlsCSC.cities)
+    assert not cache.refresh(UrlsCSC.cities)
+    assert len(cache.get_df(UrlsCSC.cities)) == 3
+
+    path_csv = dir_csv / "cities.csv"
+    path_csv.write_text(CITIES_CSV_NEW)
+    stat = os.stat(path_csv)
+    os.utime(path_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.refresh(UrlsCSC.cities)
+    assert len(cache.get_df(UrlsCSC.cities)) == 4
+
+def test_offline(tmp_path, dir_csv):
+    cache_dir = str(tmp_path / "cache")
+    with pytest.raises(FileNotFoundError):
+        CSCCache(cache_dir=cache_dir, offline=True).refresh(UrlsCSC.cities)
+
+    CSCCache(cache_dir=cache_dir, base_url=dir_csv.as_uri()).refresh(UrlsCSC.cities)
+    (dir_csv / "cities.csv").unlink()
+    cache = CSCCache(cache_dir=cache_dir, offline=True)
+    assert not cache.refresh(UrlsCSC.cities)
+    assert len(cache.get_df(UrlsCSC.cities)) == 3
+
+def test_refresh_http_etag(tmp_path, http_dir):
+    """ The second request sends `If-None-Match` and gets a 304, a changed file is downloaded again."""
+    (http_dir.directory / "cities.csv").write_text(CITIES_CSV)
+    cache = CSCCache(cache_dir=str(tmp_path / "cache"), base_url=http_dir.base_url)
+    assert cache.refresh(UrlsCSC.cities)
+    assert not cache.refresh(UrlsCSC.cities)
+    assert cache.load_meta(UrlsCSC.cities)["etag"] is not None
+
+    (http_dir.directory / "cities.csv").write_text(CITIES_CSV_NEW)
+    assert cache.refresh(UrlsCSC.cities)
+    assert len(cache.get_df(UrlsCSC.cities)) == 4
+    assert http_dir.requests == [("/cities.csv", 200), ("/cities.csv", 304), ("/cities.csv", 200), ("/cities.csv", 304)]
+
+def test_iter_df_same_chunks(tmp_path, http_dir):
+    """ Same chunks as `iter_download_csv`, the digit `state_code`s of the first one kept as strings."""
+    (http_dir.directory / "cities.csv").write_text(CITIES_CSV)
+    cache = CSCCache(cache_dir=str(tmp_path / "cache"), base_url=http_dir.base_url)
+    chunks_cache = list(cache.iter_df(UrlsCSC.cities, chunksize=2))
+    chunks_download = list(iter_download_csv(UrlsCSC.cities, chunksize=2, source=cache.source_url(UrlsCSC.cities)))
+    assert [len(df) for df in chunks_cache] == [len(df) for df in chunks_download] == [2, 1]
+    assert records(chunks_cache) == records(chunks_download)
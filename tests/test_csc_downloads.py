@@ -0,0 +1,22 @@
+""" `iter_download_csv` against a local http server (`http_dir` of `conftest.py`)."""
+from geodata.csc.downloads import download_csv, iter_download_csv
+from geodata.csc.urls import UrlsCSC
+
+CITIES_CSV = (
+    "id,name,state_id,state_code,state_name,country_id,country_code,country_name,latitude,longitude,wikiDataId\n"
+    "1,Dresden,10,01,Saxony,82,DE,Germany,51.05,13.74,Q1731\n"
+    "2,Leipzig,10,02,Saxony,82,DE,Germany,51.34,12.37,\n"
+    "3,Munich,11,BY,Bavaria,82,DE,Germany,48.14,11.58,Q1726\n"
+)
+
+
+def test_iter_download_csv_text_columns(http_dir):
+    """ The first chunk only has digit `state_code`s, they are kept as strings."""
+    (http_dir.directory / "cities.csv").write_text(CITIES_CSV)
+    source = f"{http_dir.base_url}/cities.csv"
+    chunks = list(iter_download_csv(UrlsCSC.cities, chunksize=2, source=source))
+    assert [len(df) for df in chunks] == [2, 1]
+    rows = [row for df in chunks for row in df.to_dict("records")]
+    assert [row["state_code"] for row in rows] == ["01", "02", "BY"]
+    assert [row["city_id_wikidata"] for row in rows] == ["Q1731", None, "Q1726"]
+    assert rows == download_csv(UrlsCSC.cities, source=source).to_dict("records")
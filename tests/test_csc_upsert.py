@@ -0,0 +1,32 @@
+""" Both ingest modes of `process_df_csc` against `mongomock`."""
+import pytest
+
+from geodata.csc.downloads import download_csv
+from geodata.csc.urls import UrlsCSC
+from geodata.db.colls.base import CSCUpsertReport
+from geodata.db.colls.cities import CitiesColl
+
+from tests.test_csc_downloads import CITIES_CSV
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def df_cities(http_dir, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (http_dir.directory / "cities.csv").write_text(CITIES_CSV)
+    return download_csv(UrlsCSC.cities, source=f"{http_dir.base_url}/cities.csv")
+
+
+@pytest.mark.parametrize("with_bulk", [False, True])
+def test_process_df_csc_report(df_cities, with_bulk, capsys):
+    """ Same report for both paths and nothing printed without `verbose`."""
+    cities = CitiesColl(mongomock.MongoClient().db.cities)
+    report = cities.process_df_csc(df_cities, with_bulk=with_bulk)
+    assert report == CSCUpsertReport(inserted=3)
+    assert cities.coll.count_documents({}) == 3
+
+    cities.coll.update_one({cities.column_id_csc: 1}, {"$set": {cities.column_id_wikidata: None}})
+    report = cities.process_df_csc(df_cities, with_bulk=with_bulk)
+    assert report == CSCUpsertReport(updated=1, unchanged=2)
+    assert capsys.readouterr().out == ""
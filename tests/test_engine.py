@@ -0,0 +1,52 @@
+""" Retries and failed ids of `AsyncEnrichEngine`, with a fake collection and stage, without Mongo or the network."""
+import asyncio
+from types import SimpleNamespace
+
+from geodata.db.engine import AsyncEnrichEngine
+from geodata.db.models.base import DOWN_ID_WIKIDATA, OK
+from geodata.http_async import AsyncHttpClient
+from geodata.response_cache import CacheMissError
+
+
+class FakeColl:
+    def __init__(self):
+        self.coll = SimpleNamespace(name="cities")
+        self.statuses = []
+
+    def update_many_status(self, ids_csc, down_type, down_status) -> None:
+        self.statuses.append((ids_csc, down_type, down_status))
+
+def engine_failing(num_failures: int, error: Exception = TimeoutError("timeout")) -> tuple:
+    engine = AsyncEnrichEngine(http_client=AsyncHttpClient(limiter=None), retries=3, retry_wait=0.0, verbose=False)
+    calls = []
+    async def stage(coll, models) -> None:
+        calls.append(models)
+        if len(calls) <= num_failures:
+            raise error
+    engine._fn_stage = lambda down_type: stage
+    return engine, calls
+
+MODELS = [SimpleNamespace(id_csc=1), SimpleNamespace(id_csc=2)]
+
+
+def test_run_batch_retried():
+    engine, calls = engine_failing(num_failures=2)
+    coll = FakeColl()
+    asyncio.run(engine._run_batch(DOWN_ID_WIKIDATA, coll, MODELS))
+    assert len(calls) == 3
+    assert coll.statuses == [([1, 2], DOWN_ID_WIKIDATA, OK)]
+    assert engine.failed_ids_csc == {}
+
+def test_run_batch_failed_ids():
+    engine, calls = engine_failing(num_failures=3)
+    coll = FakeColl()
+    asyncio.run(engine._run_batch(DOWN_ID_WIKIDATA, coll, MODELS))
+    assert len(calls) == 3
+    assert coll.statuses == []
+    assert engine.failed_ids_csc == {"cities": [1, 2]}
+
+def test_run_batch_cache_miss_not_retried():
+    engine, calls = engine_failing(num_failures=3, error=CacheMissError("not cached"))
+    asyncio.run(engine._run_batch(DOWN_ID_WIKIDATA, FakeColl(), MODELS))
+    assert len(calls) == 1
+    assert engine.failed_ids_csc == {"cities": [1, 2]}
@@ -0,0 +1,23 @@
+""" AIMD of `RateLimiter` by response status."""
+import pytest
+
+from geodata.limiter import RATE_INCREASE, RATE_DECREASE, RateLimiter
+
+
+@pytest.mark.parametrize("status_code", [200, 204, 304])
+def test_on_response_success(status_code):
+    limiter = RateLimiter(rate=5.0)
+    limiter.on_response(status_code)
+    assert limiter.rate == pytest.approx(5.0 + RATE_INCREASE)
+
+@pytest.mark.parametrize("status_code", [500, 502, 504])
+def test_on_response_overload(status_code):
+    limiter = RateLimiter(rate=5.0)
+    limiter.on_response(status_code)
+    assert limiter.rate == pytest.approx(5.0 * RATE_DECREASE)
+
+@pytest.mark.parametrize("status_code", [400, 404])
+def test_on_response_client_error(status_code):
+    limiter = RateLimiter(rate=5.0)
+    limiter.on_response(status_code)
+    assert limiter.rate == 5.0
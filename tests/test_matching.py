@@ -0,0 +1,36 @@
+""" `PlaceMatcher.match_many` against a handful of places of a state."""
+from geodata.wikidata.matching import LabelIndex, Place, PlaceMatcher
+
+PLACES = [
+    Place("Q1731", {"Dresden"}, 51.05, 13.74),
+    Place("Q2079", {"Leipzig"}, 51.34, 12.37),
+    Place("Q10", {"Neustadt"}, 51.02, 14.22),
+    Place("Q11", {"Neustadtl"}, 48.14, 11.58),
+    Place("Q12", {"Neustadt"}, 49.35, 8.14),
+]
+
+
+def test_match_many_one_top_k(monkeypatch):
+    """ Label matches are resolved locally, the rest goes through one `top_k`."""
+    calls = []
+    top_k = LabelIndex.top_k
+    def top_k_counted(self, names, *args, **kwargs):
+        calls.append(list(names))
+        return top_k(self, names, *args, **kwargs)
+    monkeypatch.setattr(LabelIndex, "top_k", top_k_counted)
+
+    matcher = PlaceMatcher(PLACES)
+    ids_wikidata = matcher.match_many(
+        ["Dresden", "leipzig", "Neustadt", "Neustad", "Chemnitz"],
+        [51.0, None, 49.3, 48.1, 50.83],
+        [13.7, None, 8.1, 11.6, 12.92]
+    )
+    assert ids_wikidata == ["Q1731", "Q2079", "Q12", "Q11", None]
+    assert calls == [["Neustad", "Chemnitz"]]
+
+
+def test_match_many_distance_weight():
+    """ With `distance_weight=0` the fuzzy winner is the best label, by default it is the closest place."""
+    matcher = PlaceMatcher(PLACES)
+    assert matcher.match_many(["Neustad"], [48.1], [11.6], distance_weight=0.0) != ["Q11"]
+    assert matcher.match_many(["Neustad"], [48.1], [11.6]) == ["Q11"]
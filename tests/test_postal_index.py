@@ -0,0 +1,27 @@
+""" `PostalReverseIndex` over codes, range strings of wikidata and ranges."""
+from geodata.db.postal_index import CITY, STATE, PostalReverseIndex
+
+DOCS = [
+    (CITY, 1, "DE", ["01067–01099"], []),             # range string of wikidata, DE rule
+    (CITY, 2, "DE", ["80331"], [[80333, 80339, 5]]),
+    (CITY, 3, "FR", ["75001 - 75020"], []),           # no rule, split on the dash
+    (CITY, 4, "GB", ["SW1A 1AA", "SW1A-2AA"], []),    # not numeric
+    (STATE, 5, "AT", ["4010", "4020"], []),
+]
+
+
+def test_range_strings():
+    index = PostalReverseIndex.build(DOCS)
+    assert index.exact("DE", "01099").cities_id_csc == [1]
+    assert index.range("DE", "01090", "01100").cities_id_csc == [1]
+    assert index.exact("FR", "75010").cities_id_csc == [3]
+    assert index.prefix("FR", "750").cities_id_csc == [3]
+
+def test_codes():
+    index = PostalReverseIndex.build(DOCS)
+    assert index.exact("DE", "80335").cities_id_csc == [2]
+    assert index.exact("DE", "80331").cities_id_csc == [2]
+    assert index.exact("GB", "sw1a  1aa").cities_id_csc == [4]
+    assert index.exact("GB", "SW1A-2AA").cities_id_csc == [4]
+    assert index.prefix("AT", "40").states_id_csc == [5]
+    assert index.exact("AT", "4030").states_id_csc == []
@@ -0,0 +1,46 @@
+""" `normalize_ranges_rows`: the ranges follow the current rule of the country, whatever was stored before."""
+import pytest
+
+from geodata.wikipedia.process_postals.rules import (
+    POSTAL_RULES, SYNTAX_LIST, PostalRule, fingerprint_postal_codes, normalize_ranges_rows
+)
+
+
+@pytest.fixture
+def rule_de():
+    """ Restores the registered DE rule after the test."""
+    rule = POSTAL_RULES.rule("DE")
+    yield rule
+    POSTAL_RULES.register(rule)
+
+
+def test_legacy_ranges_dropped():
+    """ The width-4 intervals left by the migration of `postal_codes_wikipedia_clean` are not kept."""
+    rows = normalize_ranges_rows([(1, "DE", ["01067–01069"], [[1067, 1069, 4], [1067, 1069, 5]], None)])
+    assert rows[0].ranges == [[1067, 1069, 5]]
+
+def test_unchanged_ranges():
+    rows = normalize_ranges_rows([(1, "DE", ["01067–01069"], [[1067, 1069, 5]], None)])
+    assert rows[0].ranges is None
+    assert rows[0].fingerprint == fingerprint_postal_codes("DE", ["01067–01069"])
+
+def test_same_fingerprint_skipped():
+    assert normalize_ranges_rows([(1, "DE", ["01067"], [], fingerprint_postal_codes("DE", ["01067"]))]) == []
+
+def test_new_version_removes_codes(rule_de):
+    """ A rule that no longer accepts ranges drops them on the next postprocessing."""
+    fingerprint = fingerprint_postal_codes("DE", ["01067–01069", "01099"])
+    POSTAL_RULES.register(PostalRule("DE", code=r"\d{5}", syntaxes=frozenset({SYNTAX_LIST}), version=rule_de.version + 1))
+    rows = normalize_ranges_rows([(1, "DE", ["01067–01069", "01099"], [[1067, 1069, 5], [1099, 1099, 5]], fingerprint)])
+    assert rows[0].ranges == [[1099, 1099, 5]]
+    assert rows[0].version == rule_de.version + 1
+
+def test_with_all_recomputes(rule_de):
+    """ `with_all` recomputes the ranges of a current fingerprint, e.g. a rule edited without a new version."""
+    fingerprint = fingerprint_postal_codes("DE", ["01067–01069", "01099"])
+    POSTAL_RULES.register(PostalRule("DE", code=r"\d{5}", syntaxes=frozenset({SYNTAX_LIST}), version=rule_de.version))
+    row = (1, "DE", ["01067–01069", "01099"], [[1067, 1069, 5], [1099, 1099, 5]], fingerprint)
+    assert normalize_ranges_rows([row]) == []
+    rows = normalize_ranges_rows([row], with_all=True)
+    assert rows[0].ranges == [[1099, 1099, 5]]
+    assert rows[0].fingerprint == fingerprint
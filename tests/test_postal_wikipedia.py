@@ -0,0 +1,39 @@
+""" `extract_postal_code_lines`, and `wikipedia_contents_from_titles` over canned `rvsection=0` responses, without the network."""
+from geodata.wikipedia import postal_wikipedia
+from geodata.wikipedia.postal_wikipedia import extract_postal_code_lines, wikipedia_contents_from_titles
+
+
+def page(title: str, content: str | None = None) -> dict:
+    revisions = [{"slots": {"main": {"content": content}}}] if content is not None else []
+    return {"title": title, "revisions": revisions}
+
+RESPONSES = [
+    {
+        "continue": {"rvcontinue": "456|789", "continue": "||"},
+        "query": {"pages": [page("Linz", "|postal_code = 4010"), page("Graz")]}
+    },
+    {"query": {"pages": [page("Linz"), page("Graz", "|postal_code = 8010")]}},
+]
+
+
+def test_extract_postal_code_lines():
+    content = "{{Infobox settlement\n|name = x\n|postal_code = 4010–4030\n|postal_code =\n|website = [https://example.org]\n}}"
+    assert extract_postal_code_lines(content) == ["4010-4030"]
+
+def test_extract_postal_code_lines_not_infobox():
+    assert extract_postal_code_lines("{{Infobox_settlement\n| postal_code = 01067}}") == ["01067"]
+    assert extract_postal_code_lines("{{Ort in Deutschland\n|PLZ = 1\n| postal_code = 01067–01069\n}}") == ["01067-01069"]
+
+def test_wikipedia_contents_from_titles_continue(monkeypatch):
+    """ The pages left without content by a cut response come from the `continue` requests."""
+    params_sent = []
+    def get_json(url: str, params: dict) -> dict:
+        params_sent.append(params)
+        return RESPONSES[len(params_sent) - 1]
+    monkeypatch.setattr(postal_wikipedia.HTTP_CLIENT, "get_json", get_json)
+
+    contents = wikipedia_contents_from_titles(["Linz", "Graz"])
+    assert contents == {"Linz": "|postal_code = 4010", "Graz": "|postal_code = 8010"}
+    assert len(params_sent) == 2
+    assert params_sent[1]["rvcontinue"] == "456|789"
+    assert params_sent[1]["titles"] == params_sent[0]["titles"]
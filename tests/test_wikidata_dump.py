@@ -0,0 +1,73 @@
+""" `fill_from_dump_batch` against the tiny Wikidata dump of `tests/fixtures` (`make_fixtures.py`)."""
+from datetime import datetime
+
+import pytest
+
+import geodata.db  # noqa: F401, the collections import `geodata.db` first
+from geodata.db.colls.cities import CitiesColl
+from geodata.db.models.base import OK, EXEC, DOWN_ID_WIKIDATA, DOWN_WEBSITES_POSTALS, DOWN_NAME_NATIVE_ENGLISH
+from geodata.db.models.city import City
+from geodata.wikidata.dump_index import WikidataDumpIndex
+
+from tests.fixtures.make_fixtures import PATH_WIKIDATA_DUMP
+
+mongomock = pytest.importorskip("mongomock")
+
+ID_STATE_CSC = 10
+
+
+def city(id_csc: int, name: str, id_wikidata: str | None = None) -> City:
+    now = datetime(2024, 1, 1)
+    return City(
+        created_time=now, updated_time=now, country_code="AT", country_id_csc=1, latitude=48.3, longitude=14.3,
+        city_id_csc=id_csc, state_id_csc=ID_STATE_CSC, city_name=name, state_code="4", city_id_wikidata=id_wikidata
+    )
+
+@pytest.fixture
+def index(tmp_path):
+    index = WikidataDumpIndex(str(tmp_path / "index.sqlite"))
+    index.build(PATH_WIKIDATA_DUMP, processes=1, verbose=False)
+    yield index
+    index.close()
+
+@pytest.fixture
+def cities():
+    cities = CitiesColl(coll=mongomock.MongoClient().db["cities"])
+    cities.coll.insert_many([
+        city(100, "Linz").model_dump(),
+        city(101, "Steyr").model_dump(),                     # no entity with that label
+        city(102, "Wels", id_wikidata="Q8888").model_dump()  # id known, entity missing from the dump
+    ])
+    return cities
+
+
+def test_index_keeps_only_places(index):
+    assert len(index) == 4
+    assert index.entities(["Q7000"]) == {}
+
+def test_fill_from_dump_batch(index, cities):
+    cities.fill_from_dump_batch(
+        list(cities.iter_models()), index, ids_country={"AT": "Q40"}, ids_state={ID_STATE_CSC: "Q41967"}, verbose=False
+    )
+    docs = {doc["city_id_csc"]: doc for doc in cities.coll.find({}, {"_id": 0})}
+
+    linz = docs[100]
+    assert linz["city_id_wikidata"] == "Q41329"
+    assert sorted(linz["postal_codes_wikidata"]) == ["4010", "4020"]
+    assert linz["city_name_native"] == "Linz"
+    assert linz["status"] == {**linz["status"], DOWN_ID_WIKIDATA: OK, DOWN_WEBSITES_POSTALS: OK, DOWN_NAME_NATIVE_ENGLISH: OK}
+
+    steyr = docs[101]
+    assert steyr["city_id_wikidata"] is None
+    assert [steyr["status"][d] for d in (DOWN_ID_WIKIDATA, DOWN_WEBSITES_POSTALS, DOWN_NAME_NATIVE_ENGLISH)] == [EXEC, EXEC, EXEC]
+
+    wels = docs[102]
+    assert wels["city_id_wikidata"] == "Q8888"
+    assert [wels["status"][d] for d in (DOWN_ID_WIKIDATA, DOWN_WEBSITES_POSTALS, DOWN_NAME_NATIVE_ENGLISH)] == [OK, EXEC, EXEC]
+
+def test_unresolved_stay_pending(index, cities):
+    """ The online stages pick up only the models the dump could not serve."""
+    cities.fill_from_dump_batch(list(cities.iter_models()), index, ids_country={"AT": "Q40"}, verbose=False)
+    for down_type, ids_csc in ((DOWN_ID_WIKIDATA, [101]), (DOWN_WEBSITES_POSTALS, [101, 102])):
+        filter_models = cities.get_filter_models(filter_=cities.filter_pending(down_type), down_type=down_type)
+        assert sorted(model.id_csc for model in cities.iter_models(filter_models)) == ids_csc
@@ -0,0 +1,31 @@
+""" `postal_codes_from_dump` against the tiny enwiki multistream dump of `tests/fixtures` (`make_fixtures.py`)."""
+import pytest
+
+from geodata.wikipedia.dump import iter_dump_postal_codes, postal_codes_from_dump
+
+from tests.fixtures.make_fixtures import PATH_ENWIKI_DUMP, PATH_ENWIKI_INDEX
+
+TITLES = ["Linz", "Munich", "Wikipedia:About", "Vienna", "Wien", "Steyr", "Salzburg", "Graz"]
+EXPECTED = {
+    "Linz": ["4010-4030"],
+    "Munich": ["80331&ndash;81929"],     # the wikitext entity, left to the postal rules
+    "Vienna": ["1010 - 1239, 1400"],
+    "Steyr": [],                         # no infobox
+    "Salzburg": ["5020"]
+}   # not a main article, a redirect, not in the dump
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+@pytest.mark.parametrize("path_index", [PATH_ENWIKI_INDEX, None], ids=["index", "scan"])
+def test_postal_codes_from_dump(path_index, processes):
+    codes = postal_codes_from_dump(PATH_ENWIKI_DUMP, TITLES, path_index=path_index, processes=processes, verbose=False)
+    assert codes == EXPECTED
+
+def test_postal_codes_from_dump_some_titles():
+    """ With the index, only the streams of the wanted titles are read."""
+    codes = postal_codes_from_dump(PATH_ENWIKI_DUMP, ["Salzburg"], path_index=PATH_ENWIKI_INDEX, processes=2, verbose=False)
+    assert codes == {"Salzburg": ["5020"]}
+
+def test_iter_dump_postal_codes_one_stream_per_task():
+    chunks = list(iter_dump_postal_codes(PATH_ENWIKI_DUMP, TITLES, path_index=PATH_ENWIKI_INDEX, processes=2, streams_per_task=1))
+    assert {title: postals for chunk in chunks for title, postals in chunk} == EXPECTED